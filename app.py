@@ -1,5 +1,16 @@
+import asyncio
 
+from src.llm.llm_openAI import aclose_clients
 from src.ui.app_ui import define_app_ui
+from src.utils import metrics_utils
+
+# METRICS_PORT set: serve Prometheus metrics next to the UI
+if metrics_utils.enabled:
+    metrics_utils.start_metrics_server()
 
 ui = define_app_ui()
-ui.launch(server_name="0.0.0.0", server_port=7860)
+try:
+    ui.launch(server_name="0.0.0.0", server_port=7860)
+finally:
+    # Release pooled keep-alive connections to the LLM endpoint
+    asyncio.run(aclose_clients())
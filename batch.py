@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Headless batch summarization of many PDFs (no Gradio).
+
+Usage:
+  python batch.py BOOKS_DIR_OR_MANIFEST [--out output/batch] [--books-in-flight 4]
+                  [--workers 4] [--max-chars 24000] [--max-response-tokens 1500]
+                  [--dedup-threshold 0.9] [--chunking fixed] [--no-incremental]
+                  [--deadline SECONDS] [--chunk-timeout SECONDS] [--presentation]
+                  [--no-resume] [--no-normalize] [--metrics-port 9464]
+
+A manifest is a text file with one PDF path per line, or JSONL lines like
+{"path": "books/a.pdf", "impressions": "..."}. Per-book results go to
+OUT/<book>-<hash>/summary.txt (and presentation.txt); OUT/run_report.jsonl gets one record
+per finished book. Re-running the same command resumes an interrupted batch.
+Exits 1 if any book failed, 2 if the batch stopped because the endpoint was down.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from src.constants.constants import (
+    BATCH_BOOKS_IN_FLIGHT,
+    BATCH_OUTPUT_DIR,
+    DEFAULT_EXTRACTION_WORKERS,
+    DEFAULT_MAX_CHARACTER_PER_CHUNK,
+    DEFAULT_RESPONSE_TOKENS,
+)
+from src.llm.llm_openAI import aclose_clients
+from src.utils import metrics_utils
+from src.utils.batch_utils import discover_books, run_batch
+from src.utils.chunk_utils import CHUNKING_MODES
+
+
+async def run(args) -> int:
+    books = discover_books(args.source)
+    if not books:
+        logging.error(f"No PDFs found in {args.source}")
+        return 1
+    try:
+        records = await run_batch(
+            books,
+            out_dir=args.out,
+            books_in_flight=args.books_in_flight,
+            extraction_workers=args.workers,
+            presentation=args.presentation,
+            resume=not args.no_resume,
+            normalize=not args.no_normalize,
+            max_chars=args.max_chars,
+            max_response_tokens=args.max_response_tokens,
+            dedup_threshold=args.dedup_threshold,
+            chunking=args.chunking,
+            incremental=not args.no_incremental,
+            deadline=args.deadline,
+            chunk_timeout=args.chunk_timeout,
+        )
+    finally:
+        await aclose_clients()
+
+    if any(r["status"] == "interrupted" for r in records):
+        return 2
+    if any(r["status"] == "failed" for r in records):
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="directory of PDFs or manifest file")
+    parser.add_argument("--out", default=BATCH_OUTPUT_DIR)
+    parser.add_argument("--books-in-flight", type=int, default=BATCH_BOOKS_IN_FLIGHT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_EXTRACTION_WORKERS, help="extraction processes")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARACTER_PER_CHUNK)
+    parser.add_argument("--max-response-tokens", type=int, default=DEFAULT_RESPONSE_TOKENS)
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="similarity above which a chunk reuses an earlier chunk's summary, e.g. 0.9 "
+                             "(default from DEDUP_THRESHOLD; 0 or unset disables)")
+    parser.add_argument("--chunking", choices=CHUNKING_MODES, default=None,
+                        help="chunk boundaries: fixed size or content-defined (cdc); default from CHUNKING")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help="do not reuse chunk summaries from the previous run of a revised book")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="seconds per book; past it the book gets a partial summary (default from RUN_DEADLINE_SECONDS)")
+    parser.add_argument("--chunk-timeout", type=float, default=None,
+                        help="seconds before a chunk request is cancelled and retried (default from LLM_CHUNK_TIMEOUT)")
+    parser.add_argument("--presentation", action="store_true", help="also write presentation.txt per book")
+    parser.add_argument("--no-resume", action="store_true", help="re-summarize books already reported ok")
+    parser.add_argument("--no-normalize", action="store_true", help="summarize the raw extracted text (keep headers, page numbers, hyphens)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this port")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    if args.metrics_port is not None or metrics_utils.enabled:
+        metrics_utils.start_metrics_server(port=args.metrics_port)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
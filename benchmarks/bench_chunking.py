@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Benchmark chunker throughput (MB/s) on a synthetic text: legacy line concatenation vs `chunk_spans`.
+
+`chunk_spans` is timed counting characters (the default) and through `length_fn`, the
+path taken with a tokenizer count (here `len`, so both give the same spans).
+
+Usage:
+  python benchmarks/bench_chunking.py [--mb 5] [--max-chars 24000] [--overlap 0] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.chunk_utils import chunk_spans  # noqa: E402
+
+
+def legacy_chunk_text(text, max_chars):
+    """The original `pdf_utils.chunk_text` (string concatenation per line)."""
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        if len(current) + len(line) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += line + "\n"
+    if current.strip() != "":
+        chunks.append(current)
+    return chunks
+
+
+def make_text(megabytes: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = "cartea autorul capitolul personajul ideea lumea timpul viața știință înțelegere".split()
+    target = int(megabytes * 1024 * 1024)
+    parts, size = [], 0
+    while size < target:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(5, 25))) + rng.choice([". ", "! ", ".\n", ".\n\n"])
+        parts.append(sentence)
+        size += len(sentence)
+    # One very long line, the worst case for the legacy chunker
+    parts.append("x" * 200_000)
+    return "".join(parts)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=5.0)
+    parser.add_argument("--max-chars", type=int, default=24000)
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    text = make_text(args.mb)
+    mb = len(text) / (1024 * 1024)
+
+    legacy = best_of(lambda: legacy_chunk_text(text, args.max_chars), args.repeat)
+    spans = best_of(lambda: chunk_spans(text, max_len=args.max_chars, overlap=args.overlap), args.repeat)
+    measured = best_of(lambda: chunk_spans(text, max_len=args.max_chars, overlap=args.overlap, length_fn=len), args.repeat)
+    oversized = sum(1 for c in legacy_chunk_text(text, args.max_chars) if len(c) > args.max_chars)
+
+    print(f"text={mb:.2f} MB max_chars={args.max_chars} overlap={args.overlap}")
+    print(f"legacy chunk_text {legacy:8.3f}s  {mb / legacy:8.1f} MB/s  (oversized chunks: {oversized})")
+    print(f"chunk_spans       {spans:8.3f}s  {mb / spans:8.1f} MB/s")
+    print(f"  with length_fn  {measured:8.3f}s  {mb / measured:8.1f} MB/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark client-side overhead per call: the direct completions path vs the Agents runtime.
+
+Sends the same chunk prompt N times, one call at a time, to a local mock server that
+answers instantly, through `run_openai_chat` (an Agent and `Runner.run` per call) and
+through `run_chat` with the prebuilt request template. Prints the time per call and the
+Python memory allocated per call and at peak (tracemalloc, measured on a second pass).
+
+Usage:
+  python benchmarks/bench_completion_path.py [--calls 1000] [--chunk-chars 4000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_openai_server import MockOpenAIServer, ServerThread  # noqa: E402
+from src.constants.prompt_constants import DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION  # noqa: E402
+from src.llm import llm_openAI  # noqa: E402
+from src.llm.prompts_utils import getChunkPrompt  # noqa: E402
+
+
+async def agents_call(prompt, user_prompt):
+    return await llm_openAI.run_openai_chat(prompt, user_prompt)
+
+
+async def direct_call(prompt, user_prompt):
+    return await llm_openAI.run_chat(llm_openAI.build_messages(prompt, user_prompt), max_response_tokens=16)
+
+
+async def drive(call, calls, prompt, user_prompt, trace_memory=False):
+    # One warm-up call opens the connection and fills lazy imports
+    assert (await call(prompt, user_prompt)).ok
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for _ in range(calls):
+        result = await call(prompt, user_prompt)
+        assert result.ok, result.error
+    elapsed = time.perf_counter() - start
+    memory = None
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = (current - before, peak - before)
+    await llm_openAI.aclose_clients()
+    return elapsed, memory
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--chunk-chars", type=int, default=4000)
+    args = parser.parse_args(argv)
+
+    import agents, openai  # noqa: F401
+    from agents import set_tracing_disabled
+    # The Agents runtime would otherwise try to upload traces to the OpenAI dashboard
+    set_tracing_disabled(True)
+    llm_openAI.load_settings()
+    llm_openAI.MODEL_NAME = llm_openAI.MODEL_NAME or "mock"
+    llm_openAI.OPENAI_API_KEY = llm_openAI.OPENAI_API_KEY or "x"
+    llm_openAI.endpoint_pool = None
+    prompt = getChunkPrompt("cartea " * (args.chunk_chars // 7), DEFAULT_SUMMARY_PROMPT)
+
+    print(f"calls={args.calls} prompt_chars={len(prompt)}")
+    baseline = None
+    for name, call in (("agents", agents_call), ("direct", direct_call)):
+        with ServerThread(MockOpenAIServer(completion_tokens=16)) as server:
+            llm_openAI.BASE_URL = server.base_url
+            llm_openAI.client = None
+            llm_openAI.agent_model = None
+            elapsed, _ = asyncio.run(drive(call, args.calls, prompt, TASK_INSTRUCTION))
+            llm_openAI.client = None
+            llm_openAI.agent_model = None
+            memory_calls = max(1, args.calls // 5)
+            _, (retained, peak) = asyncio.run(drive(call, memory_calls, prompt, TASK_INSTRUCTION, trace_memory=True))
+        per_call = elapsed / args.calls
+        baseline = baseline or per_call
+        print(
+            f"{name:<7} {per_call * 1e3:7.3f} ms/call  ({baseline / per_call:4.2f}x)"
+            f"  peak={peak / 1024:8.1f} KiB  retained/call={retained / memory_calls:8.1f} B"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Benchmark PDF extraction throughput (pages/sec): serial vs page-range process pool.
+
+Usage:
+  python benchmarks/bench_pdf_extraction.py [--pdf PATH] [--pages N] [--workers N] [--repeat N]
+
+Without `--pdf` a synthetic text-heavy PDF with `--pages` pages is generated in a
+temporary directory.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+
+from src.utils.pdf_utils import extract_pdf_text, extract_pdf_text_parallel, get_page_count  # noqa: E402
+
+
+def make_synthetic_pdf(path: str, pages: int) -> str:
+    paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        rect = fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50)
+        page.insert_textbox(rect, f"Chapter {i}\n" + (paragraph + "\n") * 10, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", help="PDF to extract (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=900)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        pages = get_page_count(pdf_path)
+
+        serial = best_of(lambda: extract_pdf_text(pdf_path), args.repeat)
+        parallel = best_of(lambda: extract_pdf_text_parallel(pdf_path, max_workers=args.workers), args.repeat)
+
+    print(f"pages={pages} workers={args.workers}")
+    print(f"extract_pdf_text          {serial:8.3f}s  {pages / serial:10.1f} pages/s")
+    print(f"extract_pdf_text_parallel {parallel:8.3f}s  {pages / parallel:10.1f} pages/s")
+    print(f"speedup                   {serial / parallel:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
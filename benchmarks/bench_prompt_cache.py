@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark the prefill time prompt-cache reuse saves per chunk, against the local mock server.
+
+Sends a book's worth of chunk prompts through `layoutPrompt` and `run_summarize_llm` for
+each prompt layout ("inline", "prefix") with and without llama.cpp cache hints
+(LLM_BACKEND=llamacpp: `cache_prompt` plus a stable `id_slot` per in-flight request).
+The mock server charges prompt processing per token and skips the prefix a request
+shares with its slot's previous prompt; the table shows the simulated prefill time per
+chunk and the share of prompt tokens served from the cache.
+
+Usage:
+  python benchmarks/bench_prompt_cache.py [--chunks 64] [--chunk-chars 4000] [--slots 4]
+      [--prefill-tokens-per-second 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_openai_server import MockOpenAIServer, ServerThread  # noqa: E402
+from src.constants.prompt_constants import DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION  # noqa: E402
+from src.llm import llm_openAI  # noqa: E402
+from src.llm.prompts_utils import getChunkPrompt, layoutPrompt  # noqa: E402
+
+WORDS = "cartea capitol personajul orașul drumul noaptea scrisoarea timpul casa râul".split()
+
+
+def make_chunks(count, chars, seed=0):
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < chars:
+            words.append(rng.choice(WORDS))
+        chunks.append(" ".join(words))
+    return chunks
+
+
+async def map_phase(chunks, layout, slots):
+    semaphore = asyncio.Semaphore(slots)
+
+    async def one(chunk):
+        prompt, user_prompt = layoutPrompt(chunk, DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION, layout=layout, wrap=getChunkPrompt)
+        async with semaphore:
+            result = await llm_openAI.run_summarize_llm(prompt, user_prompt=user_prompt, max_response_tokens=16, method="chat", cache_mode="bypass")
+        assert result.ok, result.error
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(chunk) for chunk in chunks))
+    elapsed = time.perf_counter() - start
+    await llm_openAI.aclose_clients()
+    return elapsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=64)
+    parser.add_argument("--chunk-chars", type=int, default=4000)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=50000.0)
+    args = parser.parse_args(argv)
+
+    # Import the SDKs up front so the first configuration is not charged for it
+    import agents, openai  # noqa: F401
+    llm_openAI.load_settings()
+    llm_openAI.MODEL_NAME = llm_openAI.MODEL_NAME or "mock"
+    llm_openAI.OPENAI_API_KEY = llm_openAI.OPENAI_API_KEY or "x"
+    llm_openAI.endpoint_pool = None
+    chunks = make_chunks(args.chunks, args.chunk_chars)
+    print(f"chunks={args.chunks} chunk_chars={args.chunk_chars} slots={args.slots} prefill={args.prefill_tokens_per_second:.0f} tok/s")
+    baseline = None
+    for layout in ("inline", "prefix"):
+        for backend in ("openai", "llamacpp"):
+            server = MockOpenAIServer(completion_tokens=16, slots=args.slots, prefill_tokens_per_second=args.prefill_tokens_per_second)
+            with ServerThread(server):
+                llm_openAI.BASE_URL = server.base_url
+                llm_openAI.client = None
+                llm_openAI.PROMPT_LAYOUT = layout
+                llm_openAI.LLM_BACKEND = backend
+                llm_openAI.LLM_SLOTS = args.slots
+                llm_openAI.slot_pools = {}
+                elapsed = asyncio.run(map_phase(chunks, layout, args.slots))
+            prefill = server.prefill_tokens / args.prefill_tokens_per_second / args.chunks
+            baseline = baseline or prefill
+            total = server.prefill_tokens + server.cached_tokens
+            print(
+                f"layout={layout:<6} backend={backend:<8}  prefill/chunk={prefill * 1000:7.2f}ms"
+                f"  saved={(baseline - prefill) * 1000:6.2f}ms  cached={server.cached_tokens / total:6.1%}  wall={elapsed:5.2f}s"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark map-phase throughput as llama.cpp-like nodes are added to the endpoint pool.
+
+Starts N local mock servers (each with a fixed number of generation slots), routes a
+book's worth of chunk requests through `run_chat` and the least-outstanding router,
+and prints chunks/s per pool size. Throughput should scale close to linearly.
+
+Usage:
+  python benchmarks/bench_router.py [--chunks 200] [--nodes 1 2 4] [--slots 2] [--latency 0.1]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_openai_server import MockOpenAIServer, ServerThread  # noqa: E402
+from src.llm import llm_openAI  # noqa: E402
+from src.llm.concurrency import ConcurrencyController  # noqa: E402
+from src.llm.router import Endpoint, EndpointPool  # noqa: E402
+
+
+async def map_phase(chunks, pool):
+    controller = ConcurrencyController.from_env(capacity=pool.capacity)
+
+    async def one(i):
+        async with controller.slot():
+            result = await llm_openAI.run_chat([{"role": "user", "content": f"chunk {i}"}], max_response_tokens=16)
+        assert result.ok, result.error
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(chunks)))
+    elapsed = time.perf_counter() - start
+    await llm_openAI.aclose_clients()
+    return elapsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--slots", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    # Import the SDKs up front so the first pool size is not charged for it
+    import agents, openai  # noqa: F401
+    llm_openAI.load_settings()
+    llm_openAI.MODEL_NAME = llm_openAI.MODEL_NAME or "mock"
+    baseline = None
+    print(f"chunks={args.chunks} slots/node={args.slots} latency={args.latency}s")
+    for nodes in args.nodes:
+        with ExitStack() as stack:
+            servers = [
+                stack.enter_context(ServerThread(MockOpenAIServer(latency=args.latency, completion_tokens=16, slots=args.slots)))
+                for _ in range(nodes)
+            ]
+            pool = EndpointPool([Endpoint(s.base_url, max_concurrency=args.slots) for s in servers])
+            llm_openAI.endpoint_pool = pool
+            elapsed = asyncio.run(map_phase(args.chunks, pool))
+            rate = args.chunks / elapsed
+            baseline = baseline or rate / nodes
+            spread = " ".join(str(s.requests) for s in servers)
+            print(f"nodes={nodes}  {elapsed:6.2f}s  {rate:7.1f} chunks/s  scaling={rate / baseline:4.2f}x  per-node requests: {spread}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
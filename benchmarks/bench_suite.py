@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Reproducible end-to-end performance suite against the local mock OpenAI server.
+
+Runs the extraction path (serial and process pool), `multi_pass_summarize` and
+`create_presentation` over a synthetic PDF (and any real PDFs given with --pdf) with the
+real HTTP client stack. Records wall time, p50/p95 per-request latency, requests/s and
+peak RSS (where the platform reports it) into a JSON file; `--compare` diffs a run against a saved baseline.
+
+Usage:
+  python benchmarks/bench_suite.py [--output results.json] [--compare baseline.json]
+      [--pdf PATH ...] [--pages 60] [--max-chars 4000] [--latency 0.05]
+      [--latency-dist lognormal] [--tokens-per-second 200] [--slots 4]
+      [--error-rate 0.02] [--rate-limit-rate 0.02] [--context-tokens 16384] [--seed 1]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is reported as unavailable
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pdf_extraction import make_synthetic_pdf  # noqa: E402
+from mock_openai_server import MockOpenAIServer, ServerThread  # noqa: E402
+
+# Metric name -> True when higher is better
+METRICS = {
+    "wall_seconds": False,
+    "p50_seconds": False,
+    "p95_seconds": False,
+    "requests_per_second": True,
+    "pages_per_second": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux (bytes on macOS); extraction workers are counted through
+    # RUSAGE_CHILDREN. None (null in the JSON, skipped by --compare) where it is unavailable
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(own, children) / scale, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+class Timed:
+    """
+    Wraps an async function and records the latency of every call.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.latencies = []
+
+    async def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self.fn(*args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def scenario_result(wall, latencies=None, server=None, requests_before=0, **extra):
+    result = {"wall_seconds": round(wall, 4), **extra}
+    if latencies:
+        result["p50_seconds"] = round(percentile(latencies, 0.5), 4)
+        result["p95_seconds"] = round(percentile(latencies, 0.95), 4)
+        result["calls"] = len(latencies)
+    if server is not None:
+        requests = server.requests - requests_before
+        result["requests"] = requests
+        result["requests_per_second"] = round(requests / wall, 2) if wall else None
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def bench_extraction(pdf_path, label, results):
+    from src.utils.pdf_utils import extract_pdf_text, extract_pdf_text_parallel, get_page_count
+
+    pages = get_page_count(pdf_path)
+    for mode, fn in (("serial", extract_pdf_text), ("parallel", extract_pdf_text_parallel)):
+        start = time.perf_counter()
+        fn(pdf_path)
+        wall = time.perf_counter() - start
+        results[f"extract_{mode}_{label}"] = scenario_result(wall, pages=pages, pages_per_second=round(pages / wall, 1))
+
+
+async def bench_summarize(text, label, server, args, checkpoint_dir, results):
+    from src.utils import summarize_utils
+    from src.utils.presentation_utils import create_presentation
+
+    timed = Timed(summarize_utils.summarize_chunk)
+    summarize_utils.summarize_chunk = timed
+    try:
+        before = server.requests
+        start = time.perf_counter()
+        report = {}
+        summary = await summarize_utils.multi_pass_summarize(
+            text,
+            summary_file_name=f"bench_{label}",
+            max_chars=args.max_chars,
+            max_response_tokens=args.max_response_tokens,
+            checkpoint_dir=checkpoint_dir,
+            report=report,
+        )
+        wall = time.perf_counter() - start
+    finally:
+        summarize_utils.summarize_chunk = timed.fn
+    results[f"multi_pass_summarize_{label}"] = scenario_result(
+        wall, timed.latencies, server, before,
+        chunks=report.get("chunks"), summarized_chunks=report.get("summarized_chunks"), ok=bool(summary),
+    )
+
+    timed = Timed(create_presentation)
+    before = server.requests
+    start = time.perf_counter()
+    for _ in range(args.presentations):
+        await timed(summary, "Benchmark impressions.")
+    results[f"create_presentation_{label}"] = scenario_result(time.perf_counter() - start, timed.latencies, server, before)
+
+
+async def run_llm_scenarios(texts, server, args, checkpoint_dir, results):
+    from src.llm import llm_openAI
+
+    try:
+        for label, text in texts:
+            await bench_summarize(text, label, server, args, checkpoint_dir, results)
+    finally:
+        await llm_openAI.aclose_clients()
+
+
+def compare(current, baseline, threshold):
+    """
+    Prints per-metric changes against `baseline` and returns the regressions above `threshold`.
+    """
+    regressions = []
+    print(f"\nComparison with baseline {baseline.get('meta', {}).get('commit')} (threshold {threshold:.0%}):")
+    old_config = {k: v for k, v in baseline.get("meta", {}).get("config", {}).items() if k not in ("output", "compare")}
+    new_config = {k: v for k, v in current["meta"]["config"].items() if k not in ("output", "compare")}
+    if old_config != new_config:
+        changed = sorted(k for k in set(old_config) | set(new_config) if old_config.get(k) != new_config.get(k))
+        print(f"  WARNING: workload settings differ from the baseline ({', '.join(changed)}); numbers are not comparable.")
+    for name, metrics in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            print(f"  {name}: new scenario")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metrics.get(metric) is None or not old.get(metric):
+                continue
+            change = (metrics[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+            print(f"  {name:<40} {metric:<20} {old[metric]:>10} -> {metrics[metric]:>10} {change:+7.1%} {flag}")
+            if flag == "REGRESSION":
+                regressions.append((name, metric, change))
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--pdf", action="append", default=[], help="real PDF to include (repeatable)")
+    parser.add_argument("--pages", type=int, default=60, help="pages of the synthetic PDF")
+    parser.add_argument("--max-chars", type=int, default=4000)
+    parser.add_argument("--max-response-tokens", type=int, default=256)
+    parser.add_argument("--presentations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-jitter", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02)
+    parser.add_argument("--context-tokens", type=int, default=16384)
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="retry backoff base (seconds) during the run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="book_reader_bench_")
+    server = MockOpenAIServer(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, completion_tokens=args.completion_tokens,
+        slots=args.slots, latency_dist=args.latency_dist, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, context_tokens=args.context_tokens,
+        seed=args.seed,
+    )
+
+    results = {}
+    with ServerThread(server):
+        # Point the real client stack at the mock; no cache, no tracing export, no files in the repo
+        os.environ.update({
+            "BASE_URL": server.base_url, "OPENAI_API_KEY": "bench", "MODEL_NAME": "mock",
+            "LLM_CACHE_MODE": "bypass", "OPENAI_AGENTS_DISABLE_TRACING": "1",
+        })
+        os.environ.pop("LLM_ENDPOINTS", None)
+        os.chdir(workdir)
+        from src.utils import summarize_utils
+        summarize_utils.RETRY_BACKOFF_BASE_SECONDS = args.backoff_base
+
+        pdfs = [("synthetic", make_synthetic_pdf(os.path.join(workdir, "synthetic.pdf"), args.pages))]
+        pdfs += [(os.path.splitext(os.path.basename(p))[0], os.path.abspath(os.path.join(ROOT, p)) if not os.path.isabs(p) else p) for p in args.pdf]
+
+        from src.utils.pdf_utils import extract_pdf_text
+        texts = []
+        for label, path in pdfs:
+            bench_extraction(path, label, results)
+            texts.append((label, extract_pdf_text(path)))
+        asyncio.run(run_llm_scenarios(texts, server, args, os.path.join(workdir, "checkpoints"), results))
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": vars(args),
+            "server": {"requests": server.requests, "errors": server.errors, "connections": server.connections},
+        },
+        "scenarios": results,
+    }
+    for name, metrics in results.items():
+        shown = ", ".join(f"{k}={v}" for k, v in metrics.items())
+        print(f"{name}: {shown}")
+
+    if args.output:
+        with open(os.path.join(ROOT, args.output) if not os.path.isabs(args.output) else args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        path = os.path.join(ROOT, args.compare) if not os.path.isabs(args.compare) else args.compare
+        with open(path, "r", encoding="utf-8") as f:
+            regressions = compare(output, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Benchmark connection setup under concurrent chunk requests against the local mock server.
+
+Compares AsyncOpenAI with keep-alive disabled (a new connection per request), the
+library defaults, and the pooled transport from `src/llm/transport.py` (pool sized to
+the concurrency limit).
+
+Usage:
+  python benchmarks/bench_transport.py [--concurrency 64] [--requests 512] [--latency 0.02]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient  # noqa: E402
+
+from mock_openai_server import MockOpenAIServer, ServerThread  # noqa: E402
+from src.llm.transport import TransportConfig, build_http_client  # noqa: E402
+
+
+async def drive(client: AsyncOpenAI, concurrency: int, requests: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await client.chat.completions.create(
+                model="mock", messages=[{"role": "user", "content": f"chunk {i}"}], max_tokens=16
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return elapsed
+
+
+def run_case(name, make_http_client, args):
+    with ServerThread(MockOpenAIServer(latency=args.latency, completion_tokens=16)) as server:
+        async def case():
+            client = AsyncOpenAI(base_url=server.base_url, api_key="x", max_retries=0, http_client=make_http_client())
+            return await drive(client, args.concurrency, args.requests)
+
+        elapsed = asyncio.run(case())
+        print(f"{name:<22} {elapsed:7.3f}s  {args.requests / elapsed:8.1f} req/s  connections={server.connections}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    print(f"concurrency={args.concurrency} requests={args.requests} server latency={args.latency}s")
+    run_case("no keep-alive", lambda: DefaultAsyncHttpxClient(limits=httpx.Limits(max_keepalive_connections=0)), args)
+    run_case("library defaults", lambda: None, args)
+    run_case("pooled transport", lambda: build_http_client(TransportConfig(pool_size=args.concurrency)), args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""A local stand-in for an OpenAI-compatible chat-completions server (llama.cpp / LM Studio).
+
+Plain asyncio HTTP/1.1 with keep-alive, no extra dependencies. Responses are
+deterministic text. Latency (fixed, uniform or lognormal), decode speed, generation
+slots, error rates (500 / 429) and a context limit are simulated from a seeded RNG, so
+runs are reproducible. Counts connections, requests and errors. A llama.cpp-style
+/tokenize route counts tokens the same way the context limit does (4 characters each).
+With a prefill speed set, prompt processing is charged per token, and a request with
+llama.cpp's `cache_prompt` only pays for the part after the prefix it shares with the
+last prompt of its slot (`id_slot`, or round-robin when none is given).
+
+Usage:
+  python benchmarks/mock_openai_server.py [--port 8089] [--latency 0.05] [--latency-dist fixed]
+      [--tokens-per-second 0] [--slots 0] [--error-rate 0] [--rate-limit-rate 0]
+      [--context-tokens 0] [--prefill-tokens-per-second 0] [--seed 0]
+
+Then point the app at it: BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=x
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+
+class MockOpenAIServer:
+    def __init__(
+            self,
+            host="127.0.0.1",
+            port=0,
+            latency=0.0,
+            tokens_per_second=0.0,
+            completion_tokens=64,
+            slots=0,
+            latency_dist="fixed",
+            latency_jitter=0.5,
+            error_rate=0.0,
+            rate_limit_rate=0.0,
+            context_tokens=0,
+            prefill_tokens_per_second=0.0,
+            seed=0
+        ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        # Like llama.cpp's --parallel: at most `slots` requests generate at once, the rest queue (0: unlimited)
+        self.slots = slots
+        # "fixed", "uniform" (latency +/- jitter*latency) or "lognormal" (median latency, sigma=jitter)
+        self.latency_dist = latency_dist
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        # Prompt + max_tokens above this is rejected like llama.cpp's n_ctx (0: unlimited)
+        self.context_tokens = context_tokens
+        # Prompt processing speed (0: free); a cached prefix is not processed again
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.prefill_tokens = 0
+        self.cached_tokens = 0
+        self._slot_prompts = {}
+        self._next_slot = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.slots) if self.slots else None
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # ------------------------------------------------------------------ HTTP
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._dispatch(method, path, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _write(self, writer, status, payload: bytes, keep_alive, content_type="application/json"):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests"}.get(status, "Error")
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+
+    async def _dispatch(self, method, path, body, writer, keep_alive):
+        if method == "POST" and path.rstrip("/").endswith("/tokenize"):
+            # llama.cpp-style tokenize route, for LLM_TOKENIZER=endpoint
+            content = json.loads(body or b"{}").get("content", "")
+            payload = {"tokens": list(range(self.text_tokens(content)))}
+            self._write(writer, 200, json.dumps(payload).encode("utf-8"), keep_alive)
+            await writer.drain()
+            return
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            self._write(writer, 404, b'{"error": {"message": "not found"}}', keep_alive)
+            await writer.drain()
+            return
+        self.requests += 1
+        request = json.loads(body or b"{}")
+        error = self.injected_error(request)
+        if error is not None:
+            self.errors += 1
+            status, message, code = error
+            payload = {"error": {"message": message, "type": "invalid_request_error" if status == 400 else "server_error", "code": code}}
+            self._write(writer, status, json.dumps(payload).encode("utf-8"), keep_alive)
+            await writer.drain()
+            return
+        completion = self.completion(request)
+        cached = self.reuse_prompt_cache(request)
+        if self._slots is not None:
+            async with self._slots:
+                await asyncio.sleep(self.generation_time(request, completion, cached))
+        else:
+            await asyncio.sleep(self.generation_time(request, completion, cached))
+        if request.get("stream"):
+            await self._write_stream(writer, request, completion, keep_alive)
+        else:
+            self._write(writer, 200, json.dumps(self.response(request, completion, cached)).encode("utf-8"), keep_alive)
+        await writer.drain()
+
+    async def _write_stream(self, writer, request, completion, keep_alive):
+        events = []
+        for word in completion.split(" "):
+            delta = {"choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            events.append(f"data: {json.dumps(delta)}\n\n")
+        events.append("data: [DONE]\n\n")
+        self._write(writer, 200, "".join(events).encode("utf-8"), keep_alive, content_type="text/event-stream")
+
+    # ------------------------------------------------------------- Behaviour
+    def text_tokens(self, text) -> int:
+        return len(text) // 4
+
+    def prompt_text(self, request) -> str:
+        return "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in request.get("messages", []))
+
+    def prompt_tokens(self, request) -> int:
+        return self.text_tokens("".join(str(m.get("content", "")) for m in request.get("messages", [])))
+
+    def reuse_prompt_cache(self, request) -> int:
+        """
+        Tokens of the request's prompt already in its slot's cache; the slot then holds this prompt.
+        """
+        slot = request.get("id_slot")
+        if slot is None or slot < 0:
+            slot = self._next_slot
+            self._next_slot = (self._next_slot + 1) % max(1, self.slots)
+        prompt = self.prompt_text(request)
+        previous = self._slot_prompts.get(slot, "")
+        self._slot_prompts[slot] = prompt
+        if not request.get("cache_prompt"):
+            return 0
+        shared = 0
+        for a, b in zip(prompt, previous):
+            if a != b:
+                break
+            shared += 1
+        return min(self.text_tokens(prompt[:shared]), self.prompt_tokens(request))
+
+    def completion(self, request) -> str:
+        tokens = min(int(request.get("max_tokens") or self.completion_tokens), self.completion_tokens)
+        return " ".join(["rezumat"] * max(1, tokens))
+
+    def injected_error(self, request):
+        """
+        (status, message, code) for a request that should fail, or None.
+        """
+        if self.context_tokens:
+            needed = self.prompt_tokens(request) + int(request.get("max_tokens") or self.completion_tokens)
+            if needed > self.context_tokens:
+                return 400, f"the request exceeds the available context size ({needed} > {self.context_tokens} tokens)", "context_length_exceeded"
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return 500, "internal server error (injected)", None
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 429, "rate limited (injected)", "rate_limit_exceeded"
+        return None
+
+    def sample_latency(self) -> float:
+        if self.latency_dist == "uniform":
+            return max(0.0, self.rng.uniform(self.latency * (1 - self.latency_jitter), self.latency * (1 + self.latency_jitter)))
+        if self.latency_dist == "lognormal":
+            return self.rng.lognormvariate(0.0, self.latency_jitter) * self.latency
+        return self.latency
+
+    def generation_time(self, request, completion, cached_tokens=0) -> float:
+        decode = len(completion.split(" ")) / self.tokens_per_second if self.tokens_per_second else 0.0
+        prefill_tokens = self.prompt_tokens(request) - cached_tokens
+        self.prefill_tokens += prefill_tokens
+        self.cached_tokens += cached_tokens
+        prefill = prefill_tokens / self.prefill_tokens_per_second if self.prefill_tokens_per_second else 0.0
+        return self.sample_latency() + prefill + decode
+
+    def response(self, request, completion, cached_tokens=0) -> dict:
+        completion_tokens = len(completion.split(" "))
+        prompt_tokens = self.prompt_tokens(request)
+        return {
+            "id": f"chatcmpl-mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or "mock-model",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": completion},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+
+class ServerThread:
+    """Runs a MockOpenAIServer on its own event loop in a background thread."""
+
+    def __init__(self, server: MockOpenAIServer):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> MockOpenAIServer:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self.server
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--slots", type=int, default=0)
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="fixed")
+    parser.add_argument("--latency-jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--context-tokens", type=int, default=0)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = await MockOpenAIServer(
+            args.host, args.port, args.latency, args.tokens_per_second,
+            slots=args.slots, latency_dist=args.latency_dist, latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+            context_tokens=args.context_tokens, prefill_tokens_per_second=args.prefill_tokens_per_second,
+            seed=args.seed,
+        ).start()
+        print(f"Mock OpenAI server on {server.base_url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,4 +4,63 @@ NUMBER_OF_RETRIES = 3
 DEFAULT_RESPONSE_TOKENS = 1500
 DEFAULT_MAX_CHARACTER_PER_CHUNK = 24000
 SUMMARY_PLACEHOLDER = "waiting for summary..."
-MODEL_NAME = "default-model"
\ No newline at end of file
+MODEL_NAME = "default-model"
+DEFAULT_EXTRACTION_WORKERS = 4
+MIN_PAGES_PER_EXTRACTION_WORKER = 16
+DEFAULT_CHUNK_OVERLAP = 0
+DEFAULT_TEMPERATURE = 0.7
+LLM_CACHE_PATH = "output/cache/llm_responses.sqlite"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+LLM_CACHE_MEMORY_ENTRIES = 256
+CHECKPOINT_DIR = "output/checkpoints"
+DEFAULT_REDUCE_FAN_IN = 8
+DEFAULT_REDUCE_MAX_DEPTH = 4
+DEFAULT_CONCURRENCY = 5
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+RETRY_BACKOFF_BASE_SECONDS = 1.0
+RETRY_BACKOFF_MAX_SECONDS = 30.0
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 30.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+HTTP_READ_TIMEOUT_SECONDS = 600.0
+HTTP_TOTAL_TIMEOUT_SECONDS = 1800.0
+DEFAULT_ENDPOINT_WEIGHT = 1.0
+DEFAULT_ENDPOINT_CONCURRENCY = 4
+ENDPOINT_EJECT_THRESHOLD = 3
+ENDPOINT_EJECT_SECONDS = 15.0
+BATCH_OUTPUT_DIR = "output/batch"
+BATCH_BOOKS_IN_FLIGHT = 4
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+TRACE_DIR = "output/traces"
+DEFAULT_CONTEXT_TOKENS = 8192
+PROMPT_SAFETY_TOKENS = 128
+MESSAGE_OVERHEAD_TOKENS = 8
+ESTIMATE_BYTES_PER_TOKEN = 3.0
+TOKENIZER_SAMPLE_CHARS = 4000
+TOKENIZER_SAMPLE_WINDOWS = 4
+PDF_TEXT_CACHE_DIR = "output/cache/pdf_text"
+PDF_TEXT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_DEDUP_THRESHOLD = 0
+DEDUP_NUM_PERM = 128
+DEDUP_LSH_BANDS = 16
+DEDUP_SHINGLE_WORDS = 5
+NORMALIZE_EDGE_LINES = 2
+HEADER_MIN_REPEAT_PAGES = 3
+HEADER_MIN_PAGE_FRACTION = 0.2
+DEFAULT_PROMPT_LAYOUT = "inline"
+DEFAULT_LLM_BACKEND = "openai"
+DEFAULT_LLM_ENGINE = "direct"
+ARTIFACT_DB_PATH = "output/archive/runs.sqlite"
+ARTIFACT_COMPRESS_MIN_BYTES = 4096
+ARTIFACT_WRITE_BATCH = 256
+DEFAULT_CHUNKING_MODE = "fixed"
+CDC_WINDOW_CHARS = 64
+CDC_MIN_FILL = 0.4
+CDC_TARGET_FILL = 0.75
+JOBS_KEEP_FINISHED = 50
+DEADLINE_MAP_FRACTION = 0.7
+DEADLINE_REDUCE_FRACTION = 0.85
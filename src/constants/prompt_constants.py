@@ -36,4 +36,8 @@ DEFAULT_PRESENTATION_PROMPT = f"""
   """
 
 
-PRESENTATION_TASK_INSTRUCTION = "Te rog să generezi prefața completă a cărții, folosind informațiile de mai sus."
\ No newline at end of file
+PRESENTATION_TASK_INSTRUCTION = "Te rog să generezi prefața completă a cărții, folosind informațiile de mai sus."
+
+
+DEADLINE_GAP_NOTE = "[Fragmentele {first}-{last} nu au fost rezumate: timpul alocat s-a terminat.]"
+DEADLINE_PARTIAL_NOTE = "[Rezumat parțial: timpul alocat s-a terminat înainte de rezumatul final. Urmează rezumatele fragmentelor.]"
@@ -1,2 +1,5 @@
-from .llm_openAI import *
-from .prompts_utils import *
+# Submodules are imported on first attribute access (PEP 562) rather than star-imported,
+# so importing one module does not pull in the OpenAI SDK or the Agents SDK.
+from src.utils.lazy_utils import lazy_submodules
+
+__getattr__, __dir__ = lazy_submodules(globals(), ("llm_openAI", "prompts_utils"))
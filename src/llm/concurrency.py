@@ -0,0 +1,270 @@
+# concurrency.py
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from src.constants.constants import DEFAULT_CONCURRENCY, MAX_CONCURRENCY, MIN_CONCURRENCY
+from src.llm import deadline as deadlines
+from src.utils import metrics_utils as metrics
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+# AIMD tuning: +1 slot per `limit` successful requests, x0.5 on overload
+DECREASE_FACTOR = 0.5
+# Without an explicit latency target, latency above this multiple of the usual latency
+# is treated as congestion (the backend is queueing our requests). The usual latency is
+# a slow moving average, so one fast outlier cannot lower it for good, and the rule only
+# applies once it has seen LATENCY_WARMUP_SAMPLES requests.
+LATENCY_TOLERANCE = 2.0
+LATENCY_SMOOTHING = 0.2
+LATENCY_BASELINE_SMOOTHING = 0.01
+LATENCY_WARMUP_SAMPLES = 10
+
+# Whose request is waiting for a slot (e.g. a job id); asyncio tasks inherit it.
+# Waiting requests of different tenants are granted slots round-robin.
+current_tenant: contextvars.ContextVar = contextvars.ContextVar("concurrency_tenant", default=None)
+
+
+def is_overload_error(exc) -> bool:
+    """
+    True for errors that mean "slow down": HTTP 429/503 and timeouts.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or getattr(exc, "overload", False):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in OVERLOAD_STATUS_CODES:
+        return True
+    return type(exc).__name__ in ("APITimeoutError", "RateLimitError")
+
+
+def estimate_tokens(text) -> int:
+    """
+    Rough token estimate (~4 characters per token) used for rate limiting.
+    """
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Token-per-minute rate limiter for hosted endpoints. Requests larger than the
+    bucket are let through once it is full, so they cannot block forever.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class ConcurrencyController:
+    """
+    Adaptive limit on in-flight requests to one endpoint (AIMD).\n
+    The limit grows by one slot per `limit` successful requests and is halved on
+    timeouts, 429/503 responses, or when latency rises above `latency_target`
+    (default: LATENCY_TOLERANCE x the usual latency). Create one per run or per
+    backend: it binds to the running event loop on first use, not at import time.\n
+    When the limit is reached, requests wait in one queue per `current_tenant` and freed
+    slots go to the tenants in turn, so a job with a few chunks is not queued behind every
+    chunk of a larger one sharing the controller.
+    """
+
+    def __init__(
+            self,
+            initial=DEFAULT_CONCURRENCY,
+            min_limit=MIN_CONCURRENCY,
+            max_limit=MAX_CONCURRENCY,
+            latency_target: Optional[float] = None,
+            tokens_per_minute: Optional[int] = None,
+            name="default"
+        ):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial <= max_limit")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiters = OrderedDict()
+        self._last_decrease = 0.0
+        self._latency_samples = 0
+        self._latency_baseline = None
+        self._latency_ewma = None
+        self.successes = 0
+        self.overloads = 0
+        self.errors = 0
+        metrics.track_controller(self)
+
+    @classmethod
+    def from_env(cls, name="default", capacity: Optional[int] = None) -> "ConcurrencyController":
+        """
+        Builds a controller from LLM_CONCURRENCY, LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY,
+        LLM_LATENCY_TARGET (seconds) and LLM_TOKENS_PER_MINUTE.\n
+        `capacity` (e.g. the total concurrency of an endpoint pool) replaces the default
+        ceiling and starting point, so requests fan out across every backend at once.
+        """
+        def env_number(key, default, cast=int):
+            value = os.getenv(key)
+            return cast(value) if value else default
+
+        max_limit = env_number("LLM_MAX_CONCURRENCY", capacity or MAX_CONCURRENCY)
+        min_limit = env_number("LLM_MIN_CONCURRENCY", MIN_CONCURRENCY)
+        return cls(
+            initial=max(min_limit, min(max_limit, env_number("LLM_CONCURRENCY", capacity or DEFAULT_CONCURRENCY))),
+            min_limit=min_limit,
+            max_limit=max_limit,
+            latency_target=env_number("LLM_LATENCY_TARGET", None, float),
+            tokens_per_minute=env_number("LLM_TOKENS_PER_MINUTE", None),
+            name=name,
+        )
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiters in self._waiters.values() for waiter in waiters if not waiter.done())
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "waiting_tenants": len(self._waiters),
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "errors": self.errors,
+            "latency_ewma": self._latency_ewma,
+        }
+
+    @asynccontextmanager
+    async def slot(self, tokens=0):
+        """
+        Holds one in-flight slot for the duration of a request and feeds its outcome back into the limit.\n
+        Yields a dict for the request: set `request["cached"] = True` when it was answered
+        without reaching the endpoint (e.g. from the response cache), so its latency says
+        nothing about the backend and is left out. Waiting is bounded by the current deadline
+        (see `deadline`): DeadlineExceeded is raised instead of queueing past it.
+        """
+        if self.bucket is not None and tokens:
+            await deadlines.wait(self.bucket.acquire(tokens), "the token rate limit")
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+        else:
+            await deadlines.wait(self._acquire(), f"a slot of [{self.name}]")
+        started = time.monotonic()
+        request = {"cached": False}
+        try:
+            yield request
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if is_overload_error(e):
+                self.overloads += 1
+                self._decrease(started, reason=type(e).__name__)
+            else:
+                self.errors += 1
+            raise
+        else:
+            self.successes += 1
+            if not request["cached"]:
+                self._on_latency(started, time.monotonic() - started)
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        tenant = current_tenant.get()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we were cancelled: hand it on
+                self._release()
+            else:
+                waiters = self._waiters.get(tenant)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[tenant]
+            raise
+
+    def _release(self):
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._in_flight < self.limit:
+            # Round-robin: serve the tenant at the front, then move it to the back
+            tenant, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(tenant)
+            else:
+                del self._waiters[tenant]
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _on_latency(self, started, latency):
+        self._latency_samples += 1
+        # A plain average over the first samples, then a slow moving average
+        weight = max(1.0 / self._latency_samples, LATENCY_BASELINE_SMOOTHING)
+        self._latency_baseline = latency if self._latency_baseline is None else (
+            weight * latency + (1 - weight) * self._latency_baseline
+        )
+        self._latency_ewma = latency if self._latency_ewma is None else (
+            LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self._latency_ewma
+        )
+        target = self.latency_target
+        if target is None and self._latency_samples >= LATENCY_WARMUP_SAMPLES:
+            target = LATENCY_TOLERANCE * self._latency_baseline
+        if target is not None and self._latency_ewma > target:
+            self._decrease(started, reason=f"latency {self._latency_ewma:.2f}s > {target:.2f}s")
+        elif self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._wake()
+
+    def _decrease(self, started, reason):
+        # Requests that started before the last decrease saw the old limit: one cut per window
+        if started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        old = self.limit
+        self._limit = max(float(self.min_limit), self._limit * DECREASE_FACTOR)
+        if self._latency_ewma is not None:
+            # Re-measure from the new operating point
+            self._latency_ewma = self._latency_baseline
+        logging.info(f"Concurrency [{self.name}] {old} -> {self.limit} ({reason})")
@@ -0,0 +1,83 @@
+# deadline.py
+
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# time.monotonic() by which the current work must be done; asyncio tasks inherit it, so a
+# run's deadline reaches every chunk task, slot wait and request started under it
+current_deadline: contextvars.ContextVar = contextvars.ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of waiting past the current deadline.
+    """
+
+
+def env_seconds(key) -> Optional[float]:
+    """
+    A duration in seconds from the environment; unset, empty or 0 means none.
+    """
+    value = os.getenv(key)
+    return float(value) if value and float(value) > 0 else None
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current deadline (0 once it has passed), or None without one.
+    """
+    deadline = current_deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = None, at: Optional[float] = None):
+    """
+    Time budget of the `with` block: `seconds` from now, or the monotonic time `at`.\n
+    A nested budget can only shorten the enclosing one; with neither given the block keeps
+    the current deadline. Yields the deadline in force.
+    """
+    if seconds is not None:
+        at = time.monotonic() + seconds if at is None else min(at, time.monotonic() + seconds)
+    current = current_deadline.get()
+    if at is None or (current is not None and current <= at):
+        yield current
+        return
+    token = current_deadline.set(at)
+    try:
+        yield at
+    finally:
+        current_deadline.reset(token)
+
+
+def timeout_for(default: Optional[float]) -> Optional[float]:
+    """
+    Timeout of one request: `default` (None: unbounded), capped by the time left.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+
+async def wait(awaitable, what="operation"):
+    """
+    Awaits `awaitable` within the current deadline (cancelling it when the deadline
+    passes) and raises DeadlineExceeded instead of TimeoutError.
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Deadline passed while waiting for {what}") from None
@@ -0,0 +1,148 @@
+# llm_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.constants.constants import LLM_CACHE_MAX_AGE_SECONDS, LLM_CACHE_MAX_BYTES, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_PATH
+
+# "use": read and write the cache, "refresh": skip reads but store the new response,
+# "bypass": do not touch the cache at all.
+CACHE_MODES = ("use", "refresh", "bypass")
+
+
+def make_cache_key(model, method, prompt, user_prompt, max_tokens, temperature) -> str:
+    """
+    Content address of an LLM request: a SHA-256 over everything that changes the response.
+    """
+    payload = json.dumps([model, method, prompt, user_prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses: an in-memory LRU in front of a SQLite file.\n
+    The disk tier is evicted least-recently-used first when it grows over `max_bytes`, and
+    entries older than `max_age_seconds` are dropped from both tiers. Safe to call from worker threads.
+    """
+
+    def __init__(
+            self,
+            path=LLM_CACHE_PATH,
+            max_bytes=LLM_CACHE_MAX_BYTES,
+            max_age_seconds=LLM_CACHE_MAX_AGE_SECONDS,
+            memory_entries=LLM_CACHE_MEMORY_ENTRIES
+        ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            now = time.time()
+            if key in self._memory:
+                created, value = self._memory[key]
+                if created >= now - self.max_age_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.max_age_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, value):
+        with self._lock:
+            now = time.time()
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            self._remember(key, value, now)
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age_seconds,))
+        for key in [key for key, (created, _) in self._memory.items() if created < now - self.max_age_seconds]:
+            del self._memory[key]
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        for (key,) in evicted:
+            self._memory.pop(key, None)
+        logging.info(f"LLM cache evicted {len(evicted)} entries.")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
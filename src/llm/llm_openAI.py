@@ -1,100 +1,491 @@
 # llm_openAI.py
 
+import asyncio
+import logging
 import os
-from openai import AsyncOpenAI
-from agents import Agent, Runner, trace, function_tool, OpenAIChatCompletionsModel, input_guardrail, GuardrailFunctionOutput
-from dotenv import load_dotenv
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Optional
 
-from src.constants.constants import DEFAULT_RESPONSE_TOKENS
+from src.constants.constants import DEFAULT_LLM_BACKEND, DEFAULT_LLM_ENGINE, DEFAULT_PROMPT_LAYOUT, DEFAULT_RESPONSE_TOKENS, DEFAULT_TEMPERATURE
 from src.constants.prompt_constants import TASK_INSTRUCTION
+from src.llm.deadline import timeout_for
+from src.llm.llm_cache import CACHE_MODES, ResponseCache, make_cache_key
+from src.llm.llm_result import LLMResult, LLMStatus, as_llm_result
+from src.llm.prompt_cache import SlotPool, cache_hints
+from src.llm.request_template import request_template
+from src.utils import metrics_utils as metrics
+from src.utils import trace_utils as tracing
 
-load_dotenv()
-MODEL_NAME = os.getenv("MODEL_NAME")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-BASE_URL = os.getenv("BASE_URL")
+# Settings, the OpenAI client and the Agents model are created on first use (see
+# `load_settings`, `get_client`, `get_agent_model`): importing this module stays cheap
+# and side-effect free for tests, the CLI and worker processes.
+MODEL_NAME = None
+OPENAI_API_KEY = None
+BASE_URL = None
+LLM_CACHE_MODE = None
+PROMPT_LAYOUT = None
+LLM_BACKEND = None
+LLM_SLOTS = None
+LLM_ENGINE = None
 
-# Point to LM Studio / llama.cpp OpenAI-compatible endpoint
-if OPENAI_API_KEY is None:
-    client = None
-else:
-    client = AsyncOpenAI(
-        base_url= BASE_URL or None,
-        api_key=OPENAI_API_KEY  # anything non-empty
-)
-    
-agent_model = OpenAIChatCompletionsModel(
-    model=MODEL_NAME, 
-    openai_client=client
-    )
+settings_loaded = False
+response_cache = None
+transport_config = None
+client = None
+agent_model = None
+endpoint_pool = None
+token_budget = None
+slot_pools = {}
+
+def load_settings():
+    """
+    Reads `.env` and the MODEL_NAME, OPENAI_API_KEY, BASE_URL, LLM_CACHE_MODE, LLM_PROMPT_LAYOUT,
+    LLM_BACKEND, LLM_SLOTS and LLM_ENGINE settings once.\n
+    Values already set on the module (e.g. by tests) are kept.
+    """
+    global settings_loaded, MODEL_NAME, OPENAI_API_KEY, BASE_URL, LLM_CACHE_MODE, PROMPT_LAYOUT, LLM_BACKEND, LLM_SLOTS, LLM_ENGINE
+    if settings_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    MODEL_NAME = MODEL_NAME or os.getenv("MODEL_NAME")
+    OPENAI_API_KEY = OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+    BASE_URL = BASE_URL or os.getenv("BASE_URL")
+    LLM_CACHE_MODE = LLM_CACHE_MODE or os.getenv("LLM_CACHE_MODE", "use")
+    PROMPT_LAYOUT = PROMPT_LAYOUT or os.getenv("LLM_PROMPT_LAYOUT", DEFAULT_PROMPT_LAYOUT)
+    LLM_BACKEND = LLM_BACKEND or os.getenv("LLM_BACKEND", DEFAULT_LLM_BACKEND)
+    LLM_SLOTS = LLM_SLOTS if LLM_SLOTS is not None else int(os.getenv("LLM_SLOTS") or 0)
+    LLM_ENGINE = LLM_ENGINE or os.getenv("LLM_ENGINE", DEFAULT_LLM_ENGINE)
+    settings_loaded = True
+
+def get_transport_config():
+    """
+    Returns the HTTP settings shared by every request, read from the environment on first use.
+    """
+    global transport_config
+    if transport_config is None:
+        from src.llm.transport import TransportConfig
+        load_settings()
+        transport_config = TransportConfig.from_env()
+    return transport_config
+
+def get_client():
+    """
+    Returns the shared AsyncOpenAI client, creating it on first use.\n
+    One pooled HTTP transport serves chat completions and the Agents path.
+    Returns None when OPENAI_API_KEY is not set.
+    """
+    global client
+    if client is None:
+        load_settings()
+        if OPENAI_API_KEY is None:
+            return None
+        from openai import AsyncOpenAI
+        from src.llm.transport import build_http_client
+
+        # Point to LM Studio / llama.cpp OpenAI-compatible endpoint
+        client = AsyncOpenAI(
+            base_url= BASE_URL or None,
+            api_key=OPENAI_API_KEY,  # anything non-empty
+            http_client=build_http_client(get_transport_config())
+        )
+        logging.info(f"Initialized OpenAI Async Client: MODEL_NAME={MODEL_NAME} BASE_URL={BASE_URL}")
+    return client
 
+def get_agent_model():
+    """
+    Returns the Agents SDK model wrapping the shared client, creating it on first use.
+    """
+    global agent_model
+    if agent_model is None:
+        from agents import OpenAIChatCompletionsModel
+        openai_client = get_client()
+        agent_model = OpenAIChatCompletionsModel(
+            model=MODEL_NAME, 
+            openai_client=openai_client
+            )
+    return agent_model
 
+def get_endpoint_pool():
+    """
+    Returns the multi-endpoint pool configured by LLM_ENDPOINTS, or None to use the single BASE_URL client.
+    """
+    global endpoint_pool
+    if endpoint_pool is None:
+        from src.llm.router import EndpointPool
+        load_settings()
+        endpoint_pool = EndpointPool.from_env()
+    return endpoint_pool
 
+def get_token_budget():
+    """
+    Returns the prompt token budget of MODEL_NAME configured by LLM_CONTEXT_TOKENS and
+    LLM_TOKENIZER, or None to size chunks by characters only.
+    """
+    global token_budget
+    if token_budget is None:
+        from src.llm.token_budget import TokenBudget
+        load_settings()
+        pool = get_endpoint_pool()
+        base_url = BASE_URL or (pool.endpoints[0].base_url if pool else None)
+        token_budget = TokenBudget.from_env(model=MODEL_NAME, base_url=base_url)
+    return token_budget
 
-print("Initialized OpenAI Async Client.")
-print(f"Using MODEL_NAME={MODEL_NAME} with BASE_URL={BASE_URL}")
+def get_model_name() -> Optional[str]:
+    """
+    The model requests are sent to (MODEL_NAME).
+    """
+    load_settings()
+    return MODEL_NAME
+
+def get_llm_engine() -> str:
+    """
+    How "openai_agents" requests are sent, set by LLM_ENGINE: "direct" (default) or "agents".
+    """
+    load_settings()
+    return LLM_ENGINE
+
+def get_prompt_layout() -> str:
+    """
+    The prompt layout set by LLM_PROMPT_LAYOUT: "inline" (default) or "prefix" (see `prompts_utils.layoutPrompt`).
+    """
+    load_settings()
+    return PROMPT_LAYOUT
+
+@contextmanager
+def request_hints(endpoint):
+    """
+    Extra request body with prompt-cache hints for one request to `endpoint`, or None.\n
+    With LLM_BACKEND=llamacpp the server is asked to keep the prompt cache, and with
+    LLM_SLOTS set the request holds one of the server's slots until it completes.
+    """
+    load_settings()
+    if not LLM_SLOTS or LLM_BACKEND != "llamacpp":
+        yield cache_hints(LLM_BACKEND)
+        return
+    key = endpoint.base_url if endpoint is not None else BASE_URL
+    pool = slot_pools.get(key)
+    if pool is None:
+        pool = slot_pools[key] = SlotPool(LLM_SLOTS)
+    with pool.acquire() as slot:
+        yield cache_hints(LLM_BACKEND, slot)
+
+@asynccontextmanager
+async def acquire_endpoint():
+    """
+    Holds a pool endpoint for one request (least outstanding requests first), or yields
+    None when no pool is configured.
+    """
+    pool = get_endpoint_pool()
+    if pool is None:
+        yield None
+        return
+    async with pool.acquire() as endpoint:
+        yield endpoint
+
+def client_for(endpoint):
+    if endpoint is None:
+        return get_client()
+    return endpoint.get_client(OPENAI_API_KEY, get_transport_config())
+
+def agent_model_for(endpoint):
+    if endpoint is None:
+        return get_agent_model()
+    return endpoint.get_agent_model(MODEL_NAME, OPENAI_API_KEY, get_transport_config())
 
 # -----------------------------------------------------
 #  CHAT COMPLETION MODE
 # -----------------------------------------------------
-async def run_chat(messages, max_response_tokens=DEFAULT_RESPONSE_TOKENS):
+async def aclose_clients():
+    """
+    Closes the shared HTTP connection pool(s). Call once on shutdown.
+    """
+    global client, agent_model
+    if endpoint_pool is not None:
+        for endpoint in endpoint_pool.endpoints:
+            if endpoint.client is not None:
+                try:
+                    await endpoint.client.close()
+                except Exception as e:
+                    logging.warning(f"Closing the HTTP pool of {endpoint.base_url} failed: {e}")
+                endpoint.client = None
+                endpoint.agent_model = None
+    if client is not None and hasattr(client, "close"):
+        try:
+            await client.close()
+        except Exception as e:
+            logging.warning(f"Closing the HTTP pool failed: {e}")
+    client = None
+    agent_model = None
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide LLM response cache, opening it on first use.
+    """
+    global response_cache
+    if response_cache is None:
+        response_cache = ResponseCache()
+    return response_cache
+
+def usage_to_dict(usage) -> Optional[dict]:
+    """
+    Normalizes chat-completions or Agents usage objects to prompt/completion/total token counts,
+    plus the prompt tokens the server served from its prompt cache.
+    """
+    if usage is None:
+        return None
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if prompt_tokens is None:
+        prompt_tokens = getattr(usage, "input_tokens", 0)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if completion_tokens is None:
+        completion_tokens = getattr(usage, "output_tokens", 0)
+    details = getattr(usage, "prompt_tokens_details", None) or getattr(usage, "input_tokens_details", None)
+    return {
+        "prompt_tokens": prompt_tokens or 0,
+        "completion_tokens": completion_tokens or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+    }
+
+async def run_chat(messages, max_response_tokens=DEFAULT_RESPONSE_TOKENS, temperature=DEFAULT_TEMPERATURE) -> LLMResult:
     """
     Run an async chat completion using the AsyncOpenAI client.
 
     `max_response_tokens` controls the `max_tokens` parameter sent to the
     remote endpoint. The client is already async, so we await it directly.
+    Never raises for request failures: the returned LLMResult says whether
+    the call succeeded, can be retried, failed for good or was truncated.
     """
     try:
-        resp = await client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            max_tokens=max_response_tokens,
-            temperature=0.7,
+        async with acquire_endpoint() as endpoint:
+            with request_hints(endpoint) as extra_body:
+                resp = await asyncio.wait_for(
+                    client_for(endpoint).chat.completions.create(
+                        **get_request_template().request(messages, max_response_tokens, temperature, extra_body)
+                    ),
+                    timeout=timeout_for(get_transport_config().total_timeout),
+                )
+        choice = resp.choices[0]
+        return LLMResult.from_text(
+            choice.message.content,
+            finish_reason=getattr(choice, "finish_reason", None),
+            usage=usage_to_dict(getattr(resp, "usage", None)),
         )
-        return resp.choices[0].message.content.strip()
     except Exception as e:
-        return f"ERROR: Unexpected error: {e}"
+        return LLMResult.from_exception(e)
 
-async def run_openai_chat(prompt, user_prompt):
+async def run_openai_chat(prompt, user_prompt) -> LLMResult:
     """
     Run an async chat completion using the AsyncOpenAI client.
     """
-    agent = Agent(
-        name="Book Reader", 
-        instructions=prompt, 
-        model=agent_model
-        )
-    
-    result = await Runner.run(agent, user_prompt)
+    from agents import Agent, ModelSettings, Runner
+
+    try:
+        async with acquire_endpoint() as endpoint:
+            with request_hints(endpoint) as extra_body:
+                agent = Agent(
+                    name="Book Reader", 
+                    instructions=prompt, 
+                    model=agent_model_for(endpoint),
+                    model_settings=ModelSettings(extra_body=extra_body)
+                    )
+                result = await asyncio.wait_for(Runner.run(agent, user_prompt), timeout=timeout_for(get_transport_config().total_timeout))
+    except Exception as e:
+        return LLMResult.from_exception(e)
+
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    return LLMResult.from_text(result.final_output, usage=usage_to_dict(usage))
+
+def get_request_template():
+    """
+    The prebuilt request template of MODEL_NAME in the configured prompt layout.
+    """
+    load_settings()
+    return request_template(MODEL_NAME, PROMPT_LAYOUT)
+
+def build_messages(prompt, user_prompt) -> list:
+    """
+    Chat messages for a system prompt + user prompt; some local models only accept user messages.
+    """
+    return get_request_template().messages(prompt, user_prompt)
 
-    return result.final_output
+def _cache_key(cache_mode, prompt, user_prompt, max_response_tokens, method, temperature) -> Optional[str]:
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode {cache_mode!r}, expected one of {CACHE_MODES}")
+    if cache_mode == "bypass":
+        return None
+    return make_cache_key(MODEL_NAME, method, prompt, user_prompt, max_response_tokens, temperature)
 
 async def run_summarize_llm(
         prompt, 
         user_prompt=TASK_INSTRUCTION, 
         max_response_tokens=DEFAULT_RESPONSE_TOKENS, 
-        method="openai_agents"
-    ) -> str:
+        method="openai_agents",
+        temperature=DEFAULT_TEMPERATURE,
+        cache_mode=None
+    ) -> LLMResult:
+    """
+    Run summarization using the specified method.\n
+    Returns an LLMResult (a str tagged with its status, usage and finish reason).\n
+    Responses are cached by a hash of (model, method, prompts, max tokens, temperature);
+    `cache_mode` ("use", "refresh" or "bypass") overrides the LLM_CACHE_MODE setting.
+    """
+    load_settings()
+    cache_mode = cache_mode or LLM_CACHE_MODE
+    key = _cache_key(cache_mode, prompt, user_prompt, max_response_tokens, method, temperature)
+    if cache_mode == "use":
+        cached = await asyncio.to_thread(get_response_cache().get, key)
+        if cached is not None:
+            response = LLMResult(cached, LLMStatus.OK, cached=True)
+            metrics.record_llm_result(method, response)
+            return response
+
+    started = time.perf_counter()
+    with tracing.span("llm", method=method) as span_args:
+        response = as_llm_result(await _run_summarize_llm_uncached(prompt, user_prompt, max_response_tokens, method, temperature))
+        span_args.update(status=response.status, usage=response.usage)
+    metrics.record_llm_result(method, response, time.perf_counter() - started)
+
+    # Only complete answers are cached: failures and truncated output are asked again next run
+    if key is not None and response.ok:
+        await asyncio.to_thread(get_response_cache().put, key, str(response))
+    return response
+
+async def _run_summarize_llm_uncached(prompt, user_prompt, max_response_tokens, method, temperature) -> LLMResult:
     """
-    Run summarization using the specified method.
+    Dispatch the request to the selected backend, without caching.\n
+    No tools or guardrails are used, so "openai_agents" requests are sent as a single chat
+    completion too, unless LLM_ENGINE=agents asks for the Agents runtime.
     """
-    
-    if method == "openai_agents":
+    if method == "openai_agents" and LLM_ENGINE == "agents":
         return await run_openai_chat(prompt, user_prompt)
+    messages = build_messages(prompt, user_prompt)
+    return await run_chat(messages, max_response_tokens=max_response_tokens, temperature=temperature)
+
+# -----------------------------------------------------
+#  STREAMING MODE
+# -----------------------------------------------------
+async def _within(awaitable, timeout_at: Optional[float]):
+    """
+    Awaits `awaitable`, raising TimeoutError once time.monotonic() passes `timeout_at` (None: unbounded).
+    """
+    if timeout_at is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout=max(0.0, timeout_at - time.monotonic()))
+
+async def _stream_within(stream, timeout_at: Optional[float]) -> AsyncIterator:
+    """
+    Re-yields the async iterable `stream`, raising TimeoutError when its next item (the
+    first one included) is not there by `timeout_at`.
+    """
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            item = await _within(iterator.__anext__(), timeout_at)
+        except StopAsyncIteration:
+            return
+        yield item
+
+def _stream_timeout_at() -> Optional[float]:
+    # The total timeout of a request covers a stream from the request to its last token
+    timeout = timeout_for(get_transport_config().total_timeout)
+    return None if timeout is None else time.monotonic() + timeout
+
+async def stream_chat(
+        messages,
+        max_response_tokens=DEFAULT_RESPONSE_TOKENS,
+        temperature=DEFAULT_TEMPERATURE,
+        outcome: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+    """
+    Streams a chat completion, yielding text deltas as the endpoint produces them.\n
+    Request errors are raised, since partial output may already have been shown. The first
+    token and the whole stream must arrive within the request's total timeout. The stream's
+    finish reason ("stop", "length", ...) is stored in `outcome["finish_reason"]`.
+    """
+    timeout_at = _stream_timeout_at()
+    async with acquire_endpoint() as endpoint:
+        with request_hints(endpoint) as extra_body:
+            stream = await _within(
+                client_for(endpoint).chat.completions.create(
+                    **get_request_template().request(messages, max_response_tokens, temperature, extra_body, stream=True)
+                ),
+                timeout_at,
+            )
+            async for event in _stream_within(stream, timeout_at):
+                if not event.choices:
+                    continue
+                choice = event.choices[0]
+                if getattr(choice, "finish_reason", None) and outcome is not None:
+                    outcome["finish_reason"] = choice.finish_reason
+                if choice.delta.content:
+                    yield choice.delta.content
+
+async def stream_openai_chat(prompt, user_prompt) -> AsyncIterator[str]:
+    """
+    Streams an Agents run, yielding the model's text deltas, within the request's total timeout.
+    """
+    from agents import Agent, ModelSettings, Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    timeout_at = _stream_timeout_at()
+    async with acquire_endpoint() as endpoint:
+        with request_hints(endpoint) as extra_body:
+            agent = Agent(
+                name="Book Reader", 
+                instructions=prompt, 
+                model=agent_model_for(endpoint),
+                model_settings=ModelSettings(extra_body=extra_body)
+                )
+
+            result = Runner.run_streamed(agent, user_prompt)
+            try:
+                async for event in _stream_within(result.stream_events(), timeout_at):
+                    if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent) and event.data.delta:
+                        yield event.data.delta
+            finally:
+                # Stops the run's background task when the stream times out or is abandoned
+                result.cancel()
+
+async def stream_summarize_llm(
+        prompt, 
+        user_prompt=TASK_INSTRUCTION, 
+        max_response_tokens=DEFAULT_RESPONSE_TOKENS, 
+        method="openai_agents",
+        temperature=DEFAULT_TEMPERATURE,
+        cache_mode=None,
+        outcome: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of `run_summarize_llm`: yields text deltas.\n
+    A cached response is yielded in one piece. How the stream ended goes into `outcome`:
+    "finish_reason" and "cached". Like a normal call, only a stream that ended with
+    finish_reason "stop" is cached; output cut off at max_tokens is not. The Agents
+    stream does not report a finish reason, so it is never cached.
+    """
+    load_settings()
+    outcome = {} if outcome is None else outcome
+    cache_mode = cache_mode or LLM_CACHE_MODE
+    key = _cache_key(cache_mode, prompt, user_prompt, max_response_tokens, method, temperature)
+    if cache_mode == "use":
+        cached = await asyncio.to_thread(get_response_cache().get, key)
+        if cached is not None:
+            outcome.update(finish_reason="stop", cached=True)
+            yield cached
+            return
+
+    if method == "openai_agents" and LLM_ENGINE == "agents":
+        stream = stream_openai_chat(prompt, user_prompt)
     else:
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": f"""
-                {user_prompt}
-                """
-            }
-        ]
-        if (MODEL_NAME == "medra27b-i1") or (MODEL_NAME == "mistral-7b"):
-            messages = [
-                {"role": "user", "content": f"""
-                    {prompt} 
-                    {user_prompt}
-                    """
-                }
-            ]
-
-        return await run_chat(messages, max_response_tokens=max_response_tokens)
\ No newline at end of file
+        stream = stream_chat(build_messages(prompt, user_prompt), max_response_tokens=max_response_tokens, temperature=temperature, outcome=outcome)
+
+    parts = []
+    async for delta in stream:
+        parts.append(delta)
+        yield delta
+
+    text = "".join(parts).strip()
+    if key is not None and text and outcome.get("finish_reason") == "stop":
+        await asyncio.to_thread(get_response_cache().put, key, text)
@@ -0,0 +1,109 @@
+# llm_result.py
+
+from typing import Optional
+
+from src.llm.concurrency import is_overload_error
+
+
+class LLMStatus:
+    OK = "ok"
+    RETRYABLE = "retryable"   # transport errors, timeouts, 429/5xx, empty output: try again later
+    FATAL = "fatal"           # bad request, auth, context overflow: retrying will not help
+    TRUNCATED = "truncated"   # the model hit max_tokens; the text is usable but incomplete
+
+
+# Exception class names (openai / httpx / endpoint pool) that mean the request never completed
+_TRANSPORT_ERRORS = (
+    "APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout",
+    "ReadError", "ReadTimeout", "RemoteProtocolError", "PoolTimeout", "CircuitOpenError",
+)
+
+
+class LLMResult(str):
+    """
+    Text returned by the LLM layer, tagged with how the request ended.\n
+    It is a `str` so existing callers keep working; failed requests carry the
+    familiar "ERROR: ..." text and a non-OK `status`.
+    """
+
+    status: str
+    error: Optional[str]
+    status_code: Optional[int]
+    overload: bool
+    finish_reason: Optional[str]
+    usage: Optional[dict]
+    cached: bool
+
+    def __new__(
+            cls,
+            text,
+            status=LLMStatus.OK,
+            error=None,
+            status_code=None,
+            overload=False,
+            finish_reason=None,
+            usage=None,
+            cached=False
+        ):
+        result = super().__new__(cls, text)
+        result.status = status
+        result.error = error
+        result.status_code = status_code
+        result.overload = overload
+        result.finish_reason = finish_reason
+        result.usage = usage
+        result.cached = cached
+        return result
+
+    @property
+    def ok(self) -> bool:
+        return self.status == LLMStatus.OK
+
+    @property
+    def usable(self) -> bool:
+        return self.status in (LLMStatus.OK, LLMStatus.TRUNCATED)
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == LLMStatus.RETRYABLE
+
+    @classmethod
+    def from_text(cls, text, finish_reason=None, usage=None) -> "LLMResult":
+        """
+        Wraps a model response; empty text is retryable, `finish_reason="length"` is truncated.
+        """
+        text = (text or "").strip()
+        if not text:
+            return cls("", LLMStatus.RETRYABLE, error="empty response", finish_reason=finish_reason, usage=usage)
+        status = LLMStatus.TRUNCATED if finish_reason == "length" else LLMStatus.OK
+        return cls(text, status, finish_reason=finish_reason, usage=usage)
+
+    @classmethod
+    def from_exception(cls, exc) -> "LLMResult":
+        """
+        Classifies a failed request as retryable (transport, timeout, 429/5xx) or fatal.
+        """
+        status_code = getattr(exc, "status_code", None)
+        overload = is_overload_error(exc)
+        retryable = (
+            overload
+            or isinstance(exc, ConnectionError)
+            or type(exc).__name__ in _TRANSPORT_ERRORS
+            or (status_code is not None and status_code >= 500)
+        )
+        return cls(
+            f"ERROR: Unexpected error: {exc}",
+            LLMStatus.RETRYABLE if retryable else LLMStatus.FATAL,
+            error=f"{type(exc).__name__}: {exc}",
+            status_code=status_code,
+            overload=overload,
+        )
+
+
+def as_llm_result(value) -> LLMResult:
+    """
+    Normalizes whatever an LLM call returned (LLMResult, plain str or None) into an LLMResult.
+    """
+    if isinstance(value, LLMResult):
+        return value
+    return LLMResult.from_text(value)
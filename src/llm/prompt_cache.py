@@ -0,0 +1,46 @@
+# prompt_cache.py
+
+from contextlib import contextmanager
+from typing import Optional
+
+# Backends that understand prompt-cache hints in the request body
+LLM_BACKENDS = ("openai", "llamacpp")
+
+
+class SlotPool:
+    """
+    Stable server slot ids for llama.cpp's `id_slot`: each request takes the lowest free id,
+    so with K requests in flight the same K slots keep being reused and each one keeps the
+    shared instruction prefix in its KV cache. When every id is taken the request gets
+    None and the server picks a slot itself.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._free = set(range(slots))
+
+    @contextmanager
+    def acquire(self):
+        slot = min(self._free) if self._free else None
+        if slot is not None:
+            self._free.discard(slot)
+        try:
+            yield slot
+        finally:
+            if slot is not None:
+                self._free.add(slot)
+
+
+def cache_hints(backend, slot: Optional[int] = None) -> Optional[dict]:
+    """
+    Extra request body asking the server to keep and reuse the prompt's KV cache, or None
+    for backends that would reject unknown fields (the OpenAI API).
+    """
+    if backend == "llamacpp":
+        hints = {"cache_prompt": True}
+        if slot is not None:
+            hints["id_slot"] = slot
+        return hints
+    if backend != "openai":
+        raise ValueError(f"Unknown LLM backend {backend!r}, expected one of {LLM_BACKENDS}")
+    return None
@@ -1,6 +1,11 @@
 # prompts_utils.py
 
-from src.constants.prompt_constants import DEFAULT_PRESENTATION_PROMPT, DEFAULT_SUMMARY_PROMPT
+from src.constants.prompt_constants import DEFAULT_PRESENTATION_PROMPT, DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION
+
+# "inline": the source text goes inside the system prompt, after the instructions.
+# "prefix": the system prompt is only the instructions, identical for every request, and the
+# source text comes last in the user message, so the server can reuse the cached prefix.
+PROMPT_LAYOUTS = ("inline", "prefix")
 
 def getPresentationPrompt (summary, impressions, presentation_prompt=DEFAULT_PRESENTATION_PROMPT) :
   prompt = f"""
@@ -27,4 +32,23 @@ def getChunkPrompt (chunk, chunk_prompt=DEFAULT_SUMMARY_PROMPT) :
     ### Materialul sursă:
     \"\"\"{chunk}\"\"\"
     """
-  return prompt
\ No newline at end of file
+  return prompt
+
+def getSourceMessage (source, user_prompt=TASK_INSTRUCTION) :
+  prompt = f"""{user_prompt.strip()}
+
+### Materialul sursă:
+\"\"\"{source}\"\"\"
+"""
+  return prompt
+
+def layoutPrompt (source, instructions, user_prompt=TASK_INSTRUCTION, layout="inline", wrap=getChunkPrompt) :
+  """
+  (system prompt, user prompt) for summarizing `source` with `instructions` in the given layout.\n
+  `wrap` builds the inline system prompt (`getChunkPrompt` or `getSummaryPromt`).
+  """
+  if layout == "prefix":
+    return instructions.strip(), getSourceMessage(source, user_prompt)
+  if layout != "inline":
+    raise ValueError(f"Unknown prompt layout {layout!r}, expected one of {PROMPT_LAYOUTS}")
+  return wrap(source, instructions), user_prompt
@@ -0,0 +1,57 @@
+# request_template.py
+
+from functools import lru_cache
+
+# Local models whose chat template rejects a system message
+USER_ONLY_MODELS = frozenset(("medra27b-i1", "mistral-7b"))
+
+
+class RequestTemplate:
+    """
+    The fixed part of a chat-completions request for one (model, prompt layout), built once
+    and reused by every call: only the prompts, the token limit and the temperature change.
+    """
+
+    __slots__ = ("model", "layout", "user_only", "_static")
+
+    def __init__(self, model, layout="inline"):
+        self.model = model
+        self.layout = layout
+        self.user_only = model in USER_ONLY_MODELS
+        self._static = {"model": model}
+
+    def messages(self, prompt, user_prompt) -> list:
+        """
+        Chat messages for a system prompt + user prompt.\n
+        In the "prefix" layout the prompts are sent verbatim, so every request starts with the
+        same bytes (the instructions) whether or not the model takes a system message.
+        """
+        if self.layout == "prefix":
+            if self.user_only:
+                return [{"role": "user", "content": f"{prompt}\n\n{user_prompt}"}]
+            return [{"role": "system", "content": prompt}, {"role": "user", "content": user_prompt}]
+        if self.user_only:
+            return [{"role": "user", "content": f"\n                {prompt} \n                {user_prompt}\n                "}]
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"\n            {user_prompt}\n            "}
+        ]
+
+    def request(self, messages, max_tokens, temperature, extra_body=None, stream=False) -> dict:
+        """
+        Keyword arguments for `chat.completions.create`.
+        """
+        kwargs = dict(self._static, messages=messages, max_tokens=max_tokens, temperature=temperature)
+        if extra_body is not None:
+            kwargs["extra_body"] = extra_body
+        if stream:
+            kwargs["stream"] = True
+        return kwargs
+
+
+@lru_cache(maxsize=None)
+def request_template(model, layout="inline") -> RequestTemplate:
+    """
+    The shared template of (model, layout).
+    """
+    return RequestTemplate(model, layout)
@@ -0,0 +1,70 @@
+# resilience.py
+
+import logging
+import random
+import time
+
+from src.constants.constants import (
+    CIRCUIT_BREAKER_RESET_SECONDS,
+    CIRCUIT_BREAKER_THRESHOLD,
+    RETRY_BACKOFF_BASE_SECONDS,
+    RETRY_BACKOFF_MAX_SECONDS,
+)
+
+
+def backoff_delay(attempt, base=RETRY_BACKOFF_BASE_SECONDS, cap=RETRY_BACKOFF_MAX_SECONDS, rng=random) -> float:
+    """
+    Exponential backoff with full jitter: a random delay in [0, min(cap, base * 2**attempt)].
+    """
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the endpoint is considered down.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive retryable failures so a run stops quickly when
+    the endpoint is down instead of burning every chunk's retries. After `reset_seconds`
+    one trial request is let through (half-open); a success closes the circuit again.
+    """
+
+    def __init__(self, threshold=CIRCUIT_BREAKER_THRESHOLD, reset_seconds=CIRCUIT_BREAKER_RESET_SECONDS, name="default"):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.name = name
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def check(self):
+        """
+        Raises CircuitOpenError unless a request may be sent now.
+        """
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at >= self.reset_seconds and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        raise CircuitOpenError(f"Endpoint '{self.name}' unavailable after {self.failures} consecutive failures")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logging.info(f"Circuit [{self.name}] closed.")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or (self.opened_at is None and self.failures >= self.threshold):
+            logging.error(f"ERROR: Circuit [{self.name}] open after {self.failures} consecutive failures.")
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
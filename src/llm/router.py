@@ -0,0 +1,217 @@
+# router.py
+
+import asyncio
+import logging
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from src.constants.constants import (
+    DEFAULT_ENDPOINT_CONCURRENCY,
+    DEFAULT_ENDPOINT_WEIGHT,
+    ENDPOINT_EJECT_SECONDS,
+    ENDPOINT_EJECT_THRESHOLD,
+)
+from src.llm.resilience import CircuitBreaker, CircuitOpenError
+
+
+class Endpoint:
+    """
+    One OpenAI-compatible server in the pool, with its weight, concurrency cap and health.\n
+    The AsyncOpenAI client (and its Agents model) are created on first use.
+    """
+
+    def __init__(
+            self,
+            base_url,
+            weight=DEFAULT_ENDPOINT_WEIGHT,
+            max_concurrency=DEFAULT_ENDPOINT_CONCURRENCY,
+            api_key=None,
+            eject_threshold=ENDPOINT_EJECT_THRESHOLD,
+            eject_seconds=ENDPOINT_EJECT_SECONDS
+        ):
+        if weight <= 0 or max_concurrency < 1:
+            raise ValueError(f"Endpoint {base_url}: weight must be > 0 and max_concurrency >= 1")
+        self.base_url = base_url
+        self.weight = float(weight)
+        self.max_concurrency = int(max_concurrency)
+        self.api_key = api_key
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.breaker = CircuitBreaker(threshold=eject_threshold, reset_seconds=eject_seconds, name=base_url)
+        self.client = None
+        self.agent_model = None
+
+    @property
+    def healthy(self) -> bool:
+        return not self.breaker.is_open
+
+    def score(self) -> float:
+        # Weighted least-outstanding-requests: the load this request would add, per unit of weight
+        return (self.outstanding + 1) / self.weight
+
+    def get_client(self, api_key, transport_config):
+        if self.client is None:
+            from openai import AsyncOpenAI
+            from src.llm.transport import TransportConfig, build_http_client
+
+            config = TransportConfig(**{**vars(transport_config), "pool_size": self.max_concurrency})
+            self.client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key or api_key or "none",
+                http_client=build_http_client(config)
+            )
+        return self.client
+
+    def get_agent_model(self, model_name, api_key, transport_config):
+        if self.agent_model is None:
+            from agents import OpenAIChatCompletionsModel
+            self.agent_model = OpenAIChatCompletionsModel(
+                model=model_name,
+                openai_client=self.get_client(api_key, transport_config)
+            )
+        return self.agent_model
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "outstanding": self.outstanding,
+            "completed": self.completed,
+            "failed": self.failed,
+            "healthy": self.healthy,
+        }
+
+
+def parse_endpoints(spec) -> List[Endpoint]:
+    """
+    Parses "url[|weight[|max_concurrency]]" entries separated by commas, e.g.\n
+    "http://box1:8080/v1|2|8,http://box2:8080/v1".
+    """
+    endpoints = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, *options = [part.strip() for part in entry.split("|")]
+        weight = float(options[0]) if len(options) > 0 and options[0] else DEFAULT_ENDPOINT_WEIGHT
+        max_concurrency = int(options[1]) if len(options) > 1 and options[1] else DEFAULT_ENDPOINT_CONCURRENCY
+        endpoints.append(Endpoint(url, weight=weight, max_concurrency=max_concurrency))
+    return endpoints
+
+
+class EndpointPool:
+    """
+    Routes each request to the endpoint with the fewest outstanding requests (per unit of
+    weight) that is under its concurrency cap.\n
+    An endpoint is ejected after `eject_threshold` consecutive transport/5xx/429 failures.
+    After `eject_seconds` the next request is sent to it as a passive health check, and
+    a success re-admits it. Requests wait when every healthy endpoint is at its cap, and
+    fail with CircuitOpenError when every endpoint is ejected.
+    """
+
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self._waiters = deque()
+
+    @classmethod
+    def from_env(cls) -> Optional["EndpointPool"]:
+        """
+        Builds a pool from LLM_ENDPOINTS, or returns None when it is not set.
+        """
+        spec = os.getenv("LLM_ENDPOINTS", "").strip()
+        return cls(parse_endpoints(spec)) if spec else None
+
+    @property
+    def capacity(self) -> int:
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    @property
+    def outstanding(self) -> int:
+        return sum(endpoint.outstanding for endpoint in self.endpoints)
+
+    def stats(self) -> List[dict]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _select(self) -> Optional[Endpoint]:
+        """
+        Picks the least-loaded admissible endpoint with a free slot, or None if the caller should wait.\n
+        Raises CircuitOpenError when every endpoint is ejected and nothing is in flight.
+        """
+        for endpoint in sorted(self.endpoints, key=Endpoint.score):
+            if endpoint.outstanding >= endpoint.max_concurrency:
+                continue
+            try:
+                endpoint.breaker.check()
+            except CircuitOpenError:
+                continue
+            return endpoint
+        if not any(endpoint.healthy for endpoint in self.endpoints) and self.outstanding == 0:
+            raise CircuitOpenError(f"All {len(self.endpoints)} endpoints are ejected")
+        return None
+
+    async def _acquire(self) -> Endpoint:
+        while True:
+            endpoint = self._select()
+            if endpoint is not None:
+                endpoint.outstanding += 1
+                return endpoint
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # Bounded, so admission is re-checked when an ejection ends even if no request completes
+                await asyncio.wait_for(waiter, min(endpoint.breaker.reset_seconds for endpoint in self.endpoints))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _release(self, endpoint: Endpoint):
+        endpoint.outstanding -= 1
+        # With every endpoint ejected, wake all waiters: each one either gets the health
+        # check or fails with CircuitOpenError, instead of waiting on a release that never comes
+        wake_all = not any(endpoint.healthy for endpoint in self.endpoints)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                if not wake_all:
+                    break
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Holds a slot on the chosen endpoint for one request and records its outcome.\n
+        Only retryable failures (transport, timeouts, 429/5xx) count against an endpoint's health.
+        """
+        from src.llm.llm_result import LLMResult
+
+        endpoint = await self._acquire()
+        try:
+            yield endpoint
+        except asyncio.CancelledError:
+            if endpoint.breaker.is_open:
+                # A cancelled health check counts as failed, so the endpoint is probed again later
+                endpoint.breaker.record_failure()
+            raise
+        except BaseException as e:
+            endpoint.failed += 1
+            if LLMResult.from_exception(e).retryable:
+                was_healthy = endpoint.healthy
+                endpoint.breaker.record_failure()
+                if was_healthy and not endpoint.healthy:
+                    logging.warning(f"Endpoint {endpoint.base_url} ejected after {endpoint.breaker.failures} consecutive failures.")
+            else:
+                endpoint.breaker.record_success()
+            raise
+        else:
+            endpoint.completed += 1
+            endpoint.breaker.record_success()
+        finally:
+            self._release(endpoint)
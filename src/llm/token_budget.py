@@ -0,0 +1,233 @@
+# token_budget.py
+
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from src.constants.constants import (
+    DEFAULT_CONTEXT_TOKENS,
+    ESTIMATE_BYTES_PER_TOKEN,
+    MESSAGE_OVERHEAD_TOKENS,
+    PROMPT_SAFETY_TOKENS,
+    TOKENIZER_SAMPLE_CHARS,
+    TOKENIZER_SAMPLE_WINDOWS,
+)
+from src.llm.prompts_utils import getChunkPrompt, layoutPrompt
+from src.utils.chunk_utils import chunk_spans, iter_chunks
+
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+
+class PromptTooLongError(ValueError):
+    """
+    Raised before a request is sent when the prompt and the reserved response do not fit
+    in the model context.
+    """
+
+    def __init__(self, tokens, limit, what="prompt"):
+        self.tokens = tokens
+        self.limit = limit
+        super().__init__(f"The {what} needs {tokens} tokens but only {limit} are available")
+
+
+class EstimateTokenizer:
+    """
+    Fallback when no tokenizer is configured: UTF-8 bytes / `bytes_per_token`.\n
+    Counting bytes rather than characters charges Romanian diacritics (ă, â, î, ș, ț), which
+    BPE vocabularies split into more tokens than plain ASCII, closer to what they cost.
+    """
+
+    name = "estimate"
+
+    def __init__(self, bytes_per_token=ESTIMATE_BYTES_PER_TOKEN):
+        self.bytes_per_token = bytes_per_token
+
+    def count(self, text) -> int:
+        return math.ceil(len(text.encode("utf-8")) / self.bytes_per_token)
+
+
+class FileTokenizer:
+    """
+    The model's own tokenizer loaded from a local `tokenizer.json` (needs the `tokenizers` package).
+    """
+
+    def __init__(self, path):
+        from tokenizers import Tokenizer
+        self.name = f"file:{os.path.basename(path)}"
+        self._tokenizer = Tokenizer.from_file(path)
+        self.count = lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(self._count)
+
+    def _count(self, text) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def tokenize_url(base_url) -> str:
+    """
+    The /tokenize route of an OpenAI-compatible server: llama.cpp and vLLM serve it at the
+    server root, next to (not under) /v1.
+    """
+    root = base_url.rstrip("/")
+    if root.endswith("/v1"):
+        root = root[:-len("/v1")]
+    return f"{root}/tokenize"
+
+
+class EndpointTokenizer:
+    """
+    Counts tokens with the serving endpoint's /tokenize route, so counts match the loaded
+    model exactly. Accepts llama.cpp ({"tokens": [...]}) and vLLM ({"count": n}) replies.\n
+    Every distinct text is one HTTP call; counts are memoized.
+    """
+
+    def __init__(self, url, model=None, timeout=30.0, client=None):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.name = f"endpoint:{url}"
+        self._client = client
+        self.count = lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(self._count)
+
+    def _count(self, text) -> int:
+        if self._client is None:
+            import httpx
+            self._client = httpx.Client(timeout=self.timeout)
+        payload = {"content": text, "prompt": text, "add_special": False}
+        if self.model:
+            payload["model"] = self.model
+        response = self._client.post(self.url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        if "count" in data:
+            return int(data["count"])
+        return len(data["tokens"])
+
+
+def load_tokenizer(spec=None, base_url=None, model=None):
+    """
+    Builds the tokenizer named by `spec` (the LLM_TOKENIZER setting):\n
+    unset or "estimate" -> EstimateTokenizer; "endpoint" -> the /tokenize route of `base_url`;
+    an http(s) URL -> that tokenize route; anything else -> a local tokenizer.json path.
+    """
+    if not spec or spec == "estimate":
+        return EstimateTokenizer()
+    if spec == "endpoint":
+        if not base_url:
+            raise ValueError("LLM_TOKENIZER=endpoint needs BASE_URL")
+        return EndpointTokenizer(tokenize_url(base_url), model=model)
+    if spec.startswith(("http://", "https://")):
+        return EndpointTokenizer(spec, model=model)
+    return FileTokenizer(spec)
+
+
+class TokenBudget:
+    """
+    Prompt budget of one model: the context window minus the expected response, the chat
+    framing and a safety margin, measured with the model's tokenizer.\n
+    Used to size chunks before a run and to reject or split prompts before they are sent,
+    instead of finding out from a failed round trip.
+    """
+
+    def __init__(self, tokenizer=None, context_tokens=DEFAULT_CONTEXT_TOKENS, safety_tokens=PROMPT_SAFETY_TOKENS, model=None):
+        self.tokenizer = tokenizer or EstimateTokenizer()
+        self.context_tokens = context_tokens
+        self.safety_tokens = safety_tokens
+        self.model = model
+
+    @classmethod
+    def from_env(cls, model=None, base_url=None) -> Optional["TokenBudget"]:
+        """
+        Reads LLM_CONTEXT_TOKENS (the model's context window), LLM_TOKENIZER and
+        LLM_PROMPT_SAFETY_TOKENS. Returns None when LLM_CONTEXT_TOKENS is not set.
+        """
+        context_tokens = os.getenv("LLM_CONTEXT_TOKENS")
+        if not context_tokens:
+            return None
+        tokenizer = load_tokenizer(os.getenv("LLM_TOKENIZER"), base_url=base_url, model=model)
+        safety = os.getenv("LLM_PROMPT_SAFETY_TOKENS")
+        budget = cls(
+            tokenizer,
+            context_tokens=int(context_tokens),
+            safety_tokens=int(safety) if safety else PROMPT_SAFETY_TOKENS,
+            model=model
+        )
+        logging.info(f"Token budget: {budget.context_tokens} context tokens for {model}, tokenizer {budget.tokenizer.name}")
+        return budget
+
+    def count(self, text) -> int:
+        return self.tokenizer.count(text)
+
+    def prompt_tokens(self, prompt, user_prompt) -> int:
+        """
+        Tokens of a system prompt + user prompt request, chat template included.
+        """
+        return self.count(prompt) + self.count(user_prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def available(self, max_response_tokens) -> int:
+        """
+        Prompt tokens left once the response and the safety margin are reserved.
+        """
+        return self.context_tokens - max_response_tokens - self.safety_tokens
+
+    def fits(self, prompt, user_prompt, max_response_tokens) -> bool:
+        return self.prompt_tokens(prompt, user_prompt) <= self.available(max_response_tokens)
+
+    def check(self, prompt, user_prompt, max_response_tokens) -> int:
+        """
+        Returns the prompt's token count, or raises PromptTooLongError if it does not fit.
+        """
+        tokens = self.prompt_tokens(prompt, user_prompt)
+        limit = self.available(max_response_tokens)
+        if tokens > limit:
+            raise PromptTooLongError(tokens, limit)
+        return tokens
+
+    def content_tokens(self, instructions, user_prompt, max_response_tokens, wrap: Callable = getChunkPrompt, layout="inline") -> int:
+        """
+        Tokens left for the source text inside a `wrap(text, instructions)` prompt
+        (`getChunkPrompt` for chunks, `getSummaryPromt` for reduces) laid out as `layout`.
+        """
+        overhead = self.prompt_tokens(*layoutPrompt("", instructions, user_prompt, layout=layout, wrap=wrap))
+        limit = self.available(max_response_tokens)
+        if overhead >= limit:
+            raise PromptTooLongError(overhead, limit, "prompt template")
+        return limit - overhead
+
+    def chars_per_token(self, text) -> float:
+        """
+        Characters per token of `text`, measured on a few windows spread through it.\n
+        The densest window wins, so a page of diacritics or digits does not overflow a chunk.
+        """
+        if not text:
+            return 1.0
+        step = max(1, len(text) // TOKENIZER_SAMPLE_WINDOWS)
+        ratios = []
+        for start in range(0, len(text), step):
+            sample = text[start:start + TOKENIZER_SAMPLE_CHARS]
+            tokens = self.count(sample)
+            if sample.strip() and tokens:
+                ratios.append(len(sample) / tokens)
+        return min(ratios) if ratios else 1.0
+
+    def max_chars(self, text, instructions, user_prompt, max_response_tokens, wrap: Callable = getChunkPrompt, layout="inline") -> int:
+        """
+        Largest chunk, in characters of `text`, whose wrapped prompt fits the budget.
+        """
+        tokens = self.content_tokens(instructions, user_prompt, max_response_tokens, wrap=wrap, layout=layout)
+        return max(1, int(tokens * self.chars_per_token(text)))
+
+    def fit_chunks(self, chunks, content_tokens) -> List[str]:
+        """
+        Splits every chunk over `content_tokens` at its paragraph/sentence boundaries,
+        measuring in tokens. Chunks that fit are returned unchanged.
+        """
+        fitted = []
+        for chunk in chunks:
+            if self.count(chunk) <= content_tokens:
+                fitted.append(chunk)
+                continue
+            parts = list(iter_chunks(chunk, chunk_spans(chunk, max_len=content_tokens, length_fn=self.count)))
+            logging.info(f"Split a chunk over the token budget into {len(parts)} parts.")
+            fitted.extend(parts)
+        return fitted
@@ -0,0 +1,100 @@
+# transport.py
+
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+import httpx
+from openai import DefaultAsyncHttpxClient, Timeout
+
+from src.constants.constants import (
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_READ_TIMEOUT_SECONDS,
+    HTTP_TOTAL_TIMEOUT_SECONDS,
+    MAX_CONCURRENCY,
+)
+
+
+class TransportConfig:
+    """
+    HTTP settings shared by every OpenAI-compatible request.\n
+    The connection pool is sized to the concurrency limit, so requests the limit lets
+    through never wait for a connection. `read_timeout` bounds the wait for each piece
+    of a (possibly very slow, CPU-bound) response and `total_timeout` bounds the whole request.\n
+    `keepalive_expiry`, `write_timeout` and `http2` are opt-in: left unset, idle connections
+    expire after httpx's default, writes share the read timeout (as in the SDK) and HTTP/1.1 is used.
+    """
+
+    def __init__(
+            self,
+            pool_size=MAX_CONCURRENCY,
+            connect_timeout=HTTP_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=HTTP_READ_TIMEOUT_SECONDS,
+            total_timeout: Optional[float] = HTTP_TOTAL_TIMEOUT_SECONDS,
+            keepalive_expiry: Optional[float] = None,
+            write_timeout: Optional[float] = None,
+            http2=False
+        ):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.write_timeout = write_timeout
+        self.http2 = http2
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        """
+        Sizes the pool to LLM_MAX_CONCURRENCY and reads LLM_HTTP_CONNECT_TIMEOUT,
+        LLM_HTTP_READ_TIMEOUT, LLM_HTTP_TOTAL_TIMEOUT and the opt-in LLM_HTTP_KEEPALIVE_EXPIRY,
+        LLM_HTTP_WRITE_TIMEOUT and LLM_HTTP2 (1/true).
+        """
+        def env_float(key, default):
+            value = os.getenv(key)
+            return float(value) if value else default
+
+        pool_size = os.getenv("LLM_MAX_CONCURRENCY")
+        return cls(
+            pool_size=int(pool_size) if pool_size else MAX_CONCURRENCY,
+            connect_timeout=env_float("LLM_HTTP_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT_SECONDS),
+            read_timeout=env_float("LLM_HTTP_READ_TIMEOUT", HTTP_READ_TIMEOUT_SECONDS),
+            total_timeout=env_float("LLM_HTTP_TOTAL_TIMEOUT", HTTP_TOTAL_TIMEOUT_SECONDS),
+            keepalive_expiry=env_float("LLM_HTTP_KEEPALIVE_EXPIRY", None),
+            write_timeout=env_float("LLM_HTTP_WRITE_TIMEOUT", None),
+            http2=os.getenv("LLM_HTTP2", "").lower() in ("1", "true", "yes"),
+        )
+
+    def timeout(self) -> Timeout:
+        # Waiting for a pooled connection is bounded by the read timeout: our own
+        # concurrency controller is what queues requests, not the pool
+        return Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout if self.write_timeout is None else self.write_timeout,
+            pool=self.read_timeout,
+        )
+
+    def limits(self) -> httpx.Limits:
+        if self.keepalive_expiry is None:
+            return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def build_http_client(config: Optional[TransportConfig] = None) -> DefaultAsyncHttpxClient:
+    """
+    Builds the pooled async HTTP client handed to AsyncOpenAI.\n
+    Uses the SDK's own client class (keeping its redirect and header defaults) with our
+    pool limits and timeouts. HTTP/2 is only enabled when the optional `h2` package is installed.
+    """
+    config = config or TransportConfig.from_env()
+    http2 = config.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logging.warning("LLM_HTTP2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+        http2 = False
+    return DefaultAsyncHttpxClient(limits=config.limits(), timeout=config.timeout(), http2=http2)
@@ -1 +1,5 @@
-from .app_ui import *
+# Submodules are imported on first attribute access (PEP 562) rather than star-imported,
+# so importing one module does not pull in Gradio.
+from src.utils.lazy_utils import lazy_submodules
+
+__getattr__, __dir__ = lazy_submodules(globals(), ("app_ui",))
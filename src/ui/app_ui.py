@@ -3,7 +3,7 @@
 # Importing Gradio (used to build the UI)
 import gradio as gr
 
-from .ui_actions import generate_presentation, process_pdf, test_process_pdf
+from .ui_actions import cancel_job, generate_presentation, process_pdf, test_process_pdf
 from src.constants.constants import DEFAULT_MAX_CHARACTER_PER_CHUNK, DEFAULT_RESPONSE_TOKENS, SUMMARY_PLACEHOLDER
 from src.constants.prompt_constants import DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION
 
@@ -24,6 +24,7 @@ def define_app_ui():
             with gr.Accordion(open=False, label="Advanced Settings"):
                 max_characters_perchunk = gr.Number(label="Characters per chunk", value=DEFAULT_MAX_CHARACTER_PER_CHUNK)  
                 max_response_tokens = gr.Number(label="Maximum tokens for responses", value=DEFAULT_RESPONSE_TOKENS)  
+                resume_run = gr.Checkbox(label="Resume interrupted run", value=True)
                 user_prompt = gr.Textbox(label="User prompt", value=TASK_INSTRUCTION, lines=2, interactive=True)  
                 context_prompt = gr.Textbox(label="Context prompt", value=DEFAULT_SUMMARY_PROMPT, lines=15, interactive=True, buttons=["copy"])  
 
@@ -55,13 +56,21 @@ def define_app_ui():
 
             # Button that triggers processing
             summarize_btn = gr.Button("Summarize PDF")
-            # Bind button -> function with input/output mapping
+            # Id of the summarization job, used to cancel it
+            job_id = gr.Textbox(label="Job", interactive=False)
+            # Bind button -> function with input/output mapping;
+            # jobs of different users run side by side and share the LLM slots
             summarize_btn.click(
                 process_pdf,        # callback function
-                inputs=[pdf_input, context_prompt, context_prompt, user_prompt, max_characters_perchunk, max_response_tokens], # list of UI inputs
-                outputs=[summary_output]  # list of UI outputs
+                inputs=[pdf_input, context_prompt, context_prompt, user_prompt, max_characters_perchunk, max_response_tokens, resume_run], # list of UI inputs
+                outputs=[summary_output, job_id],  # list of UI outputs
+                concurrency_limit=None
             )
 
+            # Button that cancels the job, including its in-flight LLM requests
+            cancel_btn = gr.Button("Cancel")
+            cancel_btn.click(cancel_job, inputs=[job_id], outputs=None)
+
             # Button that triggers processing
             test_summarize_btn = gr.Button("Test Summarizing process")
             test_summarize_btn.click(
@@ -1,40 +1,121 @@
 # ui_actions.py
 
+import asyncio
+import functools
+import logging
 import time
 
 from src.constants.constants import DEFAULT_MAX_CHARACTER_PER_CHUNK, DEFAULT_RESPONSE_TOKENS
 from src.constants.prompt_constants import DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION
 
-from src.utils.presentation_utils import create_presentation
-from src.utils.pdf_utils import chunk_text, extract_pdf_text
+from src.utils.presentation_utils import stream_presentation
+from src.utils.pdf_utils import chunk_text, extract_book_text_async, extract_leading_text_async
 from src.utils.summarize_utils import multi_pass_summarize, summarize_chunk
+from src.utils.job_utils import CANCELLED, DONE, FAILED, Job, get_job_manager
+from src.utils import trace_utils
 
-async def process_pdf(pdf_file, chunk_prompt=DEFAULT_SUMMARY_PROMPT, summary_prompt=DEFAULT_SUMMARY_PROMPT, user_prompt=TASK_INSTRUCTION, max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK, max_response_tokens=DEFAULT_RESPONSE_TOKENS):
+def render_progress(done, total, chunk_summaries, final_text="", eta=None):
     """
-    Called by the UI when user uploads a PDF.\n
-    Extracts text and performs multi-pass summarization.
+    Text shown in the summary box while a run is in progress.
+    """
+    if final_text:
+        return final_text
+    header = f"Summarizing: {done}/{total} chunks done..." if total else "Extracting text..."
+    if eta is not None and done < total:
+        header += f" about {eta:.0f}s left"
+    parts = [header]
+    for index in sorted(chunk_summaries):
+        parts.append(f"--- Chunk {index+1} ---\n{chunk_summaries[index]}")
+    return "\n\n".join(parts)
+
+def render_job(job: Job):
+    """
+    Summary box text for a job: its progress, then its final summary or how it ended.
+    """
+    if job.status == DONE:
+        return job.result
+    if job.status == FAILED:
+        return f"ERROR extracting or summarizing: {job.error}"
+    text = render_progress(job.done, job.total, job.chunk_summaries, job.final_text, job.eta())
+    if job.status == CANCELLED:
+        text = f"Cancelled after {job.done}/{job.total} chunks.\n\n{text}"
+    return text
+
+async def summarize_pdf(job: Job, controller, pdf_path, book_name, chunk_prompt, summary_prompt, max_chars, max_response_tokens, resume):
     """
+    Job body of `process_pdf`: extracts the PDF and summarizes it, reporting to `job`.
+    """
+    # One trace for the whole job: extraction plus the summarization run
+    tracer = trace_utils.Tracer(book_name) if trace_utils.tracing_enabled() else None
     try:
-        # pdf_file is a tempfile object from Gradio.
-        # pdf_file.name gives its actual path.
-        text = extract_pdf_text(pdf_file.name)
+        # Extraction runs in a process pool so the event loop keeps serving other users.
+        started = time.perf_counter()
+        text, normalization = await extract_book_text_async(pdf_path)
+        logging.info(f"Normalization of {book_name}: {normalization}")
+        if tracer is not None:
+            tracer.record("extract", started, lane=trace_utils.RUN_LANE, cat="stage")
 
-        # Perform a multi-pass summary on the entire text (async)
-        summary = await multi_pass_summarize(
+        # Perform a multi-pass summary on the entire text (async); its LLM calls share the
+        # job manager's controller with every other job
+        return await multi_pass_summarize(
             text,
-            summary_file_name=pdf_file.name.split("\\")[-1].split(".")[0],
+            summary_file_name=book_name,
             chunk_prompt=chunk_prompt,
             summary_prompt=summary_prompt,
             max_chars=max_chars,
-            max_response_tokens=max_response_tokens
+            max_response_tokens=max_response_tokens,
+            resume=resume,
+            controller=controller,
+            on_event=job.on_event,
+            tracer=tracer
         )
+    finally:
+        if tracer is not None:
+            tracer.record("process_pdf", tracer.started, lane=trace_utils.RUN_LANE, cat="run")
+            await asyncio.to_thread(tracer.save)
 
-        # Return the summary to Gradio, which will display it.
-        return summary
+async def process_pdf(pdf_file, chunk_prompt=DEFAULT_SUMMARY_PROMPT, summary_prompt=DEFAULT_SUMMARY_PROMPT, user_prompt=TASK_INSTRUCTION, max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK, max_response_tokens=DEFAULT_RESPONSE_TOKENS, resume=True):
+    """
+    Called by the UI when user uploads a PDF.\n
+    Submits a summarization job (see `job_utils`) and streams it: yields (summary box text,
+    job id) with chunk progress and ETA, chunk summaries as they complete and then the
+    final summary token by token.\n
+    With `resume`, chunks already summarized by an interrupted run of the same book are reused.
+    """
+    job = None
+    jobs = get_job_manager()
+    try:
+        # pdf_file is a tempfile object from Gradio.
+        # pdf_file.name gives its actual path.
+        book_name = pdf_file.name.split("\\")[-1].split(".")[0]
+        job_id = jobs.submit(book_name, functools.partial(
+            summarize_pdf,
+            pdf_path=pdf_file.name,
+            book_name=book_name,
+            chunk_prompt=chunk_prompt,
+            summary_prompt=summary_prompt,
+            max_chars=max_chars,
+            max_response_tokens=max_response_tokens,
+            resume=resume
+        ))
+        job = jobs.get(job_id)
+        async for job in job.watch():
+            yield render_job(job), job_id
 
     except Exception as e:
         # Any error while reading/summarizing is returned as text in the UI.
-        return f"ERROR extracting or summarizing: {e}"
+        yield f"ERROR extracting or summarizing: {e}", job.id if job else ""
+    finally:
+        # The user left (or the callback was stopped): do not keep the model busy
+        if job is not None:
+            jobs.cancel(job.id)
+
+def cancel_job(job_id):
+    """
+    UI callback: cancels a summarization job; its in-flight LLM requests are cancelled too.
+    """
+    if job_id and get_job_manager().cancel(job_id.strip()):
+        logging.info(f"Job {job_id} cancelled by the user.")
 
 async def test_process_pdf(pdf_file, chunk_prompt=DEFAULT_SUMMARY_PROMPT, user_prompt=TASK_INSTRUCTION, max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK, max_response_tokens=DEFAULT_RESPONSE_TOKENS):
     """
@@ -50,7 +131,8 @@ async def test_process_pdf(pdf_file, chunk_prompt=DEFAULT_SUMMARY_PROMPT, user_p
     # print(f"Max characters per chunk: {max_chars}")
     # print("===============================")
     try:
-        text = extract_pdf_text(pdf_file.name)
+        # Only chunk 0 is summarized: read just enough pages for it to come out as in a full run
+        text = await extract_leading_text_async(pdf_file.name, 2 * max_chars, normalize=True)
         chunks = chunk_text(text, max_chars)
         start = time.time()
         print("Starting chunking test...")
@@ -68,12 +150,16 @@ async def test_process_pdf(pdf_file, chunk_prompt=DEFAULT_SUMMARY_PROMPT, user_p
 
 async def generate_presentation(summary, impressions):
     """
-    UI callback: combines AI summary + user impressions.
+    UI callback: combines AI summary + user impressions.\n
+    Streams the presentation text into the textbox as it is generated.
     """
+    text = ""
     try:
         # Pass both user text + AI summary to the LLM agent function.
-        return await create_presentation(summary, impressions)
+        async for delta in stream_presentation(summary, impressions):
+            text += delta
+            yield text
 
     except Exception as e:
         # Return readable error to UI.
-        return f"ERROR: {e}"
+        yield f"{text}\n\nERROR: {e}" if text else f"ERROR: {e}"
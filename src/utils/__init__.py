@@ -1,4 +1,5 @@
-from .pdf_utils import *
-from .presentation_utils import *
-from .summarize_utils import *
-from .file_utils import *
+# Submodules are imported on first attribute access (PEP 562) rather than star-imported,
+# so importing one module does not pull in PyMuPDF, the OpenAI SDK or the Agents SDK.
+from .lazy_utils import lazy_submodules
+
+__getattr__, __dir__ = lazy_submodules(globals(), ("pdf_utils", "presentation_utils", "summarize_utils", "file_utils"))
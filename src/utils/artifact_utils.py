@@ -0,0 +1,279 @@
+# artifact_utils.py
+
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import List, Optional
+
+from src.constants.constants import ARTIFACT_COMPRESS_MIN_BYTES, ARTIFACT_DB_PATH, ARTIFACT_WRITE_BATCH
+
+ZLIB_LEVEL = 6
+BUSY_TIMEOUT_SECONDS = 30.0
+
+# The run whose artifacts are being recorded; asyncio tasks inherit it like the tracer
+current_run: contextvars.ContextVar = contextvars.ContextVar("current_artifact_run", default=None)
+
+artifact_store = None
+
+
+def artifacts_enabled() -> bool:
+    """
+    Run artifacts are recorded unless ARTIFACT_STORE is 0/false.
+    """
+    return os.getenv("ARTIFACT_STORE", "1").lower() not in ("0", "false", "no")
+
+
+def new_run_id() -> str:
+    """
+    A unique, time-sortable run id: two runs started in the same second never collide.
+    """
+    return f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}"
+
+
+def encode_content(content, compress_min_bytes=ARTIFACT_COMPRESS_MIN_BYTES):
+    """
+    (compressed flag, size in bytes, blob): texts of `compress_min_bytes` or more are zlib-compressed.
+    """
+    data = str(content).encode("utf-8")
+    if len(data) >= compress_min_bytes:
+        return 1, len(data), zlib.compress(data, ZLIB_LEVEL)
+    return 0, len(data), data
+
+
+def decode_content(compressed, data) -> str:
+    return (zlib.decompress(data) if compressed else data).decode("utf-8")
+
+
+class ArtifactStore:
+    """
+    Append-only record of every run's prompts, summaries, timings and token usage in one
+    SQLite file, keyed by a unique run id.\n
+    `add` only queues the artifact: one writer thread inserts whatever has queued up in a
+    single transaction, so a run costs a few commits instead of a file per chunk. Large
+    texts are compressed. Safe to call from the event loop and from worker threads.
+    """
+
+    def __init__(self, path=ARTIFACT_DB_PATH, compress_min_bytes=ARTIFACT_COMPRESS_MIN_BYTES, batch_size=ARTIFACT_WRITE_BATCH):
+        self.path = path
+        self.compress_min_bytes = compress_min_bytes
+        self.batch_size = batch_size
+        self.written = 0
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, name TEXT NOT NULL, started REAL NOT NULL, "
+            "finished REAL, status TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, kind TEXT NOT NULL, "
+            "name TEXT NOT NULL, chunk INTEGER, created REAL NOT NULL, elapsed REAL, usage TEXT, "
+            "compressed INTEGER NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts (run_id, kind)")
+        conn.commit()
+        return conn
+
+    # ------------------------------------------------------------------ Writes
+    def _enqueue(self, item):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+                self._writer.start()
+        self._queue.put(item)
+
+    def start_run(self, name) -> str:
+        run_id = new_run_id()
+        self._enqueue(("INSERT INTO runs (run_id, name, started, status) VALUES (?, ?, ?, ?)", (run_id, name, time.time(), "running")))
+        return run_id
+
+    def finish_run(self, run_id, status="ok"):
+        self._enqueue(("UPDATE runs SET finished = ?, status = ? WHERE run_id = ?", (time.time(), status, run_id)))
+
+    def add(self, run_id, kind, name, content, chunk=None, elapsed=None, usage=None):
+        """
+        Queues one artifact of `run_id`, e.g. kind "summary" / name "chunk_3". Returns at once.
+        """
+        compressed, size, data = encode_content(content, self.compress_min_bytes)
+        self._enqueue((
+            "INSERT INTO artifacts (run_id, kind, name, chunk, created, elapsed, usage, compressed, size, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, kind, name, chunk, time.time(), elapsed, json.dumps(usage) if usage else None, compressed, size, data)
+        ))
+
+    def _write_loop(self):
+        conn = self._open()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                with conn:
+                    for item in batch:
+                        if item is not None:
+                            conn.execute(*item)
+                self.written += sum(1 for item in batch if item is not None)
+            except sqlite3.Error as e:
+                logging.error(f"ERROR: Writing {len(batch)} run artifacts failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def flush(self):
+        """
+        Blocks until everything queued so far is written.
+        """
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ----------------------------------------------------------------- Queries
+    def _read(self, sql, args=()) -> List[sqlite3.Row]:
+        self.flush()
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+                self._conn.row_factory = sqlite3.Row
+            return self._conn.execute(sql, args).fetchall()
+
+    def runs(self, name=None, limit=20) -> List[dict]:
+        """
+        The most recent runs (of book `name`), newest first.
+        """
+        where, args = ("WHERE name = ?", (name,)) if name else ("", ())
+        rows = self._read(f"SELECT * FROM runs {where} ORDER BY started DESC, rowid DESC LIMIT ?", (*args, limit))
+        return [dict(row) for row in rows]
+
+    def artifacts(self, run_id, kind=None, with_content=True) -> List[dict]:
+        """
+        The artifacts of a run in the order they were recorded, decompressed.
+        """
+        where, args = ("AND kind = ?", (run_id, kind)) if kind else ("", (run_id,))
+        rows = self._read(f"SELECT * FROM artifacts WHERE run_id = ? {where} ORDER BY id", args)
+        result = []
+        for row in rows:
+            item = {k: row[k] for k in ("kind", "name", "chunk", "created", "elapsed", "size", "compressed")}
+            item["usage"] = json.loads(row["usage"]) if row["usage"] else None
+            if with_content:
+                item["content"] = decode_content(row["compressed"], row["data"])
+            result.append(item)
+        return result
+
+    def content(self, run_id, kind, name) -> Optional[str]:
+        rows = self._read(
+            "SELECT compressed, data FROM artifacts WHERE run_id = ? AND kind = ? AND name = ? ORDER BY id DESC LIMIT 1",
+            (run_id, kind, name)
+        )
+        return decode_content(rows[0]["compressed"], rows[0]["data"]) if rows else None
+
+    def run_stats(self, run_id) -> dict:
+        """
+        Totals of one run for comparing runs: artifact counts per kind, LLM time and tokens.
+        """
+        stats = {"run_id": run_id, "artifacts": {}, "elapsed": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "bytes": 0, "stored_bytes": 0}
+        rows = self._read("SELECT kind, elapsed, usage, size, LENGTH(data) AS stored FROM artifacts WHERE run_id = ?", (run_id,))
+        for row in rows:
+            stats["artifacts"][row["kind"]] = stats["artifacts"].get(row["kind"], 0) + 1
+            stats["elapsed"] += row["elapsed"] or 0.0
+            stats["bytes"] += row["size"]
+            stats["stored_bytes"] += row["stored"]
+            if row["usage"]:
+                usage = json.loads(row["usage"])
+                stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                stats["completion_tokens"] += usage.get("completion_tokens", 0)
+        return stats
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """
+    The process-wide artifact store (ARTIFACT_DB_PATH overrides its file), or None when
+    ARTIFACT_STORE=0. Pending writes are flushed at interpreter exit.
+    """
+    global artifact_store
+    if not artifacts_enabled():
+        return None
+    if artifact_store is None:
+        artifact_store = ArtifactStore(os.getenv("ARTIFACT_DB_PATH") or ARTIFACT_DB_PATH)
+        atexit.register(artifact_store.close)
+    return artifact_store
+
+
+class RunArtifacts:
+    """
+    Handle of the run in progress: records artifacts under its run id.
+    """
+
+    def __init__(self, store: ArtifactStore, run_id):
+        self.store = store
+        self.run_id = run_id
+
+    def record(self, kind, name, content, **fields):
+        self.store.add(self.run_id, kind, name, content, **fields)
+
+
+@contextmanager
+def run(name, store: Optional[ArtifactStore] = None):
+    """
+    Records the artifacts of the `with` block (and of tasks created in it) under a new run
+    id, and the run's end status. Joins the run already active; yields None when disabled.
+    """
+    active = current_run.get()
+    if active is not None:
+        yield active
+        return
+    store = store or get_artifact_store()
+    if store is None:
+        yield None
+        return
+    active = RunArtifacts(store, store.start_run(name))
+    token = current_run.set(active)
+    status = "error"
+    try:
+        yield active
+        status = "ok"
+    finally:
+        current_run.reset(token)
+        store.finish_run(active.run_id, status)
+
+
+def record(kind, name, content, **fields):
+    """
+    Records an artifact of the current run; a no-op outside `run`.
+    """
+    active = current_run.get()
+    if active is not None:
+        active.record(kind, name, content, **fields)
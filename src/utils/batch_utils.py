@@ -0,0 +1,200 @@
+# batch_utils.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from src.constants.constants import BATCH_BOOKS_IN_FLIGHT, BATCH_OUTPUT_DIR, DEFAULT_EXTRACTION_WORKERS
+from src.llm.concurrency import ConcurrencyController
+from src.llm.llm_openAI import get_endpoint_pool
+from src.llm.resilience import CircuitOpenError
+from .checkpoint_utils import atomic_write_text
+from .pdf_utils import extract_book_text
+from .presentation_utils import create_presentation
+from .summarize_utils import multi_pass_summarize
+
+REPORT_FILE_NAME = "run_report.jsonl"
+
+
+class Book:
+    """
+    One PDF of a batch, with optional impressions for its presentation text.\n
+    `name` (output directory, checkpoint and artifact name) is the file stem plus a short
+    hash of the absolute path, so `a/intro.pdf` and `b/intro.pdf` never collide.
+    """
+
+    def __init__(self, path, impressions=None):
+        self.path = os.path.abspath(path)
+        self.impressions = impressions
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self.name = f"{self.title}-{hashlib.sha1(self.path.encode('utf-8')).hexdigest()[:8]}"
+
+
+def discover_books(source) -> List[Book]:
+    """
+    Lists the books of a batch from a directory (every *.pdf below it, sorted) or a manifest file:
+    one PDF path per line, or JSONL objects with "path" and optional "impressions".
+    Relative paths in a manifest are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+        return [Book(p) for p in sorted(paths)]
+
+    base = os.path.dirname(os.path.abspath(source))
+    books = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"path": line}
+            books.append(Book(os.path.join(base, entry["path"]), impressions=entry.get("impressions")))
+    return books
+
+
+def book_output_dir(out_dir, book: Book) -> str:
+    return os.path.join(out_dir, book.name)
+
+
+def read_report(path) -> Dict[str, dict]:
+    """
+    Last report record per book path; a torn last line from a crash is ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def append_report(path, record: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def summarize_book(book: Book, text, out_dir, controller, presentation=False, **summarize_kwargs) -> dict:
+    """
+    Summarizes one extracted book through the shared `controller` and writes its results.\n
+    Returns the book's report record.
+    """
+    stats = {}
+    summary = await multi_pass_summarize(
+        text,
+        summary_file_name=book.name,
+        report=stats,
+        controller=controller,
+        **summarize_kwargs
+    )
+    book_dir = book_output_dir(out_dir, book)
+    outputs = {"summary": os.path.join(book_dir, "summary.txt")}
+    await asyncio.to_thread(atomic_write_text, outputs["summary"], summary)
+
+    if presentation:
+        text_out = await create_presentation(summary, book.impressions or "")
+        outputs["presentation"] = os.path.join(book_dir, "presentation.txt")
+        await asyncio.to_thread(atomic_write_text, outputs["presentation"], str(text_out))
+
+    return {"status": "ok", "outputs": outputs, **stats}
+
+
+async def run_batch(
+        books: List[Book],
+        out_dir=BATCH_OUTPUT_DIR,
+        books_in_flight=BATCH_BOOKS_IN_FLIGHT,
+        extraction_workers=DEFAULT_EXTRACTION_WORKERS,
+        presentation=False,
+        resume=True,
+        normalize=True,
+        controller: Optional[ConcurrencyController] = None,
+        **summarize_kwargs
+    ) -> List[dict]:
+    """
+    Summarizes many books headlessly.\n
+    Extraction runs in one process pool (a book per worker). Up to `books_in_flight` books
+    are summarized at once and every LLM call goes through one shared `controller`, so
+    chunks of different books interleave and keep the endpoint(s) busy.\n
+    Each finished book appends a record to `<out_dir>/run_report.jsonl`. With `resume`,
+    books already reported "ok" are skipped and interrupted books resume from their chunk
+    checkpoints. When the endpoint is down the batch stops early: that book is reported
+    "interrupted" and the remaining books are left for the next run.\n
+    Extracted text is cleaned by `normalize_pages` unless `normalize` is False; the record's
+    "normalization" entry says how many bytes and tokens that removed.
+    """
+    report_path = os.path.join(out_dir, REPORT_FILE_NAME)
+    previous = read_report(report_path) if resume else {}
+    todo = [
+        book for book in books
+        if not (previous.get(book.path, {}).get("status") == "ok"
+                and os.path.exists(previous[book.path]["outputs"]["summary"]))
+    ]
+    skipped = len(books) - len(todo)
+    if skipped:
+        logging.info(f"Batch resume: skipping {skipped} books already summarized.")
+
+    if controller is None:
+        pool = get_endpoint_pool()
+        controller = ConcurrencyController.from_env(name="batch", capacity=pool.capacity if pool else None)
+
+    loop = asyncio.get_running_loop()
+    gate = asyncio.Semaphore(books_in_flight)
+    records = []
+
+    async def process(book: Book, extraction):
+        started = time.monotonic()
+        record = {"book": book.name, "title": book.title, "path": book.path}
+        try:
+            text, record["normalization"] = await extraction
+            async with gate:
+                record.update(await summarize_book(
+                    book, text, out_dir, controller, presentation=presentation, resume=resume, **summarize_kwargs
+                ))
+        except CircuitOpenError as e:
+            record.update({"status": "interrupted", "error": f"{type(e).__name__}: {e}"})
+            raise
+        except Exception as e:
+            logging.error(f"ERROR: Book {book.name} failed: {e}")
+            record.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+        finally:
+            if "status" in record:
+                record["seconds"] = round(time.monotonic() - started, 3)
+                append_report(report_path, record)
+                records.append(record)
+        return record
+
+    with ProcessPoolExecutor(max_workers=max(1, min(extraction_workers, len(todo) or 1))) as executor:
+        # Extraction of every book is queued up front; summaries start as soon as a text is ready.
+        # One worker per book already fills the pool: each extracts its book serially
+        # (max_workers=1) instead of starting a nested pool of its own
+        tasks = [
+            asyncio.create_task(process(book, loop.run_in_executor(executor, extract_book_text, book.path, 1, normalize)))
+            for book in todo
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except CircuitOpenError:
+            logging.error("ERROR: LLM endpoint unavailable; stopping the batch. Re-run to resume.")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    logging.info(f"Batch done: {sum(r['status'] == 'ok' for r in records)} ok, "
+                 f"{sum(r['status'] == 'failed' for r in records)} failed, {skipped} skipped.")
+    logging.info(f"Concurrency: {controller.stats()}")
+    return records
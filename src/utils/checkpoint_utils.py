@@ -0,0 +1,213 @@
+# checkpoint_utils.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.constants.constants import CHECKPOINT_DIR
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+MANIFEST_VERSION = 1
+
+
+def hash_text(text) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_params(params: dict) -> str:
+    return hash_text(json.dumps(params, sort_keys=True, ensure_ascii=False))
+
+
+def atomic_write_text(path, text, prefix=".tmp-"):
+    """
+    Writes text to a temp file in the same directory, then renames it over `path`,
+    so a crash leaves either the old or the new file, never a torn one.
+    """
+    _atomic_write(path, text, prefix, mode="w", encoding="utf-8")
+
+
+def atomic_write_bytes(path, data, prefix=".tmp-"):
+    """
+    Binary counterpart of `atomic_write_text`.
+    """
+    _atomic_write(path, data, prefix, mode="wb")
+
+
+def _atomic_write(path, data, prefix, mode, encoding=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, data):
+    """
+    Atomically replaces `path` with `data` serialized as JSON (see `atomic_write_text`).
+    """
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False), prefix=".manifest-")
+
+
+class RunManifest:
+    """
+    Checkpoint of a multi-pass run, keyed by the document hash and the chunking/prompt parameters.\n
+    Records each chunk's state (pending/done/failed), summary and text hash so an
+    interrupted run can skip completed chunks on resume, and a run of a revised draft of
+    the same book can reuse the summaries of its unchanged chunks (see `reuse`).
+    """
+
+    def __init__(self, path, doc_hash, params, chunk_count, name=None):
+        self.path = path
+        self.doc_hash = doc_hash
+        self.params = params
+        self.name = name
+        self.chunks: List[dict] = [{"state": PENDING, "summary": None, "attempts": 0} for _ in range(chunk_count)]
+        self.final_summary: Optional[str] = None
+        self.updated = time.time()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saving = False
+
+    @classmethod
+    def open(cls, text, params, chunk_count, base_dir=CHECKPOINT_DIR, resume=True, name=None, chunk_hashes=None) -> "RunManifest":
+        """
+        Returns the manifest for this document and parameters, loading the previous one when resuming.\n
+        `name` (the book) and `chunk_hashes` (`hash_text` of every chunk) let later runs of a
+        revised draft find this one and reuse its chunk summaries.
+        """
+        doc_hash = hash_text(text)
+        path = os.path.join(base_dir, f"{doc_hash[:16]}_{hash_params(params)[:16]}.json")
+        manifest = cls(path, doc_hash, params, chunk_count, name=name)
+        for chunk, chunk_hash in zip(manifest.chunks, chunk_hashes or ()):
+            chunk["hash"] = chunk_hash
+        if resume and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION and len(data["chunks"]) == chunk_count:
+                    manifest.chunks = data["chunks"]
+                    manifest.final_summary = data.get("final_summary")
+                    logging.info(f"Resuming run from {path}: {len(manifest.indices(DONE))}/{chunk_count} chunks done.")
+                else:
+                    logging.warning(f"Ignoring incompatible checkpoint {path}.")
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"ERROR: Could not read checkpoint {path}: {e}")
+        return manifest
+
+    @classmethod
+    def load(cls, path) -> Optional["RunManifest"]:
+        """
+        A saved manifest, or None when it cannot be read or has another version.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            manifest = cls(path, data["doc_hash"], data["params"], 0, name=data.get("name"))
+            manifest.chunks = data["chunks"]
+            manifest.final_summary = data.get("final_summary")
+            return manifest
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"ERROR: Could not read checkpoint {path}: {e}")
+            return None
+
+    @staticmethod
+    def find_previous(base_dir, name, params, exclude=None) -> Optional[str]:
+        """
+        Path of the most recently saved manifest of book `name` with the same parameters
+        (any document hash), other than `exclude`; None when there is none.
+        """
+        suffix = f"_{hash_params(params)[:16]}.json"
+        try:
+            with os.scandir(base_dir) as it:
+                candidates = [entry.path for entry in it if entry.name.endswith(suffix)]
+        except FileNotFoundError:
+            return None
+        exclude = os.path.abspath(exclude) if exclude else None
+        for path in sorted(candidates, key=os.path.getmtime, reverse=True):
+            if os.path.abspath(path) == exclude:
+                continue
+            previous = RunManifest.load(path)
+            if previous is not None and previous.name == name:
+                return path
+        return None
+
+    def reuse(self, previous: "RunManifest") -> int:
+        """
+        Marks every pending chunk whose text hash matches a completed chunk of `previous`
+        as done with that summary. Returns the number of chunks reused.
+        """
+        done = {chunk["hash"]: chunk["summary"] for chunk in previous.chunks if chunk["state"] == DONE and chunk.get("hash")}
+        reused = 0
+        with self._lock:
+            for chunk in self.chunks:
+                if chunk["state"] == PENDING and chunk.get("hash") in done:
+                    chunk["state"] = DONE
+                    chunk["summary"] = done[chunk["hash"]]
+                    reused += 1
+        return reused
+
+    def indices(self, state) -> List[int]:
+        return [i for i, chunk in enumerate(self.chunks) if chunk["state"] == state]
+
+    def completed(self) -> Dict[int, str]:
+        return {i: chunk["summary"] for i, chunk in enumerate(self.chunks) if chunk["state"] == DONE}
+
+    def record(self, index, summary):
+        """
+        Marks a chunk done (with its summary) or failed (summary is None).
+        """
+        with self._lock:
+            chunk = self.chunks[index]
+            chunk["attempts"] += 1
+            chunk["state"] = DONE if summary is not None else FAILED
+            chunk["summary"] = summary
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "version": MANIFEST_VERSION,
+                "doc_hash": self.doc_hash,
+                "name": self.name,
+                "params": self.params,
+                "chunks": [dict(chunk) for chunk in self.chunks],
+                "final_summary": self.final_summary,
+                "updated": time.time(),
+            }
+
+    def save(self):
+        atomic_write_json(self.path, self.to_dict())
+
+    async def asave(self):
+        """
+        Saves off the event loop. Concurrent callers are coalesced: while one save runs,
+        later updates are written by a single follow-up save instead of one each.
+        """
+        self._dirty = True
+        if self._saving:
+            return
+        self._saving = True
+        try:
+            while self._dirty:
+                self._dirty = False
+                await asyncio.to_thread(self.save)
+        finally:
+            self._saving = False
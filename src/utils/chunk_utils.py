@@ -0,0 +1,346 @@
+# chunk_utils.py
+
+import re
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from src.constants.constants import CDC_MIN_FILL, CDC_TARGET_FILL, CDC_WINDOW_CHARS, DEFAULT_CHUNK_OVERLAP, DEFAULT_MAX_CHARACTER_PER_CHUNK
+
+LengthFn = Callable[[str], int]
+Span = Tuple[int, int]
+
+# Boundary strengths, strongest first. A chunk is cut at the strongest boundary
+# available in its last (1 - MIN_CHUNK_FILL) part.
+PARAGRAPH, SENTENCE, LINE, WORD, NONE = 4, 3, 2, 1, 0
+MIN_CHUNK_FILL = 0.5
+
+# "fixed": chunks filled up to the size limit (`chunk_spans`); "cdc": content-defined
+# boundaries (`cdc_spans`), so unchanged regions of a revised text give identical chunks.
+CHUNKING_MODES = ("fixed", "cdc")
+
+# Every boundary starts with a newline or sentence punctuation, which keeps the scan fast.
+_BOUNDARY_RE = re.compile(
+    r"[\n.!?…](?:(?<=\n)[ \t]*\n\s*|(?<=[.!?…])[.!?…]*[\"'”»)\]]*[ \t]+)?"
+)
+_WORD_RE = re.compile(r"\s+")
+_NON_SPACE_RE = re.compile(r"\S")
+# The two kinds of _BOUNDARY_RE boundaries never share a character, so scanning for them
+# separately finds the same boundaries. Newlines are cheap to find everywhere; sentence
+# punctuation is only scanned for where a chunk is cut.
+_NEWLINE_RE = re.compile(r"\n(?:[ \t]*\n\s*)?")
+_SENTENCE_RE = re.compile(r"[.!?…][.!?…]*[\"'”»)\]]*[ \t]+")
+_SENTENCE_CHARS = ".!?…\"'”»)] \t"
+
+
+def _segment_ends(text) -> Tuple[List[int], List[int]]:
+    """
+    Single regex pass: returns segment end offsets and the strength of the boundary after each segment.
+    """
+    ends, strengths = [], []
+    for match in _BOUNDARY_RE.finditer(text):
+        start, end = match.span()
+        if text[start] == "\n":
+            strength = LINE if end - start == 1 else PARAGRAPH
+        elif text[end - 1] in " \t":
+            strength = SENTENCE
+        else:
+            continue  # punctuation inside a token, e.g. "3.14"
+        ends.append(end)
+        strengths.append(strength)
+    if not ends or ends[-1] != len(text):
+        ends.append(len(text))
+        strengths.append(PARAGRAPH)
+    return ends, strengths
+
+
+def _split_oversized(text, start, end, max_len, length_fn) -> List[Tuple[int, int, int]]:
+    """
+    Splits a segment longer than `max_len` at whitespace, then hard-cuts single words.\n
+    Returns (end, strength, length) triples.
+    """
+    pieces = []
+    piece_start = start
+    cuts = [m.end() for m in _WORD_RE.finditer(text, start, end)]
+    if not cuts or cuts[-1] != end:
+        cuts.append(end)
+    for cut in cuts:
+        size = length_fn(text[piece_start:cut])
+        if size <= max_len:
+            pieces.append((cut, WORD, size))
+        else:
+            # A single "word" over the limit: cut proportionally, shrinking until each part fits
+            pos = piece_start
+            while pos < cut:
+                step = max(1, (cut - pos) * max_len // max(size, 1))
+                while step > 1 and length_fn(text[pos:pos + step]) > max_len:
+                    step = max(1, step // 2)
+                part_end = min(cut, pos + step)
+                part_size = length_fn(text[pos:part_end])
+                pieces.append((part_end, NONE, part_size))
+                size -= part_size
+                pos = part_end
+        piece_start = cut
+    return pieces
+
+
+def _sentence_ends(text, lo, hi) -> Iterator[int]:
+    """
+    Ends of the sentence boundaries ending within [lo, hi], the same a scan from the start
+    finds, lazily and in order.
+    """
+    # Back up to a character no sentence boundary contains, so the scan starts in step
+    pos = int(lo)
+    size = 64
+    while True:
+        begin = max(0, pos - size)
+        kept = text[begin:pos].rstrip(_SENTENCE_CHARS)
+        if kept or begin == 0:
+            break
+        size *= 2
+    # Only a boundary ending past hi can be cut short by endpos, and it then ends at hi + 1
+    for match in _SENTENCE_RE.finditer(text, begin + len(kept), hi + 1):
+        if lo <= match.end() <= hi:
+            yield match.end()
+
+
+def _latest(ends, lo, hi) -> Optional[int]:
+    i = bisect_right(ends, hi) - 1
+    return ends[i] if i >= 0 and ends[i] >= lo else None
+
+
+def _next(ends, pos, default) -> int:
+    i = bisect_right(ends, pos)
+    return ends[i] if i < len(ends) else default
+
+
+def _char_spans(text, max_len, overlap) -> List[Span]:
+    """
+    `chunk_spans` measuring characters: the same spans, without segmenting the whole text.\n
+    A chunk's length is then its offset range, so only the boundaries near each cut are
+    needed. Newlines are found once; sentence ends are scanned for only in the tail of a
+    chunk without a paragraph break and in the overlap, and segments over `max_len` can
+    only occur where newlines are further apart than that.
+    """
+    n = len(text)
+    newline_ends, paragraph_ends = [], []
+    for match in _NEWLINE_RE.finditer(text):
+        newline_ends.append(match.end())
+        if match.end() - match.start() > 1:
+            paragraph_ends.append(match.end())
+
+    # Ends of the pieces segments over max_len are split into (the last piece ends at the segment end)
+    word_ends, piece_ends = [], []
+    previous = 0
+    for newline_end in newline_ends + [n]:
+        if newline_end - previous > max_len:
+            segment_start = previous
+            for end in [*_sentence_ends(text, previous + 1, newline_end), newline_end]:
+                if end - segment_start > max_len:
+                    pieces = _split_oversized(text, segment_start, end, max_len, len)[:-1]
+                    piece_ends.extend(piece_end for piece_end, _, _ in pieces)
+                    word_ends.extend(piece_end for piece_end, strength, _ in pieces if strength == WORD)
+                segment_start = end
+        previous = newline_end
+
+    def boundaries(lo, hi) -> List[int]:
+        # Every segment end within [lo, hi], in order
+        return sorted(
+            newline_ends[bisect_left(newline_ends, lo):bisect_right(newline_ends, hi)]
+            + list(_sentence_ends(text, lo, hi))
+            + piece_ends[bisect_left(piece_ends, lo):bisect_right(piece_ends, hi)]
+        )
+
+    spans: List[Span] = []
+    start = 0
+    while True:
+        limit = start + max_len
+        if n <= limit:
+            cut = n
+        else:
+            # The strongest boundary in the tail of the chunk, the latest of equals; else the last one that fits
+            min_fill = start + max_len * MIN_CHUNK_FILL
+            cut = (
+                _latest(paragraph_ends, min_fill, limit)
+                or _latest(list(_sentence_ends(text, min_fill, limit)), min_fill, limit)
+                or _latest(newline_ends, min_fill, limit)
+                or _latest(word_ends, min_fill, limit)
+                or _latest(piece_ends, min_fill, limit)
+                or boundaries(start + 1, limit)[-1]
+            )
+
+        if _NON_SPACE_RE.search(text, start, cut):
+            spans.append((start, cut))
+        if cut >= n:
+            break
+
+        next_start = cut
+        if overlap:
+            window = boundaries(max(start + 1, cut - overlap), cut - 1)
+            # The first segment end after the cut, which the next chunk must still reach
+            following = min(_next(newline_ends, cut, n), _next(piece_ends, cut, n))
+            following = next(_sentence_ends(text, cut + 1, following), following)
+            for end in window:
+                if following - end <= max_len:
+                    next_start = end
+                    break
+        start = next_start
+
+    return spans
+
+
+def chunk_spans(
+        text,
+        max_len=DEFAULT_MAX_CHARACTER_PER_CHUNK,
+        overlap=DEFAULT_CHUNK_OVERLAP,
+        length_fn: Optional[LengthFn] = None
+    ) -> List[Span]:
+    """
+    Splits text into (start, end) offset spans whose measured length is <= max_len.\n
+    Scans the text once, prefers paragraph, then sentence, then line boundaries, and
+    never copies the text: slice `text[start:end]` only when a chunk is sent.\n
+    `length_fn` measures a piece of text (default: characters; pass a tokenizer count
+    to budget in tokens). A chunk's length is the sum of its segments' lengths, which is
+    exact for characters and a close upper estimate for most tokenizers. Counting
+    characters takes a faster path that gives the same spans as `length_fn=len`.\n
+    `overlap` is the approximate length repeated from the end of the previous chunk,
+    snapped to a segment boundary.
+    """
+    if max_len <= 0:
+        raise ValueError("max_len must be positive")
+    if overlap < 0 or overlap >= max_len:
+        raise ValueError("overlap must be in [0, max_len)")
+    if length_fn is None:
+        return _char_spans(text, max_len, overlap)
+
+    ends, strengths = _segment_ends(text)
+
+    # Offsets of segment starts, their boundary strengths and prefix sums of lengths
+    starts = [0]
+    bounds = []
+    cum = [0]
+    seg_start = 0
+    for end, strength in zip(ends, strengths):
+        size = length_fn(text[seg_start:end])
+        if size <= max_len:
+            starts.append(end)
+            bounds.append(strength)
+            cum.append(cum[-1] + size)
+        else:
+            pieces = _split_oversized(text, seg_start, end, max_len, length_fn)
+            # The last piece keeps the boundary of the original segment
+            pieces[-1] = (pieces[-1][0], strength, pieces[-1][2])
+            for piece_end, piece_strength, piece_size in pieces:
+                starts.append(piece_end)
+                bounds.append(piece_strength)
+                cum.append(cum[-1] + piece_size)
+        seg_start = end
+
+    count = len(bounds)
+    spans: List[Span] = []
+    first = 0
+    while first < count:
+        # Greedy fill: the furthest segment boundary that keeps the chunk within max_len
+        last = bisect_right(cum, cum[first] + max_len, lo=first + 1) - 1
+        if last >= count:
+            cut = count
+        else:
+            # Prefer the strongest boundary in the tail of the chunk
+            min_fill = cum[first] + max_len * MIN_CHUNK_FILL
+            cut = last
+            best = NONE - 1
+            k = last
+            while k > first and cum[k] >= min_fill:
+                if bounds[k - 1] > best:
+                    best, cut = bounds[k - 1], k
+                    if best == PARAGRAPH:
+                        break
+                k -= 1
+
+        start, end = starts[first], starts[cut]
+        if _NON_SPACE_RE.search(text, start, end):
+            spans.append((start, end))
+        if cut >= count:
+            break
+
+        next_first = cut
+        if overlap:
+            next_first = max(first + 1, bisect_left(cum, cum[cut] - overlap, lo=first + 1, hi=cut))
+            # Make sure the next chunk can still reach past this cut
+            while cum[cut + 1] - cum[next_first] > max_len:
+                next_first += 1
+        first = next_first
+
+    return spans
+
+
+def iter_chunks(text, spans):
+    """
+    Lazily slices the chunks described by `spans` out of `text`.
+    """
+    for start, end in spans:
+        yield text[start:end]
+
+
+def _cut_score(text, end) -> float:
+    """
+    Hash of the CDC_WINDOW_CHARS characters before offset `end`, as a uniform value in [0, 1).
+    """
+    return zlib.crc32(text[max(0, end - CDC_WINDOW_CHARS):end].encode("utf-8")) / 2 ** 32
+
+
+def cdc_spans(
+        text,
+        max_len=DEFAULT_MAX_CHARACTER_PER_CHUNK,
+        length_fn: Optional[LengthFn] = None,
+        min_fill=CDC_MIN_FILL,
+        target_fill=CDC_TARGET_FILL
+    ) -> List[Span]:
+    """
+    Content-defined chunking: splits text at paragraph breaks chosen by a hash of the text
+    just before each break, so a cut depends on its neighbourhood, not on its offset.
+    Inserting or deleting a paragraph changes the chunks around the edit; the following
+    cuts fall on the same breaks as before and the chunks there are byte-identical.\n
+    Once a chunk holds `min_fill` * max_len, a break ending a paragraph of length p is cut
+    with probability p / ((target_fill - min_fill) * max_len). A chunk that would exceed
+    `max_len` is cut at its best-scoring break past the minimum (content-defined as well),
+    and a single paragraph over `max_len` is split by `chunk_spans`.
+    """
+    if max_len <= 0:
+        raise ValueError("max_len must be positive")
+    measure = length_fn or len
+    min_len = max_len * min_fill
+    mean_gap = max(1.0, max_len * (target_fill - min_fill))
+    ends, strengths = _segment_ends(text)
+    breaks = [end for end, strength in zip(ends, strengths) if strength == PARAGRAPH]
+    if not breaks or breaks[-1] != len(text):
+        breaks.append(len(text))
+    sizes = [measure(text[start:end]) for start, end in zip([0] + breaks, breaks)]
+
+    spans: List[Span] = []
+    count = len(breaks)
+    first = 0
+    while first < count:
+        # Chunk = paragraphs first..cut-1; `backup` is the lowest-scoring break past min_len
+        size, cut = 0, count
+        backup, best = None, float("inf")
+        for k in range(first, count):
+            if k > first and size + sizes[k] > max_len:
+                cut = backup or k
+                break
+            size += sizes[k]
+            if size >= min_len:
+                score = _cut_score(text, breaks[k]) * mean_gap / max(sizes[k], 1)
+                if score < 1:
+                    cut = k + 1
+                    break
+                if score < best:
+                    backup, best = k + 1, score
+
+        start, end = breaks[first - 1] if first else 0, breaks[cut - 1]
+        if cut - first == 1 and sizes[first] > max_len:
+            spans.extend((start + s, start + e) for s, e in chunk_spans(text[start:end], max_len=max_len, overlap=0, length_fn=length_fn))
+        elif _NON_SPACE_RE.search(text, start, end):
+            spans.append((start, end))
+        first = cut
+    return spans
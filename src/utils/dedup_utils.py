@@ -0,0 +1,81 @@
+# dedup_utils.py
+
+import re
+import zlib
+from typing import Dict
+
+from src.constants.constants import DEDUP_LSH_BANDS, DEDUP_NUM_PERM, DEDUP_SHINGLE_WORDS
+
+# Multiply-shift hashing: ((a * h + b) mod 2**64) >> 32, done in wrapping uint64 arithmetic
+HASH_SEED = 1
+SHINGLE_MULTIPLIER = 0x9E3779B97F4A7C15
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingle_hashes(text, k=DEDUP_SHINGLE_WORDS):
+    """
+    Hashes of the text's word k-shingles as a NumPy uint64 array, case-insensitive and
+    blind to punctuation and whitespace (OCR and reflow differences do not break a match).\n
+    Words are hashed once; each k-word window is combined from them in one vectorized pass.
+    """
+    import numpy as np
+
+    words = np.fromiter(map(zlib.crc32, map(str.encode, _WORD_RE.findall(text.lower()))), dtype=np.uint64)
+    if len(words) <= k:
+        return np.array([np.bitwise_xor.reduce(words * np.uint64(SHINGLE_MULTIPLIER)) if len(words) else 0], dtype=np.uint64)
+    count = len(words) - k + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(k):
+        shingles = shingles * np.uint64(SHINGLE_MULTIPLIER) + words[offset:offset + count]
+    return np.unique(shingles)
+
+
+def minhash_signatures(texts, num_perm=DEDUP_NUM_PERM, k=DEDUP_SHINGLE_WORDS, seed=HASH_SEED):
+    """
+    MinHash signatures, one row of `num_perm` values per text, as a NumPy uint64 array.\n
+    The fraction of equal positions in two rows estimates the texts' Jaccard similarity.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = shingle_hashes(text, k)
+        # All permutations of all shingles at once: (num_perm, shingles), then the row minimum
+        permuted = (np.outer(a, hashes) + b[:, None]) >> np.uint64(32)
+        signatures[row] = permuted.min(axis=1)
+    return signatures
+
+
+def find_near_duplicates(chunks, threshold, num_perm=DEDUP_NUM_PERM, bands=DEDUP_LSH_BANDS) -> Dict[int, int]:
+    """
+    Maps every chunk that is a near duplicate of an earlier chunk to that earlier chunk's
+    index (its cluster representative). Chunks not in the result are summarized normally.\n
+    Candidates come from LSH banding of the MinHash signatures; a chunk joins the first
+    earlier representative whose estimated Jaccard similarity is at least `threshold`.
+    Comparing with the representative, not any cluster member, keeps clusters from drifting.
+    """
+    if len(chunks) < 2:
+        return {}
+    import numpy as np
+
+    signatures = minhash_signatures(chunks, num_perm=num_perm)
+    rows = num_perm // bands
+    buckets = [{} for _ in range(bands)]
+    duplicates = {}
+    for i in range(len(chunks)):
+        keys = [signatures[i, band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = sorted({j for band, key in enumerate(keys) for j in buckets[band].get(key, ())})
+        if candidates:
+            similarity = (signatures[candidates] == signatures[i]).mean(axis=1)
+            matches = np.flatnonzero(similarity >= threshold)
+            if matches.size:
+                duplicates[i] = candidates[matches[0]]
+                continue
+        # A representative: later chunks are compared against it
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(i)
+    return duplicates
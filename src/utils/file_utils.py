@@ -2,9 +2,9 @@
 import os
 import logging
 import datetime
-from typing import Optional
+from typing import Optional, Union
 
-from pydot import Union
+from . import trace_utils as tracing
 
 def write_to_file(index, content, base_dir: Union[str, os.PathLike] = "output") -> Optional[str]:
     try:
@@ -16,7 +16,7 @@ def write_to_file(index, content, base_dir: Union[str, os.PathLike] = "output")
 
         os.makedirs(output_dir, exist_ok=True)
         file_path = os.path.join(output_dir, f"{index}_summary.txt")
-        with open(file_path, "w", encoding="utf-8") as f:
+        with tracing.span("write_to_file", file=os.path.basename(file_path)), open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
         return file_path
     except Exception as e:
@@ -0,0 +1,203 @@
+# job_utils.py
+
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.constants.constants import JOBS_KEEP_FINISHED
+from src.llm.concurrency import ConcurrencyController, current_tenant
+from . import metrics_utils as metrics
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+job_manager = None
+
+
+class Job:
+    """
+    One submitted summarization: its state, progress and result.\n
+    `on_event` takes the events of `multi_pass_summarize` ({"type": "progress" | "chunk" |
+    "token" | "stage", ...}); `watch` yields the job each time one arrives.
+    """
+
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = QUEUED
+        self.stage = None
+        self.done = 0
+        self.total = 0
+        self.chunk_summaries: Dict[int, str] = {}
+        self.final_parts: List[str] = []
+        self.result = None
+        self.error = None
+        self.created = time.monotonic()
+        self.finished = None
+        self.task: Optional[asyncio.Task] = None
+        # Chunks already done when the chunk count became known (resumed or reused chunks)
+        # and when: the ETA only counts chunks this run summarized
+        self._progress_started = None
+        self._done_at_start = 0
+        self._watchers: List[asyncio.Queue] = []
+
+    @property
+    def final_text(self) -> str:
+        return "".join(self.final_parts)
+
+    def on_event(self, event):
+        kind = event["type"]
+        if kind == "progress":
+            if self._progress_started is None:
+                self._progress_started, self._done_at_start = time.monotonic(), event["done"]
+            self.done, self.total = event["done"], event["total"]
+        elif kind == "chunk":
+            self.chunk_summaries[event["index"]] = event["summary"]
+        elif kind == "token":
+            self.final_parts.append(event["text"])
+        elif kind == "stage":
+            self.stage = event["stage"]
+        self._notify()
+
+    def _notify(self):
+        for watcher in self._watchers:
+            watcher.put_nowait(None)
+
+    def eta(self) -> Optional[float]:
+        """
+        Seconds until every chunk is summarized at the rate seen so far; None before the first chunk.
+        """
+        summarized = self.done - self._done_at_start
+        if self._progress_started is None or summarized <= 0:
+            return None
+        if self.done >= self.total:
+            return 0.0
+        rate = summarized / (time.monotonic() - self._progress_started)
+        return (self.total - self.done) / rate
+
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.created
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "eta": self.eta(),
+            "elapsed": round(self.elapsed(), 3),
+            "error": self.error,
+        }
+
+    async def watch(self):
+        """
+        Yields the job on every update (bursts are coalesced) until it has finished.
+        """
+        watcher = asyncio.Queue()
+        self._watchers.append(watcher)
+        try:
+            while True:
+                yield self
+                if self.status in FINISHED_STATES:
+                    return
+                await watcher.get()
+                while not watcher.empty():
+                    watcher.get_nowait()
+        finally:
+            self._watchers.remove(watcher)
+
+
+class JobManager:
+    """
+    Runs summarization jobs side by side for several UI users.\n
+    `submit` starts a job and returns its id at once. Every job's LLM calls go through one
+    shared `controller` under the job id as tenant, so slots are handed to the jobs in turn:
+    a short book keeps moving while a long one is running. `cancel` cancels the job's task,
+    which cancels its chunk tasks and their in-flight LLM requests. The last
+    `keep_finished` finished jobs stay queryable.
+    """
+
+    def __init__(self, controller: Optional[ConcurrencyController] = None, keep_finished=JOBS_KEEP_FINISHED):
+        self._controller = controller
+        self.keep_finished = keep_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    @property
+    def controller(self) -> ConcurrencyController:
+        # Built on first use, like the endpoint pool it is sized to
+        if self._controller is None:
+            from src.llm.llm_openAI import get_endpoint_pool
+            pool = get_endpoint_pool()
+            self._controller = ConcurrencyController.from_env(name="jobs", capacity=pool.capacity if pool else None)
+        return self._controller
+
+    def submit(self, name, work: Callable[[Job, ConcurrencyController], Awaitable]) -> str:
+        """
+        Starts `work(job, controller)` as a new job and returns the job id. Must be called
+        from the event loop; `work` reports progress through `job.on_event`.
+        """
+        job = Job(f"{name}-{secrets.token_hex(3)}", name)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        job.task.add_done_callback(lambda task: self._finished(job, task))
+        self._prune()
+        return job.id
+
+    async def _run(self, job: Job, work):
+        current_tenant.set(job.id)
+        job.status = RUNNING
+        job._notify()
+        try:
+            job.result = await work(job, self.controller)
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            logging.info(f"Job {job.id} cancelled after {job.done}/{job.total} chunks.")
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+            logging.error(f"ERROR: Job {job.id} failed: {job.error}")
+
+    def _finished(self, job: Job, task: asyncio.Task):
+        if task.cancelled():
+            # Also covers a job cancelled before its task got to run
+            job.status = CANCELLED
+        job.finished = time.monotonic()
+        metrics.JOBS.inc(status=job.status)
+        job._notify()
+
+    def get(self, job_id) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id) -> bool:
+        """
+        Cancels a queued or running job. False when it does not exist or has already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES or job.task is None:
+            return False
+        return job.task.cancel()
+
+    def snapshots(self) -> List[dict]:
+        return [job.snapshot() for job in self.jobs.values()]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+
+def get_job_manager() -> JobManager:
+    """
+    The process-wide job manager shared by every UI session.
+    """
+    global job_manager
+    if job_manager is None:
+        job_manager = JobManager()
+    return job_manager
@@ -0,0 +1,32 @@
+# lazy_utils.py
+import importlib
+import importlib.util
+from typing import Callable, Iterable, Tuple
+
+
+def lazy_submodules(namespace: dict, submodules: Iterable[str]) -> Tuple[Callable, Callable]:
+    """
+    PEP 562 `__getattr__` and `__dir__` for a package whose `globals()` is `namespace`.\n
+    A submodule is imported on first access, and so is a name re-exported from one of
+    `submodules` (then cached in the package), so importing the package stays cheap.
+    """
+    package = namespace["__name__"]
+    submodules = tuple(submodules)
+
+    def __getattr__(name):
+        if name.startswith("_"):
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        if name in submodules or importlib.util.find_spec(f"{package}.{name}") is not None:
+            return importlib.import_module(f".{name}", package)
+        for submodule in submodules:
+            module = importlib.import_module(f".{submodule}", package)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                namespace[name] = value
+                return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__():
+        return sorted(set(namespace) | set(submodules))
+
+    return __getattr__, __dir__
@@ -0,0 +1,290 @@
+# metrics_utils.py
+
+import logging
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from src.constants.constants import METRICS_HOST, METRICS_LATENCY_BUCKETS, METRICS_PORT
+
+# Off unless METRICS_PORT is set or `enable()` is called: every update then returns
+# after a single flag check, and timers do not read the clock.
+enabled = bool(os.getenv("METRICS_PORT"))
+
+_controllers = weakref.WeakSet()
+
+
+def enable(value=True):
+    global enabled
+    enabled = value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """
+    Base of the metric types: labelled values rendered in the Prometheus text format.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        """
+        The (name suffix, label values, extra labels, value) rows `render` writes out.
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, label_values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, label_values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("_total", key, (), value) for key, value in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        # Read at scrape time instead of being updated on the hot path
+        self.function = function
+
+    def set(self, value, **labels):
+        if not enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        if self.function is not None:
+            return self.function()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.function is not None:
+            return [("", (), (), self.function())]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, (), value) for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), count))
+        return samples
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the `with` block (nothing is measured while metrics are disabled).
+        """
+        if not enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def clear(self):
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+
+def track_controller(controller):
+    """
+    Exposes a ConcurrencyController's in-flight requests, queue depth and limit (read at scrape time).
+    """
+    _controllers.add(controller)
+
+
+def _controller_total(attribute):
+    return lambda: sum(getattr(controller, attribute) for controller in list(_controllers))
+
+
+# LLM calls
+LLM_REQUESTS = REGISTRY.register(Counter("book_reader_llm_requests", "LLM calls by method and result status.", ("method", "status")))
+LLM_LATENCY = REGISTRY.register(Histogram("book_reader_llm_request_seconds", "LLM call latency (cache misses).", ("method",)))
+LLM_TOKENS = REGISTRY.register(Counter("book_reader_llm_tokens", "Tokens reported in response usage.", ("kind",)))
+LLM_CACHE_HITS = REGISTRY.register(Counter("book_reader_llm_cache_hits", "LLM calls answered from the response cache."))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge("book_reader_llm_in_flight", "LLM requests currently holding a concurrency slot.", function=_controller_total("in_flight")))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge("book_reader_llm_queue_depth", "LLM requests waiting for a concurrency slot.", function=_controller_total("queue_depth")))
+LLM_CONCURRENCY_LIMIT = REGISTRY.register(Gauge("book_reader_llm_concurrency_limit", "Sum of the adaptive concurrency limits of active runs.", function=_controller_total("limit")))
+
+# Summarization pipeline
+CHUNK_LATENCY = REGISTRY.register(Histogram("book_reader_chunk_seconds", "Chunk summarization attempt latency, including the wait for a slot.", ("outcome",)))
+CHUNK_RETRIES = REGISTRY.register(Counter("book_reader_chunk_retries", "Chunk retry attempts."))
+CHUNKS_FAILED = REGISTRY.register(Counter("book_reader_chunks_failed", "Chunks given up after their retries."))
+CHUNKS_DEDUPLICATED = REGISTRY.register(Counter("book_reader_chunks_deduplicated", "Chunk summaries reused from a near-duplicate chunk instead of an LLM call."))
+CHUNKS_REUSED = REGISTRY.register(Counter("book_reader_chunks_reused", "Chunk summaries reused from the previous run of a revised book instead of an LLM call."))
+JOBS = REGISTRY.register(Counter("book_reader_jobs", "UI summarization jobs finished, by status.", ("status",)))
+
+# Extraction and chunking
+EXTRACT_LATENCY = REGISTRY.register(Histogram("book_reader_pdf_extract_seconds", "PDF text extraction time.", ("mode",)))
+EXTRACT_PAGES = REGISTRY.register(Counter("book_reader_pdf_pages_extracted", "PDF pages extracted."))
+CHUNK_TEXT_LATENCY = REGISTRY.register(Histogram("book_reader_chunk_text_seconds", "Time to split a document into chunks.", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+CHUNKS_CREATED = REGISTRY.register(Counter("book_reader_chunks_created", "Chunks produced by chunk_text."))
+
+
+def record_llm_result(method, result, seconds=None):
+    """
+    Counts one finished LLM call and the token usage it reported.
+    """
+    if not enabled:
+        return
+    if getattr(result, "cached", False):
+        LLM_CACHE_HITS.inc()
+    elif seconds is not None:
+        LLM_LATENCY.observe(seconds, method=method)
+    LLM_REQUESTS.inc(method=method, status=getattr(result, "status", "ok"))
+    usage = getattr(result, "usage", None)
+    if usage:
+        LLM_TOKENS.inc(usage.get("prompt_tokens", 0), kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens", 0), kind="completion")
+
+
+def start_metrics_server(port: Optional[int] = None, host=None):
+    """
+    Serves GET /metrics (Prometheus text format) from a daemon thread and turns metrics on.\n
+    Defaults to METRICS_HOST / METRICS_PORT from the environment; port 0 picks a free port.
+    Returns the ThreadingHTTPServer (call `shutdown()` to stop it).
+    """
+    # Imported here: http.server is only needed when metrics are actually served
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    port = int(os.getenv("METRICS_PORT", METRICS_PORT)) if port is None else port
+    host = host or os.getenv("METRICS_HOST", METRICS_HOST)
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    enable()
+    logging.info(f"Metrics served on http://{host}:{server.server_address[1]}/metrics")
+    return server
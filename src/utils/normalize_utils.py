@@ -0,0 +1,138 @@
+# normalize_utils.py
+
+import math
+import re
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+from src.constants.constants import HEADER_MIN_PAGE_FRACTION, HEADER_MIN_REPEAT_PAGES, NORMALIZE_EDGE_LINES
+
+# Ligatures and invisible characters PyMuPDF passes through from the PDF fonts
+_CHAR_MAP = str.maketrans({
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl", "\ufb05": "st", "\ufb06": "st",
+    "\u00a0": " ", "\u2009": " ", "\u202f": " ",
+    "\u200b": None, "\u200c": None, "\u200d": None, "\ufeff": None,
+})
+_SPACE_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+")
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:(?:page|pagina|pag\.?|p\.)\s*)?[-–—]?\s*(?:\d{1,4}(?:\s*(?:/|din|of)\s*\d{1,4})?|(?=[ivxlcdm])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3}))\s*[-–—]?$",
+    re.IGNORECASE
+)
+_ROMAN_RE = re.compile(r"^[IVXLCDM]+$")
+_HYPHENS = ("-", "\u00ad", "\u2010")
+_SENTENCE_END = tuple('.!?…:;"”»)')
+# What follows the hyphen in Romanian words written with one (într-o, s-a, nu-i, l-am,
+# într-adevăr): a line break before these keeps the hyphen. Any other continuation is the
+# rest of a word hyphenated at the line end (de-spre, ca-sa), so the parts are joined.
+# Hyphenation never leaves a one-letter fragment, so o/a/i/l are safe.
+_HYPHEN_CONTINUATIONS = frozenset((
+    "o", "a", "i", "l", "un", "ul", "am", "ai", "au", "ar", "aș", "aş", "ați", "aţi", "adevăr",
+))
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def _tidy(line) -> str:
+    return _SPACE_RE.sub(" ", line).strip()
+
+
+def _edge_key(line) -> str:
+    """
+    Running header/footer key: case-insensitive, with page numbers masked.
+    """
+    return _DIGITS_RE.sub("#", line.lower())
+
+
+def _is_page_number(line) -> bool:
+    # A lower-case roman numeral (the way front matter is numbered) counts as a page number
+    # on any page; an upper-case one is kept, since it usually numbers a chapter
+    return bool(_PAGE_NUMBER_RE.match(line)) and not _ROMAN_RE.match(line)
+
+
+def _edge_indices(lines) -> List[int]:
+    filled = [i for i, line in enumerate(lines) if line]
+    return sorted(set(filled[:NORMALIZE_EDGE_LINES] + filled[-NORMALIZE_EDGE_LINES:]))
+
+
+def _keeps_hyphen(text, line) -> bool:
+    """
+    True when the hyphen ending `text` belongs to the word rather than to the line break:
+    a non-alphabetic word (1990-1995) or a clitic or article on the next line (într-o, PDF-ul).
+    """
+    if not text.endswith("-"):
+        return False
+    if not text[:-1].rsplit(" ", 1)[-1].isalpha():
+        return True
+    fragment = _WORD_RE.match(line)
+    return fragment is not None and fragment.group().lower() in _HYPHEN_CONTINUATIONS
+
+
+def normalize_pages(pages, count_tokens: Optional[Callable[[str], int]] = None) -> Tuple[str, dict]:
+    """
+    Cleans extracted page texts into one string for chunking, in two passes over the pages:\n
+    the first expands ligatures, collapses whitespace and counts the lines at the top and
+    bottom of every page (page numbers masked); the second removes running headers and
+    footers (edge lines repeated on several pages) and page numbers, rejoins words
+    hyphenated across lines and reflows lines into paragraphs.\n
+    Returns the text and what was removed: bytes, tokens (`count_tokens`, default a UTF-8
+    byte estimate) and line counts.
+    """
+    if count_tokens is None:
+        from src.llm.token_budget import EstimateTokenizer
+        count_tokens = EstimateTokenizer().count
+
+    # Split and tidy every page once, counting the lines at page edges
+    split_pages = []
+    exact_counts, masked_counts = Counter(), Counter()
+    for page in pages:
+        lines = [_tidy(line) for line in page.translate(_CHAR_MAP).splitlines()]
+        edges = _edge_indices(lines)
+        exact_counts.update({lines[i].lower() for i in edges})
+        masked_counts.update({_edge_key(lines[i]) for i in edges})
+        split_pages.append((lines, edges))
+
+    # A line repeated as-is is a running header (e.g. the chapter title); one that only
+    # repeats once its digits are masked must recur on many pages (the book title and page
+    # number), so that chapter headings like "Capitolul 3" are kept
+    min_masked = max(HEADER_MIN_REPEAT_PAGES, math.ceil(HEADER_MIN_PAGE_FRACTION * len(pages)))
+    repeated = {key for key, count in exact_counts.items() if count >= HEADER_MIN_REPEAT_PAGES}
+    repeated_masked = {key for key, count in masked_counts.items() if count >= min_masked}
+
+    stats = {"pages": len(pages), "header_lines_removed": 0, "page_numbers_removed": 0, "hyphens_joined": 0}
+    out = []
+    paragraph_break = False
+    for lines, edges in split_pages:
+        edge_set = set(edges)
+        for i, line in enumerate(lines):
+            if not line:
+                paragraph_break = True
+                continue
+            if i in edge_set:
+                if _is_page_number(line):
+                    stats["page_numbers_removed"] += 1
+                    continue
+                if line.lower() in repeated or _edge_key(line) in repeated_masked:
+                    stats["header_lines_removed"] += 1
+                    continue
+            if not out:
+                out.append(line)
+            elif out[-1].endswith(_HYPHENS) and (line[0].islower() or (line[0].isdigit() and out[-1][-2:-1].isdigit())):
+                # A word split across lines (or pages): rejoin it
+                out[-1] = out[-1] if _keeps_hyphen(out[-1], line) else out[-1][:-1]
+                out[-1] += line
+                stats["hyphens_joined"] += 1
+            elif paragraph_break or (out[-1].endswith(_SENTENCE_END) and not line[0].islower()):
+                out.append(line)
+            else:
+                out[-1] += " " + line
+            paragraph_break = False
+
+    text = "\n\n".join(out).replace("\u00ad", "")
+    raw = "".join(pages)
+    stats["bytes_before"] = len(raw.encode("utf-8"))
+    stats["bytes_after"] = len(text.encode("utf-8"))
+    stats["bytes_removed"] = stats["bytes_before"] - stats["bytes_after"]
+    stats["tokens_before"] = count_tokens(raw)
+    stats["tokens_after"] = count_tokens(text)
+    stats["tokens_removed"] = stats["tokens_before"] - stats["tokens_after"]
+    return text, stats
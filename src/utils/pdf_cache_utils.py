@@ -0,0 +1,208 @@
+# pdf_cache_utils.py
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional
+
+from src.constants.constants import PDF_TEXT_CACHE_DIR, PDF_TEXT_CACHE_MAX_BYTES
+from .checkpoint_utils import atomic_write_bytes
+
+# File layout: header (magic, page count), page_count + 1 offsets into the data region,
+# then every page's UTF-8 text compressed on its own so any page can be decoded alone.
+MAGIC = b"BRPAGES1"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<Q")
+PAGE_SPAN = struct.Struct("<QQ")
+ZLIB_LEVEL = 6
+HASH_BLOCK_BYTES = 1024 * 1024
+CACHE_SUFFIX = ".pages"
+
+# Bump when the extraction code changes what text comes out of a PDF
+EXTRACTOR_REVISION = 1
+
+page_cache = None
+
+
+def extractor_version() -> str:
+    """
+    Identifies the extractor: PyMuPDF's version plus EXTRACTOR_REVISION.
+    """
+    from importlib import metadata
+    try:
+        pymupdf = metadata.version("pymupdf")
+    except metadata.PackageNotFoundError:
+        pymupdf = "unknown"
+    return f"pymupdf-{pymupdf}-r{EXTRACTOR_REVISION}"
+
+
+def file_hash(path) -> str:
+    """
+    SHA-256 of a file's bytes, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_pages(pages) -> bytes:
+    """
+    Serializes page texts into the cache file layout.
+    """
+    blobs = [zlib.compress(page.encode("utf-8"), ZLIB_LEVEL) for page in pages]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return b"".join([HEADER.pack(MAGIC, len(pages)), struct.pack(f"<{len(offsets)}Q", *offsets), *blobs])
+
+
+class CachedPages:
+    """
+    Read-only view of one cached book: pages are decompressed one at a time straight from
+    a memory map, so reading a page range never decodes the rest of the book.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.page_count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a page text cache file")
+            self._data_start = HEADER.size + (self.page_count + 1) * OFFSET.size
+            if self._data_start > len(self._map):
+                raise ValueError(f"{path} is truncated")
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+    def __len__(self):
+        return self.page_count
+
+    def page(self, index) -> str:
+        if not 0 <= index < self.page_count:
+            raise IndexError(f"page {index} out of range (0..{self.page_count - 1})")
+        start, stop = PAGE_SPAN.unpack_from(self._map, HEADER.size + index * OFFSET.size)
+        return zlib.decompress(self._map[self._data_start + start:self._data_start + stop]).decode("utf-8")
+
+    def pages(self, start=0, stop=None) -> List[str]:
+        stop = self.page_count if stop is None else min(stop, self.page_count)
+        return [self.page(i) for i in range(start, stop)]
+
+    def text(self, start=0, stop=None) -> str:
+        return "".join(self.pages(start, stop))
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PageTextCache:
+    """
+    On-disk cache of extracted page text, one compressed file per (PDF content hash,
+    extractor version), so re-uploading or re-running the same book skips the parse.\n
+    The directory is kept under `max_bytes` by removing the least recently used files.
+    Safe to use from several threads and processes: files are written atomically.
+    """
+
+    def __init__(self, cache_dir=PDF_TEXT_CACHE_DIR, max_bytes=PDF_TEXT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, pdf_path) -> str:
+        return f"{file_hash(pdf_path)}-{extractor_version()}"
+
+    def path_for(self, key) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key) -> Optional[CachedPages]:
+        """
+        The cached pages for `key` (close them when done), or None on a miss.
+        """
+        path = self.path_for(key)
+        try:
+            pages = CachedPages(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            logging.warning(f"Dropping unreadable page text cache file {path}: {e}")
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # The modification time doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return pages
+
+    def put(self, key, pages):
+        path = self.path_for(key)
+        atomic_write_bytes(path, encode_pages(pages), prefix=".pages-")
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        with self._lock:
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(CACHE_SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if os.path.abspath(path) == os.path.abspath(keep):
+                    continue
+                if self._remove(path):
+                    total -= size
+                    evicted += 1
+            if evicted:
+                logging.info(f"Page text cache evicted {evicted} files.")
+
+    def _remove(self, path) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # Still mapped by a reader on Windows, or removed by another process
+            return False
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def get_page_cache() -> Optional[PageTextCache]:
+    """
+    The process-wide page text cache, or None when PDF_TEXT_CACHE=0.\n
+    PDF_TEXT_CACHE_MAX_BYTES overrides the size bound.
+    """
+    global page_cache
+    if os.getenv("PDF_TEXT_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    if page_cache is None:
+        max_bytes = os.getenv("PDF_TEXT_CACHE_MAX_BYTES")
+        page_cache = PageTextCache(max_bytes=int(max_bytes) if max_bytes else PDF_TEXT_CACHE_MAX_BYTES)
+    return page_cache
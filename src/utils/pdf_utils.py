@@ -1,44 +1,217 @@
 # pdf_utils.py
-import fitz
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.constants.constants import DEFAULT_CHUNK_OVERLAP, DEFAULT_EXTRACTION_WORKERS, DEFAULT_MAX_CHARACTER_PER_CHUNK, MIN_PAGES_PER_EXTRACTION_WORKER
+from .chunk_utils import CHUNKING_MODES, cdc_spans, chunk_spans, iter_chunks
+from .normalize_utils import normalize_pages
+from .pdf_cache_utils import get_page_cache
+from . import metrics_utils as metrics
+
+def open_pdf(pdf_path):
+    """
+    Opens a PDF with PyMuPDF, imported on first use so importing this module stays cheap.
+    """
+    import fitz
+    return fitz.open(pdf_path)
 
-from src.constants.constants import DEFAULT_MAX_CHARACTER_PER_CHUNK
 
 def extract_pdf_text(pdf_path):
     """
     Extracts all text from a PDF using PyMuPDF.
     """
-    text = ""                     # container for all extracted text
-    doc = fitz.open(pdf_path)    # open the PDF file
+    # Open the PDF file; the context manager releases the MuPDF handle
+    with metrics.EXTRACT_LATENCY.time(mode="serial"), open_pdf(pdf_path) as doc:
+        metrics.EXTRACT_PAGES.inc(doc.page_count)
+        # Extract plain text from every page and join once at the end
+        return "".join(page.get_text() for page in doc)
 
-    # Loop through every page in the PDF
-    for page in doc:
-        text += page.get_text()  # extract plain text from page and append
 
-    return text                  # return complete text of book/document
+def get_page_count(pdf_path) -> int:
+    """
+    Returns the number of pages in a PDF without extracting any text.
+    """
+    with open_pdf(pdf_path) as doc:
+        return doc.page_count
 
 
-def chunk_text(text, max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK):
+def split_page_ranges(page_count, parts) -> List[Tuple[int, int]]:
     """
-    Splits text into chunks with max length = max_chars.
-    Ensures llama.cpp gets manageable input sizes.
+    Splits `page_count` pages into at most `parts` contiguous (start, stop) ranges.\n
+    Ranges are returned in page order and differ in size by at most one page.
+    """
+    parts = max(1, min(parts, page_count))
+    base, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + base + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_page_range(pdf_path, start, stop) -> List[str]:
+    """
+    Worker: opens its own PyMuPDF handle and extracts pages [start, stop).\n
+    Must stay a module-level function so it can be pickled into a process pool.
+    """
+    with open_pdf(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def extract_pdf_pages(pdf_path, max_workers: Optional[int] = None) -> List[str]:
+    """
+    Extracts the text of every page, in page order.\n
+    Large documents are split into page ranges and extracted in a process pool;
+    small ones are extracted in-process because the pool start-up would dominate.
+    """
+    workers = max_workers or min(DEFAULT_EXTRACTION_WORKERS, os.cpu_count() or 1)
+    page_count = get_page_count(pdf_path)
+    workers = min(workers, page_count // MIN_PAGES_PER_EXTRACTION_WORKER)
+
+    metrics.EXTRACT_PAGES.inc(page_count)
+    if workers <= 1:
+        with metrics.EXTRACT_LATENCY.time(mode="in_process"):
+            return extract_page_range(pdf_path, 0, page_count)
+
+    # A few ranges per worker keeps the pool busy when some pages are slower (images, fonts)
+    ranges = split_page_ranges(page_count, workers * 2)
+    with metrics.EXTRACT_LATENCY.time(mode="process_pool"), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+    return pages
+
+
+def extract_pdf_text_parallel(pdf_path, max_workers: Optional[int] = None) -> str:
+    """
+    Same output as `extract_pdf_text`, extracted by page ranges in parallel.
+    """
+    return "".join(extract_pdf_pages(pdf_path, max_workers=max_workers))
+
+
+def extract_pdf_pages_cached(pdf_path, max_workers: Optional[int] = None) -> List[str]:
+    """
+    `extract_pdf_pages` through the page text cache: a PDF extracted before (same bytes,
+    same extractor version) is read back instead of parsed again.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return extract_pdf_pages(pdf_path, max_workers=max_workers)
+    started = time.perf_counter()
+    key = cache.key_for(pdf_path)
+    cached = cache.get(key)
+    if cached is not None:
+        with cached:
+            pages = cached.pages()
+        metrics.EXTRACT_LATENCY.observe(time.perf_counter() - started, mode="cache")
+        return pages
+    pages = extract_pdf_pages(pdf_path, max_workers=max_workers)
+    cache.put(key, pages)
+    return pages
+
+
+def extract_pdf_text_cached(pdf_path, max_workers: Optional[int] = None) -> str:
+    """
+    Same output as `extract_pdf_text`, read from the page text cache when possible.
+    """
+    return "".join(extract_pdf_pages_cached(pdf_path, max_workers=max_workers))
+
+
+def extract_book_text(pdf_path, max_workers: Optional[int] = None, normalize=True) -> Tuple[str, dict]:
+    """
+    The text to summarize: pages from the page text cache (or extracted), cleaned by
+    `normalize_pages` unless `normalize` is False.\n
+    Returns the text and the normalization statistics (empty when not normalized).
+    Module-level so batch runs can call it in a process pool.
+    """
+    pages = extract_pdf_pages_cached(pdf_path, max_workers=max_workers)
+    if not normalize:
+        return "".join(pages), {}
+    return normalize_pages(pages)
+
+
+def extract_leading_text(pdf_path, min_chars, normalize=False) -> str:
     """
-    chunks = []   # list of text chunks
-    current = ""  # current chunk being built
+    Text of the first pages only: pages are read until there are more than `min_chars`
+    characters. Comes from the page text cache when the book is cached; otherwise only
+    those pages are parsed (and nothing is cached, since the book is incomplete).
+    """
+    cache = get_page_cache()
+    cached = cache.get(cache.key_for(pdf_path)) if cache is not None else None
+    if cached is not None:
+        with cached:
+            pages = _leading_pages(cached.page, cached.page_count, min_chars)
+    else:
+        with open_pdf(pdf_path) as doc:
+            pages = _leading_pages(lambda i: doc[i].get_text(), doc.page_count, min_chars)
+    return normalize_pages(pages)[0] if normalize else "".join(pages)
 
-    # Split text by newline to avoid breaking sentences weirdly
-    for line in text.split("\n"):
 
-        # If adding this line would exceed our limit:
-        if len(current) + len(line) > max_chars:
-            chunks.append(current)  # save current chunk
-            current = ""            # start a new one
+def _leading_pages(read_page, page_count, min_chars) -> List[str]:
+    pages, size = [], 0
+    for i in range(page_count):
+        if size > min_chars:
+            break
+        pages.append(read_page(i))
+        size += len(pages[-1])
+    return pages
 
-        # Add line to current chunk
-        current += line + "\n"
 
-    # After finishing the loop, add the last chunk if not empty
-    if current.strip() != "":
-        chunks.append(current)
+async def extract_pdf_pages_async(pdf_path, max_workers: Optional[int] = None) -> List[str]:
+    """
+    Awaitable page extraction: runs off the event loop so the UI server stays responsive.\n
+    Goes through the page text cache, so a book uploaded again is not parsed again.
+    """
+    return await asyncio.to_thread(extract_pdf_pages_cached, pdf_path, max_workers)
 
-    return chunks   # return list of chunks, each <= max_chars
 
+async def extract_pdf_text_async(pdf_path, max_workers: Optional[int] = None) -> str:
+    """
+    Awaitable version of `extract_pdf_text_cached`.
+    """
+    pages = await extract_pdf_pages_async(pdf_path, max_workers=max_workers)
+    return "".join(pages)
+
+
+async def extract_book_text_async(pdf_path, max_workers: Optional[int] = None, normalize=True) -> Tuple[str, dict]:
+    """
+    Awaitable version of `extract_book_text`.
+    """
+    return await asyncio.to_thread(extract_book_text, pdf_path, max_workers, normalize)
+
+
+async def extract_leading_text_async(pdf_path, min_chars, normalize=False) -> str:
+    """
+    Awaitable version of `extract_leading_text`.
+    """
+    return await asyncio.to_thread(extract_leading_text, pdf_path, min_chars, normalize)
+
+
+def chunk_text(text, max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK, overlap=DEFAULT_CHUNK_OVERLAP, length_fn=None, mode="fixed"):
+    """
+    Splits text into chunks with max length = max_chars.
+    Ensures llama.cpp gets manageable input sizes.\n
+    Chunks are cut at paragraph/sentence boundaries by `chunk_spans`; pass `length_fn`
+    to measure in tokens instead of characters. `mode="cdc"` cuts at content-defined
+    paragraph breaks instead (`cdc_spans`, no overlap), so a revised text keeps the
+    chunks of its unchanged parts.
+    """
+    with metrics.CHUNK_TEXT_LATENCY.time():
+        if mode == "cdc":
+            if overlap:
+                raise ValueError("content-defined chunks do not overlap")
+            spans = cdc_spans(text, max_len=max_chars, length_fn=length_fn)
+        elif mode == "fixed":
+            spans = chunk_spans(text, max_len=max_chars, overlap=overlap, length_fn=length_fn)
+        else:
+            raise ValueError(f"Unknown chunking mode {mode!r}, expected one of {CHUNKING_MODES}")
+        chunks = list(iter_chunks(text, spans))
+    metrics.CHUNKS_CREATED.inc(len(chunks))
+    return chunks
@@ -21,3 +21,12 @@ async def create_presentation(summary, impressions):
 
     # Call the LLM and request up to 600 response tokens of output.
     return await llm.run_summarize_llm(prompt,user_prompt=PRESENTATION_TASK_INSTRUCTION, max_response_tokens=600)
+
+
+async def stream_presentation(summary, impressions):
+    """
+    Streaming version of `create_presentation`: yields the preface text as it is generated.
+    """
+    prompt = getPresentationPrompt(summary=summary, impressions=impressions)
+    async for delta in llm.stream_summarize_llm(prompt, user_prompt=PRESENTATION_TASK_INSTRUCTION, max_response_tokens=600):
+        yield delta
@@ -3,14 +3,28 @@
 # summarize_utils.py
 
 import asyncio
+import json
 import logging
-from typing import Optional, Tuple
+import os
+import time
+from typing import Callable, List, Optional, Tuple
 from .pdf_utils import chunk_text
-from .file_utils import write_to_file
-from src.llm.llm_openAI import run_summarize_llm
-from src.llm.prompts_utils import getChunkPrompt, getSummaryPromt
-from src.constants.constants import DEFAULT_MAX_CHARACTER_PER_CHUNK, DEFAULT_RESPONSE_TOKENS, NUMBER_OF_RETRIES
-from src.constants.prompt_constants import DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION
+from .checkpoint_utils import FAILED, PENDING, RunManifest, hash_text
+from .dedup_utils import find_near_duplicates
+from . import artifact_utils as artifacts
+from . import metrics_utils as metrics
+from . import trace_utils as tracing
+from .trace_utils import Tracer
+from src.llm import deadline as deadlines
+from src.llm.concurrency import ConcurrencyController, estimate_tokens
+from src.llm.deadline import DeadlineExceeded
+from src.llm.llm_openAI import get_endpoint_pool, get_llm_engine, get_model_name, get_prompt_layout, get_response_cache, get_token_budget, run_summarize_llm, stream_summarize_llm
+from src.llm.llm_result import LLMResult, LLMStatus, as_llm_result
+from src.llm.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+from src.llm.token_budget import TokenBudget
+from src.llm.prompts_utils import getChunkPrompt, getSummaryPromt, layoutPrompt
+from src.constants.constants import CHECKPOINT_DIR, DEADLINE_MAP_FRACTION, DEADLINE_REDUCE_FRACTION, DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNKING_MODE, DEFAULT_DEDUP_THRESHOLD, DEFAULT_LLM_ENGINE, DEFAULT_MAX_CHARACTER_PER_CHUNK, DEFAULT_REDUCE_FAN_IN, DEFAULT_REDUCE_MAX_DEPTH, DEFAULT_RESPONSE_TOKENS, NUMBER_OF_RETRIES, RETRY_BACKOFF_BASE_SECONDS
+from src.constants.prompt_constants import DEADLINE_GAP_NOTE, DEADLINE_PARTIAL_NOTE, DEFAULT_SUMMARY_PROMPT, TASK_INSTRUCTION
 
 
 async def summarize_chunk(
@@ -22,9 +36,35 @@ async def summarize_chunk(
     """
     Summarizes one chunk using the LLM asynchronously.
     """
-    prompt = getChunkPrompt(chunk=chunk, chunk_prompt=chunk_prompt)
+    prompt, user_prompt = layoutPrompt(chunk, chunk_prompt, user_prompt, layout=get_prompt_layout(), wrap=getChunkPrompt)
     return await run_summarize_llm(prompt, user_prompt=user_prompt, max_response_tokens=max_response_tokens)
 
+class ChunkSummaryError(Exception):
+    """
+    Raised when a chunk summary is unusable. Carries the LLMResult so callers can tell
+    retryable failures (transport, timeouts, empty output) from permanent ones.
+    """
+
+    def __init__(self, index, result: LLMResult):
+        self.index = index
+        self.result = result
+        self.retryable = result.retryable
+        self.overload = result.overload
+        self.status_code = result.status_code
+        super().__init__(f"Chunk {index+1}: {result.status} ({result.error or 'no detail'})")
+
+class ReduceBatchError(Exception):
+    """
+    Raised inside the concurrency slot when a reduce request fails, so an overload
+    (`overload`) lowers the concurrency limit just as a failed chunk summary does.
+    """
+
+    def __init__(self, size, result: LLMResult):
+        self.result = result
+        self.overload = result.overload
+        self.status_code = result.status_code
+        super().__init__(f"Reduce of {size} summaries: {result.status} ({result.error or 'no detail'})")
+
 async def summarize_and_validate_chunk(
         chunk, 
         index, 
@@ -33,90 +73,364 @@ async def summarize_and_validate_chunk(
         max_response_tokens
     )-> str:
     """
-    Helper: summarize a single chunk, validate result, write to file and return summary.\n
-    Raises Exception on empty or error responses so caller can handle retries.
+    Helper: summarize a single chunk, validate result, record it in the run's artifacts and return summary.\n
+    Raises ChunkSummaryError on empty or failed responses so caller can handle retries.
+    Truncated summaries are kept (with a warning): they are still useful to the reduce step.
     """
 
-    errorList = ["ERROR", "error", "Error", "unexpected", "Unexpected", "failed", "Failed", "FAKE_SUMMARY"]
-
-    summary = await summarize_chunk(
-        chunk=chunk,
-        chunk_prompt=chunk_prompt,
-        user_prompt=user_prompt,
-        max_response_tokens=max_response_tokens
-    )
+    started = time.perf_counter()
+    with tracing.span("summarize_chunk", chunk=index + 1) as span_args:
+        summary = as_llm_result(await summarize_chunk(
+            chunk=chunk,
+            chunk_prompt=chunk_prompt,
+            user_prompt=user_prompt,
+            max_response_tokens=max_response_tokens
+        ))
+        span_args["status"] = summary.status
 
-    # Validate summary: not None, not empty, and does not contain known error markers
-    if summary is None or summary.strip() == "" or any(err.lower() in summary.lower() for err in errorList):
-        logging.error(f"Empty summary or error detected for {index+1}.")
-        raise Exception("Empty summary or error detected.")
+    # Validate summary by the status reported by the LLM layer, never by its wording
+    if not summary.usable:
+        logging.error(f"Empty summary or error detected for {index+1}: {summary.error}")
+        raise ChunkSummaryError(index, summary)
+    if summary.status == LLMStatus.TRUNCATED:
+        logging.warning(f"Chunk {index+1} summary was truncated at {max_response_tokens} tokens.")
 
-    await asyncio.to_thread(write_to_file, index=f"promt_{index+1}", content=summary)
+    artifacts.record("summary", f"chunk_{index+1}", summary, chunk=index, elapsed=time.perf_counter() - started, usage=summary.usage)
 
     logging.info(f"Chunk {index+1} summarized successfully.")
     return summary
 
-single_pass_semaphore = asyncio.Semaphore(5)  # limit concurrency to 5
+async def attempt_chunk(
+        chunk,
+        index,
+        chunk_prompt,
+        user_prompt,
+        max_response_tokens,
+        controller: ConcurrencyController,
+        breaker: CircuitBreaker,
+        timeout: Optional[float] = None
+    ) -> str:
+    """
+    One summarization attempt under the concurrency controller and circuit breaker.\n
+    Raises CircuitOpenError without sending anything while the endpoint is considered down.
+    The request is cancelled after `timeout` seconds (once it holds a slot), which fails
+    the attempt as retryable; DeadlineExceeded means the run itself is out of time.
+    """
+    breaker.check()
+    started = time.perf_counter()
+    waited = tracing.now()
+    try:
+        async with controller.slot(tokens=estimate_tokens(chunk) + max_response_tokens) as request:
+            tracing.record("wait_slot", waited)
+            with deadlines.deadline(timeout):
+                summary = await summarize_and_validate_chunk(
+                    chunk=chunk,
+                    index=index,
+                    chunk_prompt=chunk_prompt,
+                    user_prompt=user_prompt,
+                    max_response_tokens=max_response_tokens
+                )
+            request["cached"] = as_llm_result(summary).cached
+    except ChunkSummaryError as e:
+        if deadlines.expired():
+            # Cut short by the run's deadline, not by this chunk's timeout: not the endpoint's fault
+            metrics.CHUNK_LATENCY.observe(time.perf_counter() - started, outcome="deadline")
+            raise DeadlineExceeded(f"Chunk {index+1}: out of time") from e
+        metrics.CHUNK_LATENCY.observe(time.perf_counter() - started, outcome="retryable" if e.retryable else "fatal")
+        if e.retryable:
+            breaker.record_failure()
+        raise
+    except DeadlineExceeded:
+        metrics.CHUNK_LATENCY.observe(time.perf_counter() - started, outcome="deadline")
+        raise
+    except Exception:
+        metrics.CHUNK_LATENCY.observe(time.perf_counter() - started, outcome="error")
+        breaker.record_failure()
+        raise
+    metrics.CHUNK_LATENCY.observe(time.perf_counter() - started, outcome="ok")
+    breaker.record_success()
+    return summary
 
 async def single_pass_summarize(
         chunk, 
         index, 
+        controller: ConcurrencyController,
+        breaker: CircuitBreaker,
         chunk_prompt=DEFAULT_SUMMARY_PROMPT, 
         user_prompt=TASK_INSTRUCTION, 
         max_response_tokens=DEFAULT_RESPONSE_TOKENS
     ) -> Tuple[int, Optional[str]]:
     """
-    Single-pass summarization (for short texts fitting in one chunk).
+    Single-pass summarization (for short texts fitting in one chunk).\n
+    `controller` limits the requests in flight and `breaker` stops a run against a dead
+    endpoint; both only work when shared across all chunks of a run.
     """
     logging.info(f"Trying to summarize chunk {index+1}...")
     try:
-        async with single_pass_semaphore:
-            summary = await summarize_and_validate_chunk(
-                chunk=chunk,
-                index=index,
-                chunk_prompt=chunk_prompt,
-                user_prompt=user_prompt,
-                max_response_tokens=max_response_tokens
+        with tracing.span("single_pass_summarize", chunk=index + 1):
+            summary = await attempt_chunk(
+                chunk, index, chunk_prompt, user_prompt, max_response_tokens, controller, breaker
             )
         return index, summary
 
     except Exception as e:
         logging.error(f"ERROR: Chunk {index+1} failed: {e}")
+        metrics.CHUNKS_FAILED.inc()
         return index, None
 
-retry_semaphore = asyncio.Semaphore(5)  # limit concurrency to 5
-
 async def retry_chunk(
         chunk_index, 
         chunks, 
         chunk_prompt, 
         user_prompt, 
-        max_response_tokens
+        max_response_tokens,
+        controller: ConcurrencyController,
+        breaker: CircuitBreaker,
+        timeout: Optional[float] = None
     ) -> Tuple[int, Optional[str]]:
     """
-    Retry summarization for a failed chunk up to NUMBER_OF_RETRIES times.
+    Retry summarization for a failed chunk up to NUMBER_OF_RETRIES times,
+    with exponential backoff and jitter between attempts.\n
+    Stops early on a non-retryable error or when the deadline has passed; lets
+    CircuitOpenError propagate so the run can stop.
     """
-
     logging.info(f"Retrying chunk {chunk_index+1}...")
-    retries = 0
 
-    while retries < NUMBER_OF_RETRIES:
+    for retries in range(NUMBER_OF_RETRIES):
+        # The slot is released while we wait, so other chunks keep the endpoint busy
+        with tracing.span("backoff", attempt=retries + 1):
+            await asyncio.sleep(deadlines.timeout_for(backoff_delay(retries, base=RETRY_BACKOFF_BASE_SECONDS)))
+        if deadlines.expired():
+            logging.info(f"Chunk {chunk_index+1}: no time left for retries.")
+            break
+        metrics.CHUNK_RETRIES.inc()
         try:
-            async with retry_semaphore:
-                summary = await summarize_and_validate_chunk(
-                    chunk=chunks[chunk_index],
-                    index=chunk_index,
-                    chunk_prompt=chunk_prompt,
-                    user_prompt=user_prompt,
-                    max_response_tokens=max_response_tokens
-                )
+            summary = await attempt_chunk(
+                chunks[chunk_index], chunk_index, chunk_prompt, user_prompt, max_response_tokens, controller, breaker, timeout
+            )
             return chunk_index, summary
+        except CircuitOpenError:
+            raise
+        except DeadlineExceeded as e:
+            logging.info(f"Retry {retries+1} of chunk {chunk_index+1} stopped: {e}")
+            break
+        except ChunkSummaryError as e:
+            logging.error(f"Retry {retries+1} failed for chunk {chunk_index+1}: {e}")
+            if not e.retryable:
+                break
         except Exception as e:
-            retries += 1
-            logging.error(f"Retry {retries} failed for chunk {chunk_index+1}: {e}")
+            logging.error(f"Retry {retries+1} failed for chunk {chunk_index+1}: {e}")
     logging.info(f"Chunk {chunk_index+1} failed after retries.")
+    metrics.CHUNKS_FAILED.inc()
     return chunk_index, None
 
+async def summarize_chunk_with_retries(
+        chunks,
+        index,
+        chunk_prompt,
+        user_prompt,
+        max_response_tokens,
+        controller: ConcurrencyController,
+        breaker: CircuitBreaker,
+        first_attempt=True,
+        timeout: Optional[float] = None
+    ) -> Tuple[int, Optional[str]]:
+    """
+    Pipelined first pass + retries for one chunk: a retryable failure (including a request
+    over `timeout` seconds) goes straight to `retry_chunk` instead of waiting for every
+    other chunk's first attempt.
+    """
+    if first_attempt:
+        logging.info(f"Trying to summarize chunk {index+1}...")
+        try:
+            summary = await attempt_chunk(
+                chunks[index], index, chunk_prompt, user_prompt, max_response_tokens, controller, breaker, timeout
+            )
+            return index, summary
+        except CircuitOpenError:
+            raise
+        except DeadlineExceeded as e:
+            logging.error(f"ERROR: Chunk {index+1} not summarized: {e}")
+            metrics.CHUNKS_FAILED.inc()
+            return index, None
+        except ChunkSummaryError as e:
+            logging.error(f"ERROR: Chunk {index+1} failed: {e}")
+            if not e.retryable:
+                return index, None
+        except Exception as e:
+            logging.error(f"ERROR: Chunk {index+1} failed: {e}")
+    return await retry_chunk(index, chunks, chunk_prompt, user_prompt, max_response_tokens, controller, breaker, timeout)
+
+
+def group_for_reduce(summaries, budget, fan_in, length_fn=None) -> List[List[str]]:
+    """
+    Groups consecutive summaries into batches of at most `fan_in` items whose joined
+    length stays within `budget`. Order is preserved; an item over the budget gets its own batch.
+    """
+    measure = length_fn or len
+    batches = []
+    current, current_len = [], 0
+    for summary in summaries:
+        size = measure(summary) + 1  # +1 for the joining newline
+        if current and (len(current) >= fan_in or current_len + size > budget):
+            batches.append(current)
+            current, current_len = [], 0
+        current.append(summary)
+        current_len += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def with_gap_notes(summaries, missing) -> List[str]:
+    """
+    Chunk summaries (index, summary) in chunk order, with a DEADLINE_GAP_NOTE in place of
+    each run of consecutive `missing` chunk indices.
+    """
+    entries = list(summaries)
+    start = None
+    for position, index in enumerate(missing):
+        if start is None:
+            start = index
+        if position + 1 == len(missing) or missing[position + 1] != index + 1:
+            entries.append((start, DEADLINE_GAP_NOTE.format(first=start + 1, last=index + 1)))
+            start = None
+    entries.sort(key=lambda x: x[0])
+    return [text for _, text in entries]
+
+async def reduce_batch(batch, summary_prompt, user_prompt, max_response_tokens, controller: ConcurrencyController) -> str:
+    """
+    Summarizes one batch of summaries into a single summary.\n
+    A single-item batch is passed through; on failure the batch is kept joined so no content is lost.
+    A failed request raises inside the slot, so an overload lowers the concurrency limit.
+    """
+    combined = "\n".join(batch)
+    if len(batch) == 1:
+        return combined
+    prompt, user_prompt = layoutPrompt(combined, summary_prompt, user_prompt, layout=get_prompt_layout(), wrap=getSummaryPromt)
+    try:
+        async with controller.slot(tokens=estimate_tokens(combined) + max_response_tokens) as request:
+            summary = as_llm_result(await run_summarize_llm(
+                prompt,
+                user_prompt=user_prompt,
+                max_response_tokens=max_response_tokens
+            ))
+            request["cached"] = summary.cached
+            if not summary.usable:
+                raise ReduceBatchError(len(batch), summary)
+        return summary.strip()
+    except Exception as e:
+        logging.error(f"ERROR: Reduce of {len(batch)} summaries failed: {e}")
+    return combined
+
+
+async def tree_reduce_summaries(
+        summaries,
+        controller: ConcurrencyController,
+        summary_prompt=DEFAULT_SUMMARY_PROMPT,
+        user_prompt=TASK_INSTRUCTION,
+        max_response_tokens=DEFAULT_RESPONSE_TOKENS,
+        budget=DEFAULT_MAX_CHARACTER_PER_CHUNK,
+        fan_in=DEFAULT_REDUCE_FAN_IN,
+        max_depth=DEFAULT_REDUCE_MAX_DEPTH,
+        length_fn=None,
+        report: Optional[dict] = None
+    ) -> List[str]:
+    """
+    Hierarchical map-reduce over chunk summaries:\n
+    while the joined summaries do not fit in `budget`, group them into batches that do
+    and reduce every batch concurrently, one level at a time, up to `max_depth` levels.
+    The reduce requests go through the run's shared `controller`.\n
+    Returns the summaries left for the final reduce; per-level timings go to `report["reduce_levels"]`.
+    """
+    measure = length_fn or len
+    levels = report.setdefault("reduce_levels", []) if report is not None else []
+    level = list(summaries)
+
+    for depth in range(1, max_depth + 1):
+        if len(level) <= 1 or measure("\n".join(level)) <= budget:
+            break
+        if deadlines.expired():
+            logging.warning(f"Out of time: {len(level)} summaries are left unreduced.")
+            break
+        batches = group_for_reduce(level, budget, max(2, fan_in), length_fn=length_fn)
+        if len(batches) == len(level):
+            logging.warning("Summaries are too long to group under the reduce budget; stopping tree reduce.")
+            break
+
+        start = time.perf_counter()
+        async def traced_reduce(i, batch):
+            with tracing.lane(f"reduce {depth}.{i+1}"), tracing.span("reduce_batch", level=depth, inputs=len(batch)):
+                return await reduce_batch(batch, summary_prompt, user_prompt, max_response_tokens, controller)
+
+        level = await asyncio.gather(*[traced_reduce(i, batch) for i, batch in enumerate(batches)])
+        elapsed = time.perf_counter() - start
+        levels.append({"level": depth, "inputs": sum(map(len, batches)), "outputs": len(level), "seconds": round(elapsed, 3)})
+        logging.info(f"Reduce level {depth}: {sum(map(len, batches))} -> {len(level)} summaries in {elapsed:.1f}s")
+
+    return level
+
+
+async def stream_final_summary(prompt, user_prompt, max_response_tokens, on_event) -> LLMResult:
+    """
+    Streams the final summary into `on_event` as {"type": "token"} events and returns the full text.\n
+    If the stream fails before any token arrives, falls back to a normal request. A stream
+    still running at the deadline, or stopped at `max_response_tokens`, is returned as truncated.
+    """
+    parts = []
+    outcome = {}
+    started = tracing.now()
+    first_token = None
+
+    async def consume():
+        nonlocal first_token
+        async for delta in stream_summarize_llm(prompt, user_prompt=user_prompt, max_response_tokens=max_response_tokens, outcome=outcome):
+            if first_token is None:
+                first_token = tracing.now()
+                tracing.record("time_to_first_token", started, first_token)
+            parts.append(delta)
+            on_event({"type": "token", "text": delta})
+        tracing.record("decode", first_token)
+
+    try:
+        await deadlines.wait(consume(), "the final summary")
+    except Exception as e:
+        logging.error(f"ERROR: Streaming the final summary failed: {e}")
+        if not parts:
+            return as_llm_result(await run_summarize_llm(prompt, user_prompt=user_prompt, max_response_tokens=max_response_tokens))
+        return LLMResult("".join(parts).strip(), LLMStatus.TRUNCATED, error=str(e))
+    summary = LLMResult.from_text("".join(parts), finish_reason=outcome.get("finish_reason"))
+    summary.cached = outcome.get("cached", False)
+    if summary.status == LLMStatus.TRUNCATED:
+        logging.warning(f"Final summary was truncated at {max_response_tokens} tokens.")
+    return summary
+
+
+def plan_chunks(
+        text,
+        token_budget: TokenBudget,
+        max_chars,
+        chunk_overlap,
+        chunk_prompt,
+        user_prompt,
+        max_response_tokens,
+        length_fn=None,
+        mode="fixed"
+    ) -> Tuple[List[str], int]:
+    """
+    Chunks `text` so every chunk prompt fits `token_budget`:
+
+    the chunk size is the smaller of `max_chars` and the largest size that fits the model
+    context at this text's characters-per-token ratio, and any chunk still over the token
+    limit is split again by token count. Returns the chunks and the chunk size used.
+    """
+    layout = get_prompt_layout()
+    content_tokens = token_budget.content_tokens(chunk_prompt, user_prompt, max_response_tokens, layout=layout)
+    if length_fn is None:
+        max_chars = min(max_chars, token_budget.max_chars(text, chunk_prompt, user_prompt, max_response_tokens, layout=layout))
+    chunks = chunk_text(text, max_chars=max_chars, overlap=min(chunk_overlap, max_chars - 1), length_fn=length_fn, mode=mode)
+    return token_budget.fit_chunks(chunks, content_tokens), max_chars
+
 
 async def multi_pass_summarize(
     text, summary_file_name, 
@@ -124,69 +438,314 @@ async def multi_pass_summarize(
     summary_prompt=DEFAULT_SUMMARY_PROMPT, 
     user_prompt=TASK_INSTRUCTION, 
     max_chars=DEFAULT_MAX_CHARACTER_PER_CHUNK, 
-    max_response_tokens=DEFAULT_RESPONSE_TOKENS
+    max_response_tokens=DEFAULT_RESPONSE_TOKENS,
+    chunk_overlap=DEFAULT_CHUNK_OVERLAP,
+    length_fn=None,
+    resume=False,
+    checkpoint_dir=CHECKPOINT_DIR,
+    reduce_fan_in=DEFAULT_REDUCE_FAN_IN,
+    reduce_max_depth=DEFAULT_REDUCE_MAX_DEPTH,
+    dedup_threshold: Optional[float] = None,
+    report: Optional[dict] = None,
+    controller: Optional[ConcurrencyController] = None,
+    on_event: Optional[Callable[[dict], None]] = None,
+    tracer: Optional[Tracer] = None,
+    token_budget: Optional[TokenBudget] = None,
+    chunking: Optional[str] = None,
+    incremental=True,
+    previous_run: Optional[str] = None,
+    deadline: Optional[float] = None,
+    chunk_timeout: Optional[float] = None
 )-> str:
     """
     Multi-pass chunk summarization:\n
     1) Break long text into chunks\n
     2) Summarize each chunk separately\n
     3) Combine chunk summaries\n
-    4) Summarize the combined summaries again
-    """
-    summaries = []
-    chunks_to_be_retried = []
-
-
-    # STEP 1: Split raw text into manageable chunks
-    chunks = chunk_text(text, max_chars=max_chars)
-    logging.info(f"Total chunks: {len(chunks)}")
-
-    # STEP 2: Summarize each chunk concurrently
-        # Create tasks for all chunks
-    tasks = [asyncio.create_task(single_pass_summarize(chunk, i, chunk_prompt, user_prompt, max_response_tokens)) for i, chunk in enumerate(chunks)]
-
-        # Await tasks and collect results
-    results = await asyncio.gather(*tasks)
-        # Process results
-    for idx, summary in results:
-        if summary is None:
-            chunks_to_be_retried.append(idx)
-        else:
-            summaries.append((idx, summary))
-        
-
-    # STEP 2.5: Retry failed chunks
-    # Run retries concurrently
-    retry_tasks = [asyncio.create_task(retry_chunk(i, chunks, chunk_prompt, user_prompt, max_response_tokens)) for i in chunks_to_be_retried]
-    retry_results = await asyncio.gather(*retry_tasks)
-
-    # Collect successful summaries
-    for idx, summary in retry_results:
-        if summary:
-            summaries.append((idx, summary))
-
-    # STEP 3: Combine all first-pass summaries into one big text
-    summaries.sort(key=lambda x: x[0])   # sort by chunk index
-    combined_list = [s for _, s in summaries]  # extract only summaries
-    combined = "\n".join(combined_list)        # join cleanly with newline
-
-
-    # STEP 4: Ask LLM to summarize the combined summaries into a final result
-    final_prompt = getSummaryPromt(combined, summary_prompt=summary_prompt)
-    await asyncio.to_thread(write_to_file, index=f"promt_{summary_file_name}", content=final_prompt)
-    logging.info("Combined summaries prompt created.")
+    4) Summarize the combined summaries again\n
+    Every chunk result is checkpointed in a run manifest; with `resume=True` chunks
+    completed by a previous run of the same document and parameters are skipped and
+    chunks that failed go straight to the retry step.\n
+    When the chunk summaries do not fit in one `max_chars` prompt they are first reduced
+    hierarchically (`reduce_fan_in` summaries per call, at most `reduce_max_depth` levels;
+    0 disables it). Run statistics are written into `report` when given.\n
+    Near-duplicate chunks (estimated Jaccard similarity of their word shingles at least
+    `dedup_threshold`; default from DEDUP_THRESHOLD, off when 0 or unset) are not sent:
+    each reuses the summary of the first chunk of its cluster, and `report["dedup"]`
+    counts the LLM calls saved.\n
+    All LLM calls of the run (first pass, retries, reduces) share one adaptive
+    `controller`; by default a new one is configured from the environment, sized to the
+    whole endpoint pool when LLM_ENDPOINTS lists several servers.\n
+    `on_event` receives progress as it happens: {"type": "progress", "done", "total"},
+    {"type": "chunk", "index", "summary"}, {"type": "stage", "stage"} and, while the final
+    summary is streamed, {"type": "token", "text"}.\n
+    The run is traced (see `trace_utils`): a Chrome trace with one lane per chunk and a
+    critical-path summary are written to output/traces, or added to `tracer` when given.\n
+    With a `token_budget` (by default from LLM_CONTEXT_TOKENS) chunks and reduce batches are
+    sized in the model's tokens and an oversized final prompt is rejected before it is sent.\n
+    `chunking` is "fixed" or "cdc" (content-defined boundaries; default from CHUNKING). With
+    `incremental`, chunks whose text matches a chunk summarized by the book's previous run
+    (same name and parameters, or the manifest path `previous_run`) reuse that summary: a
+    revised draft only sends its changed chunks, then reduces again.
+    `report["incremental"]` counts the reused chunks.\n
+    `deadline` (seconds, default from RUN_DEADLINE_SECONDS; an enclosing deadline also
+    applies) bounds the whole run: chunks get until DEADLINE_MAP_FRACTION of it, reduces
+    until DEADLINE_REDUCE_FRACTION, and every slot wait and request is cut off at its
+    stage's end. Chunks still unsummarized then are left for a resume and marked as gaps;
+    out of time for the final summary, the run returns the chunk summaries it has under a
+    note. `chunk_timeout` (default from LLM_CHUNK_TIMEOUT) cancels a single chunk request
+    and sends the chunk to the retry path. `report["deadline"]` says what was cut.
+    """
+    if deadline is None:
+        deadline = deadlines.env_seconds("RUN_DEADLINE_SECONDS")
+    if chunk_timeout is None:
+        chunk_timeout = deadlines.env_seconds("LLM_CHUNK_TIMEOUT")
+    run_started = time.monotonic()
+    with tracing.run(summary_file_name, "multi_pass_summarize", tracer), artifacts.run(summary_file_name) as run_artifacts, \
+            deadlines.deadline(deadline) as run_deadline:
+        summaries = []
+        # Stage deadlines, as fractions of the run's time budget
+        map_deadline = reduce_deadline = None
+        if run_deadline is not None:
+            map_deadline = run_started + (run_deadline - run_started) * DEADLINE_MAP_FRACTION
+            reduce_deadline = run_started + (run_deadline - run_started) * DEADLINE_REDUCE_FRACTION
+        if controller is None:
+            pool = get_endpoint_pool()
+            controller = ConcurrencyController.from_env(capacity=pool.capacity if pool else None)
+        breaker = CircuitBreaker(name=summary_file_name)
+        if token_budget is None:
+            token_budget = get_token_budget()
+        chunking = chunking or os.getenv("CHUNKING", DEFAULT_CHUNKING_MODE)
+        if dedup_threshold is None:
+            dedup_threshold = float(os.getenv("DEDUP_THRESHOLD") or DEFAULT_DEDUP_THRESHOLD)
+
+        # STEP 1: Split raw text into manageable chunks
+        with tracing.stage("chunking"):
+            if token_budget is None:
+                chunks = chunk_text(text, max_chars=max_chars, overlap=chunk_overlap, length_fn=length_fn, mode=chunking)
+            else:
+                # Token counts may come from the endpoint: keep the HTTP calls off the event loop
+                chunks, chunk_chars = await asyncio.to_thread(
+                    plan_chunks, text, token_budget, max_chars, chunk_overlap, chunk_prompt, user_prompt, max_response_tokens, length_fn, chunking
+                )
+                logging.info(f"Chunk size: {chunk_chars} characters under the token budget.")
+        logging.info(f"Total chunks: {len(chunks)}")
+
+        # STEP 1.5: Cluster near-duplicate chunks; only the first chunk of a cluster is summarized
+        duplicates = {}
+        if dedup_threshold:
+            with tracing.stage("dedup"):
+                duplicates = await asyncio.to_thread(find_near_duplicates, chunks, dedup_threshold)
+            if duplicates:
+                logging.info(f"{len(duplicates)} of {len(chunks)} chunks are near duplicates of earlier chunks.")
+
+        # Checkpoint keyed by the document and everything that changes a chunk summary,
+        # the model included: another model's summaries are never reused.
+        # The configured max_chars, not the size derived from this text under a token budget
+        # (budget and tokenizer are keyed below): a revised draft must find its previous run
+        params = {
+            "model": get_model_name(),
+            "max_chars": max_chars,
+            "chunk_overlap": chunk_overlap,
+            "length_fn": getattr(length_fn, "__name__", None),
+            "chunk_prompt": chunk_prompt,
+            "user_prompt": user_prompt,
+            "max_response_tokens": max_response_tokens,
+            "dedup_threshold": dedup_threshold,
+        }
+        if token_budget is not None:
+            params.update(context_tokens=token_budget.context_tokens, tokenizer=token_budget.tokenizer.name)
+        if get_prompt_layout() != "inline":
+            params["prompt_layout"] = get_prompt_layout()
+        if get_llm_engine() != DEFAULT_LLM_ENGINE:
+            params["engine"] = get_llm_engine()
+        if chunking != "fixed":
+            params["chunking"] = chunking
+        manifest = RunManifest.open(
+            text, params, len(chunks), base_dir=checkpoint_dir, resume=resume,
+            name=summary_file_name, chunk_hashes=[hash_text(chunk) for chunk in chunks]
+        )
+
+        # A revised draft: chunks unchanged since the book's previous run keep their summaries
+        if (incremental or previous_run) and manifest.indices(PENDING):
+            previous_path = previous_run or RunManifest.find_previous(checkpoint_dir, summary_file_name, params, exclude=manifest.path)
+            previous = RunManifest.load(previous_path) if previous_path else None
+            if previous is not None:
+                reused_chunks = manifest.reuse(previous)
+                metrics.CHUNKS_REUSED.inc(reused_chunks)
+                logging.info(f"{reused_chunks} of {len(chunks)} chunks are unchanged since {previous_path}.")
+                if report is not None:
+                    report["incremental"] = {
+                        "previous": previous_path,
+                        "reused_chunks": reused_chunks,
+                        "changed_chunks": len(manifest.indices(PENDING)),
+                    }
+                await manifest.asave()
+        artifacts.record("params", "run", json.dumps(params, ensure_ascii=False))
+        if report is not None and run_artifacts is not None:
+            report["run_id"] = run_artifacts.run_id
+        summaries.extend(manifest.completed().items())
+
+        def emit(event_type, **data):
+            if on_event is not None:
+                on_event({"type": event_type, **data})
+
+        done_count = len(summaries)
+        emit("progress", done=done_count, total=len(chunks))
+
+        map_results = []
+
+        async def summarize_and_checkpoint(i, first_attempt):
+            nonlocal done_count
+            with tracing.lane(f"chunk {i+1}"):
+                idx, summary = await summarize_chunk_with_retries(
+                    chunks, i, chunk_prompt, user_prompt, max_response_tokens, controller, breaker,
+                    first_attempt=first_attempt, timeout=chunk_timeout
+                )
+                manifest.record(idx, summary)
+                map_results.append((idx, summary))
+                with tracing.span("checkpoint"):
+                    await manifest.asave()
+            done_count += 1
+            if summary is not None:
+                emit("chunk", index=idx, summary=str(summary))
+            emit("progress", done=done_count, total=len(chunks))
+            return idx, summary
+
+        # STEP 2: Summarize each chunk concurrently; failures are retried as soon as they happen
+            # Create tasks for all chunks not completed by a previous run;
+            # chunks that failed in that run go straight to the retry step
+        def chunk_task(i, first_attempt):
+            return asyncio.create_task(summarize_and_checkpoint(i, first_attempt))
+
+        # Chunk tasks inherit the map stage's deadline: slot waits, requests and retries stop there
+        with deadlines.deadline(at=map_deadline):
+            tasks = [chunk_task(i, True) for i in manifest.indices(PENDING) if i not in duplicates]
+            tasks += [chunk_task(i, False) for i in manifest.indices(FAILED) if i not in duplicates]
+
+            # Await tasks and collect results
+        try:
+            with tracing.stage("map", chunks=len(tasks)):
+                # Safety net: whatever still runs at the run's deadline is cancelled
+                results = await deadlines.wait(asyncio.gather(*tasks), "the chunk summaries")
+        except DeadlineExceeded:
+            # Unfinished chunks stay pending in the checkpoint for a later resume
+            logging.error(f"ERROR: Out of time with {len(tasks) - len(map_results)} chunks unfinished.")
+            results = list(map_results)
+            await manifest.asave()
+        except CircuitOpenError:
+            # The endpoint is down: stop every chunk now, keep the checkpoint for a later resume
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await manifest.asave()
+            raise
+            # Process results
+        for idx, summary in results:
+            if summary is not None:
+                summaries.append((idx, summary))
+
+        # Near duplicates take their representative's summary (or fail with it)
+        reused = 0
+        if duplicates:
+            done = dict(summaries)
+            for idx, representative in sorted(duplicates.items()):
+                if idx in done:
+                    continue
+                summary = done.get(representative)
+                manifest.record(idx, summary)
+                done_count += 1
+                if summary is not None:
+                    reused += 1
+                    summaries.append((idx, summary))
+                    emit("chunk", index=idx, summary=str(summary))
+            metrics.CHUNKS_DEDUPLICATED.inc(reused)
+            await manifest.asave()
+            emit("progress", done=done_count, total=len(chunks))
+
+        # STEP 3: Combine all first-pass summaries into one big text
+        summaries.sort(key=lambda x: x[0])   # sort by chunk index
+        missing = []
+        if run_deadline is not None:
+            # Under a deadline, say where chunks are missing instead of silently closing the gaps
+            summarized = {idx for idx, _ in summaries}
+            missing = [i for i in range(len(chunks)) if i not in summarized]
+        combined_list = with_gap_notes(summaries, missing)
+        if report is not None:
+            report.update({"chunks": len(chunks), "summarized_chunks": len(summaries)})
+            report["dedup"] = {"duplicate_chunks": len(duplicates), "llm_calls_saved": reused}
+
+        # STEP 3.5: Reduce level by level until the summaries fit in a single prompt
+        emit("stage", stage="reduce")
+        reduce_budget, reduce_length_fn = max_chars, length_fn
+        if token_budget is not None:
+            reduce_budget = token_budget.content_tokens(summary_prompt, user_prompt, max_response_tokens, wrap=getSummaryPromt, layout=get_prompt_layout())
+            reduce_length_fn = token_budget.count
+        with tracing.stage("reduce"), deadlines.deadline(at=reduce_deadline):
+            combined_list = await tree_reduce_summaries(
+                combined_list,
+                summary_prompt=summary_prompt,
+                user_prompt=user_prompt,
+                max_response_tokens=max_response_tokens,
+                budget=reduce_budget,
+                fan_in=reduce_fan_in,
+                max_depth=reduce_max_depth,
+                length_fn=reduce_length_fn,
+                report=report,
+                controller=controller
+            )
+        combined = "\n".join(combined_list)        # join cleanly with newline
+
+
+        # STEP 4: Ask LLM to summarize the combined summaries into a final result
+        final_prompt, final_user_prompt = layoutPrompt(combined, summary_prompt, user_prompt, layout=get_prompt_layout(), wrap=getSummaryPromt)
+        final_prompt_file = final_prompt if final_user_prompt == user_prompt else f"{final_prompt}\n\n{final_user_prompt}"
+        artifacts.record("prompt", "final", final_prompt_file)
+        logging.info("Combined summaries prompt created.")
+        if token_budget is not None and not deadlines.expired():
+            # Fail here rather than after a round trip the endpoint would reject
+            await asyncio.to_thread(token_budget.check, final_prompt, final_user_prompt, max_response_tokens)
     
-    logging.info("Generating final summary...")
-    final_summary = await run_summarize_llm(
-        final_prompt, 
-        user_prompt=user_prompt, 
-        max_response_tokens=max_response_tokens
-    )
+        logging.info("Generating final summary...")
+        emit("stage", stage="final")
+        final_started = time.perf_counter()
+        final_summary = None
+        with tracing.stage("final"):
+            waited = tracing.now()
+            try:
+                async with controller.slot(tokens=estimate_tokens(final_prompt_file) + max_response_tokens) as request:
+                    tracing.record("wait_slot", waited)
+                    if on_event is not None:
+                        final_summary = await stream_final_summary(final_prompt, final_user_prompt, max_response_tokens, on_event)
+                    else:
+                        final_summary = await run_summarize_llm(
+                            final_prompt, 
+                            user_prompt=final_user_prompt, 
+                            max_response_tokens=max_response_tokens
+                        )
+                    request["cached"] = as_llm_result(final_summary).cached
+            except DeadlineExceeded as e:
+                logging.error(f"ERROR: {e}")
+        if final_summary is None or (deadlines.expired() and not as_llm_result(final_summary).usable):
+            # Out of time: hand back what the run has rather than nothing
+            logging.warning(f"Out of time for the final summary of {summary_file_name}; returning the chunk summaries.")
+            final_summary = LLMResult(f"{DEADLINE_PARTIAL_NOTE}\n\n{combined}", LLMStatus.TRUNCATED, error="deadline exceeded")
+        if report is not None and run_deadline is not None:
+            report["deadline"] = {
+                "seconds": round(run_deadline - run_started, 3),
+                "missing_chunks": len(missing),
+                "degraded": bool(missing) or (deadlines.expired() and getattr(final_summary, "status", None) == LLMStatus.TRUNCATED),
+            }
     
-    # Backup: save final summary to a file for inspection
-    logging.info(f"Saving final summary to /output/{summary_file_name}_summary.txt")
-    await asyncio.to_thread(write_to_file, index=f"result_{summary_file_name}", content=final_summary)
-    logging.info("Final summary saved.")
+        # Backup: keep the final summary with the run's artifacts for inspection
+        logging.info(f"Saving final summary of {summary_file_name} to the run artifacts")
+        final_elapsed = time.perf_counter() - final_started
+        artifacts.record("summary", "final", final_summary, usage=getattr(final_summary, "usage", None), elapsed=final_elapsed)
+        manifest.final_summary = final_summary
+        await manifest.asave()
+        logging.info("Final summary saved.")
     
-    logging.info("Multi-pass summarization complete. Returning final summary.")
-    return final_summary.strip()   # cleanup formatting and return
+        logging.info(f"LLM response cache: {get_response_cache().stats()}")
+        logging.info(f"Concurrency: {controller.stats()}")
+        logging.info("Multi-pass summarization complete. Returning final summary.")
+        return final_summary.strip()   # cleanup formatting and return
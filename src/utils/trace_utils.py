@@ -0,0 +1,222 @@
+# trace_utils.py
+
+import contextvars
+import datetime
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+from src.constants.constants import TRACE_DIR
+
+RUN_LANE = "run"
+
+# The tracer of the run in progress and the lane (chunk, reduce batch...) spans go to.
+# asyncio tasks copy both when they are created, so a chunk task keeps its own lane.
+current_tracer: contextvars.ContextVar = contextvars.ContextVar("current_tracer", default=None)
+current_lane: contextvars.ContextVar = contextvars.ContextVar("current_lane", default=RUN_LANE)
+
+
+def tracing_enabled() -> bool:
+    """
+    Runs are traced unless TRACE_RUNS is 0/false.
+    """
+    return os.getenv("TRACE_RUNS", "1").lower() not in ("0", "false", "no")
+
+
+class Tracer:
+    """
+    Collects the spans of one run as Chrome trace events ("X" complete events, one
+    thread lane per chunk) that open in Perfetto or chrome://tracing.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.events: List[dict] = []
+        self.lanes: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.wall_started = datetime.datetime.now()
+        self._lane_id(RUN_LANE)
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def _us(self, t) -> float:
+        return round((t - self.started) * 1e6, 1)
+
+    def _lane_id(self, lane) -> int:
+        if lane not in self.lanes:
+            self.lanes[lane] = len(self.lanes)
+        return self.lanes[lane]
+
+    def record(self, name, start, end=None, lane=None, cat="span", **args):
+        """
+        Adds a finished span from `start` to `end` (perf_counter seconds).
+        """
+        end = self.now() if end is None else end
+        self.events.append({
+            "name": name, "cat": cat, "ph": "X", "pid": 1,
+            "tid": self._lane_id(lane or current_lane.get()),
+            "ts": self._us(start), "dur": round(max(0.0, end - start) * 1e6, 1),
+            "args": args,
+        })
+
+    def instant(self, name, lane=None, **args):
+        self.events.append({
+            "name": name, "cat": "mark", "ph": "i", "s": "t", "pid": 1,
+            "tid": self._lane_id(lane or current_lane.get()), "ts": self._us(self.now()), "args": args,
+        })
+
+    @contextmanager
+    def span(self, name, lane=None, cat="span", **args):
+        """
+        Times the `with` block; the yielded dict can be filled with arguments shown in the viewer.
+        """
+        start = self.now()
+        try:
+            yield args
+        finally:
+            self.record(name, start, lane=lane, cat=cat, **args)
+
+    def to_chrome(self) -> dict:
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}}]
+        for lane, tid in self.lanes.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}})
+            metadata.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}})
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def save(self, base_dir=TRACE_DIR) -> Optional[str]:
+        """
+        Writes `<name>_<time>.trace.json` and the critical-path summary next to it.\n
+        Returns the trace path; tracing problems are logged, never raised.
+        """
+        from .checkpoint_utils import atomic_write_text
+
+        try:
+            safe_name = re.sub(r"[^\w.-]+", "_", self.name) or "run"
+            stem = os.path.join(base_dir, f"{safe_name}_{self.wall_started.strftime('%Y%m%d-%H%M%S')}")
+            atomic_write_text(f"{stem}.trace.json", json.dumps(self.to_chrome()))
+            summary = critical_path_summary(self)
+            atomic_write_text(f"{stem}.critical_path.txt", summary + "\n")
+            logging.info(f"Trace written to {stem}.trace.json\n{summary}")
+            return f"{stem}.trace.json"
+        except Exception as e:
+            logging.warning(f"Writing the trace failed: {e}")
+            return None
+
+
+def span(name, cat="span", **args):
+    """
+    A span on the active run's current lane; does nothing when no run is being traced.
+    """
+    tracer = current_tracer.get()
+    if tracer is None:
+        return nullcontext(args)
+    return tracer.span(name, cat=cat, **args)
+
+
+def record(name, start, end=None, **args):
+    tracer = current_tracer.get()
+    if tracer is not None and start is not None:
+        tracer.record(name, start, end, **args)
+
+
+def now() -> Optional[float]:
+    """
+    Start time for `record`, or None (no clock read) when no run is traced.
+    """
+    return time.perf_counter() if current_tracer.get() is not None else None
+
+
+def instant(name, **args):
+    tracer = current_tracer.get()
+    if tracer is not None:
+        tracer.instant(name, **args)
+
+
+def stage(name, **args):
+    """
+    A top-level stage of the run (extract, map, reduce, final...) used by the critical-path summary.
+    """
+    tracer = current_tracer.get()
+    if tracer is None:
+        return nullcontext(args)
+    return tracer.span(name, lane=RUN_LANE, cat="stage", **args)
+
+
+@contextmanager
+def lane(name):
+    """
+    Sends the spans of the `with` block (and of tasks created in it) to lane `name`.
+    """
+    token = current_lane.set(name)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+@contextmanager
+def run(trace_name, span_name, tracer: Optional[Tracer] = None):
+    """
+    Traces a run as span `span_name`. Joins `tracer` (or the run already active) when given;
+    otherwise starts a trace called `trace_name` and saves it when the block exits, even on error.
+    """
+    active = tracer or current_tracer.get()
+    if active is None and not tracing_enabled():
+        yield None
+        return
+    owned = active is None
+    active = active or Tracer(trace_name)
+    token = current_tracer.set(active)
+    try:
+        with active.span(span_name, lane=RUN_LANE, cat="run"):
+            yield active
+    finally:
+        current_tracer.reset(token)
+        if owned:
+            active.save()
+
+
+def critical_path_summary(tracer: Tracer) -> str:
+    """
+    Text report of where the makespan went: each top-level stage's share, and for the
+    stage that bounded the run, the breakdown of the lane that finished last.
+    """
+    events = [e for e in tracer.events if e["ph"] == "X"]
+    if not events:
+        return f"Trace {tracer.name}: no spans recorded."
+    lane_names = {tid: lane for lane, tid in tracer.lanes.items()}
+    makespan = (max(e["ts"] + e["dur"] for e in events) - min(e["ts"] for e in events)) / 1e6
+    stages = sorted((e for e in events if e["cat"] == "stage"), key=lambda e: e["ts"])
+
+    lines = [f"Trace {tracer.name}: makespan {makespan:.3f}s", "Stages:"]
+    for e in stages:
+        share = e["dur"] / 1e6 / makespan if makespan else 0.0
+        lines.append(f"  {e['name']:<14} {e['dur'] / 1e6:9.3f}s {share:6.1%}")
+    if not stages:
+        return "\n".join(lines + ["  (no stages recorded)"])
+
+    bounding = max(stages, key=lambda e: e["dur"])
+    lo, hi = bounding["ts"], bounding["ts"] + bounding["dur"]
+    inner = [e for e in events if e["tid"] != 0 and lo <= e["ts"] <= hi]
+    lines.append(f"Bounding stage: {bounding['name']} ({bounding['dur'] / 1e6:.3f}s)")
+    if inner:
+        # The lane that finished last is what the stage waited for
+        last_tid = max(inner, key=lambda e: e["ts"] + e["dur"])["tid"]
+        totals: Dict[str, List[float]] = {}
+        for e in inner:
+            if e["tid"] == last_tid:
+                totals.setdefault(e["name"], []).append(e["dur"] / 1e6)
+        parts = ", ".join(f"{name} {sum(d):.3f}s" + (f" x{len(d)}" if len(d) > 1 else "") for name, d in sorted(totals.items(), key=lambda kv: -sum(kv[1])))
+        lines.append(f"  finished last: {lane_names.get(last_tid, last_tid)} ({parts})")
+
+        all_totals: Dict[str, float] = {}
+        for e in inner:
+            all_totals[e["name"]] = all_totals.get(e["name"], 0.0) + e["dur"] / 1e6
+        busy = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in sorted(all_totals.items(), key=lambda kv: -kv[1]))
+        lines.append(f"  all lanes: {busy}")
+    return "\n".join(lines)
@@ -8,3 +8,11 @@ class FakeAsyncOpenAI:
 @pytest.fixture(autouse=True)
 def mock_openai(monkeypatch):
     monkeypatch.setattr(llm_openAI, "client", FakeAsyncOpenAI())
+    # Keep test runs from reading or filling the on-disk response cache
+    monkeypatch.setattr(llm_openAI, "LLM_CACHE_MODE", "bypass")
+    # Tests that want a trace pass their own Tracer
+    monkeypatch.setenv("TRACE_RUNS", "0")
+    # Tests that want the page text cache pass their own directory
+    monkeypatch.setenv("PDF_TEXT_CACHE", "0")
+    # Tests that want run artifacts pass their own store
+    monkeypatch.setenv("ARTIFACT_STORE", "0")
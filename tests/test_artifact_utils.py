@@ -0,0 +1,53 @@
+import asyncio
+
+from src.utils import artifact_utils
+from src.utils.artifact_utils import ArtifactStore
+
+
+def test_store_compresses_large_texts_and_answers_queries(tmp_path):
+    store = ArtifactStore(str(tmp_path / "runs.sqlite"), compress_min_bytes=100)
+    first = store.start_run("book")
+    second = store.start_run("book")
+    assert first != second
+
+    store.add(first, "prompt", "final", "text " * 1000)
+    store.add(first, "summary", "chunk_1", "scurt", chunk=0, elapsed=1.5, usage={"prompt_tokens": 10, "completion_tokens": 4})
+    store.add(second, "summary", "chunk_1", "alt rezumat")
+    store.finish_run(first)
+
+    [prompt] = store.artifacts(first, kind="prompt")
+    assert prompt["content"] == "text " * 1000
+    assert prompt["compressed"] == 1 and prompt["size"] == 5000
+    assert store.content(first, "summary", "chunk_1") == "scurt"
+    assert store.content(second, "summary", "chunk_1") == "alt rezumat"
+    assert {run["run_id"]: run["status"] for run in store.runs(name="book")} == {first: "ok", second: "running"}
+
+    stats = store.run_stats(first)
+    assert stats["artifacts"] == {"prompt": 1, "summary": 1}
+    assert stats["prompt_tokens"] == 10 and stats["elapsed"] == 1.5
+    assert stats["stored_bytes"] < stats["bytes"]
+    store.close()
+
+
+def test_run_context_records_from_tasks_and_marks_failures(tmp_path):
+    store = ArtifactStore(str(tmp_path / "runs.sqlite"))
+
+    async def chunk(i):
+        artifact_utils.record("summary", f"chunk_{i}", f"rezumat {i}", chunk=i)
+
+    async def pipeline():
+        await asyncio.gather(*(chunk(i) for i in range(50)))
+
+    with artifact_utils.run("book", store=store) as run:
+        asyncio.run(pipeline())
+    try:
+        with artifact_utils.run("book", store=store):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    artifact_utils.record("summary", "outside", "dropped")
+
+    assert len(store.artifacts(run.run_id)) == 50
+    assert [r["status"] for r in store.runs(name="book")] == ["error", "ok"]
+    assert store.written == 50 + 4
+    store.close()
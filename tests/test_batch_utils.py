@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+
+from src.utils import batch_utils
+
+
+def _make_pdf(path, text):
+    import fitz
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_discover_books_from_directory_and_manifest(tmp_path):
+    (tmp_path / "shelf").mkdir()
+    _make_pdf(tmp_path / "shelf" / "b.pdf", "B")
+    _make_pdf(tmp_path / "a.pdf", "A")
+    (tmp_path / "notes.txt").write_text("not a book")
+    assert [b.title for b in batch_utils.discover_books(str(tmp_path))] == ["a", "b"]
+
+    manifest = tmp_path / "books.jsonl"
+    manifest.write_text('# nightly\n{"path": "a.pdf", "impressions": "loved it"}\nshelf/b.pdf\n')
+    books = batch_utils.discover_books(str(manifest))
+    assert [b.path for b in books] == [str(tmp_path / "a.pdf"), str(tmp_path / "shelf" / "b.pdf")]
+    assert books[0].impressions == "loved it" and books[1].impressions is None
+
+
+def test_run_batch_shares_controller_reports_and_resumes(tmp_path, monkeypatch):
+    books = [batch_utils.Book(_make_pdf(tmp_path / f"{name}.pdf", f"Text of {name}")) for name in ("one", "two", "bad")]
+    controllers = set()
+
+    async def fake_multi_pass_summarize(text, summary_file_name, report=None, controller=None, resume=False, **kwargs):
+        controllers.add(id(controller))
+        if summary_file_name.startswith("bad-"):
+            raise RuntimeError("model refused")
+        report.update({"chunks": 1, "summarized_chunks": 1})
+        await asyncio.sleep(0)
+        return f"summary: {text.strip()}"
+
+    monkeypatch.setattr(batch_utils, "multi_pass_summarize", fake_multi_pass_summarize)
+    out_dir = str(tmp_path / "out")
+    records = asyncio.run(batch_utils.run_batch(books, out_dir=out_dir, extraction_workers=2))
+
+    # Every book goes through the same scheduler
+    assert len(controllers) == 1
+    by_book = {r["title"]: r for r in records}
+    assert by_book["one"]["status"] == "ok" and by_book["bad"]["status"] == "failed"
+    with open(os.path.join(out_dir, books[1].name, "summary.txt"), encoding="utf-8") as f:
+        assert f.read() == "summary: Text of two"
+    with open(os.path.join(out_dir, batch_utils.REPORT_FILE_NAME), encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 3
+
+    # A second run only retries the book that failed
+    records = asyncio.run(batch_utils.run_batch(books, out_dir=out_dir, extraction_workers=2))
+    assert [r["title"] for r in records] == ["bad"]
+
+
+def test_same_named_books_in_different_folders_do_not_collide(tmp_path, monkeypatch):
+    for shelf in ("a", "b"):
+        (tmp_path / shelf).mkdir()
+        _make_pdf(tmp_path / shelf / "intro.pdf", f"Intro of shelf {shelf}")
+    books = batch_utils.discover_books(str(tmp_path))
+    assert [b.title for b in books] == ["intro", "intro"]
+    assert books[0].name != books[1].name
+
+    names = []
+
+    async def fake_multi_pass_summarize(text, summary_file_name, report=None, **kwargs):
+        names.append(summary_file_name)
+        return f"summary: {text.strip()}"
+
+    monkeypatch.setattr(batch_utils, "multi_pass_summarize", fake_multi_pass_summarize)
+    out_dir = str(tmp_path / "out")
+    records = asyncio.run(batch_utils.run_batch(books, out_dir=out_dir, extraction_workers=1))
+
+    assert sorted(names) == sorted(b.name for b in books)
+    summaries = set()
+    for record in records:
+        with open(record["outputs"]["summary"], encoding="utf-8") as f:
+            summaries.add(f.read())
+    assert summaries == {"summary: Intro of shelf a", "summary: Intro of shelf b"}
+    # Both books are reported done, so a second run skips both
+    assert asyncio.run(batch_utils.run_batch(books, out_dir=out_dir, extraction_workers=1)) == []
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+
+from src.utils.checkpoint_utils import DONE, FAILED, PENDING, RunManifest
+
+
+def test_manifest_roundtrip_and_atomic_save(tmp_path):
+    manifest = RunManifest.open("book text", {"max_chars": 10}, 3, base_dir=tmp_path)
+    manifest.record(0, "first")
+    manifest.record(2, None)
+    asyncio.run(manifest.asave())
+
+    # Only the manifest itself is left behind, no temp files
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(manifest.path)]
+    data = json.loads(open(manifest.path, encoding="utf-8").read())
+    assert [c["state"] for c in data["chunks"]] == [DONE, PENDING, FAILED]
+
+    resumed = RunManifest.open("book text", {"max_chars": 10}, 3, base_dir=tmp_path, resume=True)
+    assert resumed.completed() == {0: "first"}
+    assert resumed.indices(FAILED) == [2]
+    # Different parameters never pick up the old checkpoint
+    other = RunManifest.open("book text", {"max_chars": 20}, 3, base_dir=tmp_path, resume=True)
+    assert other.indices(PENDING) == [0, 1, 2]
+
+
+def test_multi_pass_resume_skips_completed_chunks(tmp_path, monkeypatch):
+    from src.utils import summarize_utils
+
+    calls = []
+    fail = {"on": True}
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        calls.append(chunk)
+        if fail["on"] and chunk.startswith("Chunk 2"):
+            return ""
+        return f"summary of {chunk[:7]}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+    monkeypatch.setattr(summarize_utils, "RETRY_BACKOFF_BASE_SECONDS", 0)
+
+    text = "".join(f"Chunk {i} has some text.\n\n" for i in range(4))
+    run = lambda: asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "book", max_chars=30, resume=True, checkpoint_dir=str(tmp_path)))
+
+    assert run() == "FINAL"
+    first_run_calls = len(calls)
+    assert first_run_calls == 4 + summarize_utils.NUMBER_OF_RETRIES
+
+    calls.clear()
+    fail["on"] = False
+    assert run() == "FINAL"
+    assert [c[:7] for c in calls] == ["Chunk 2"]
+
+
+def test_multi_pass_revised_draft_only_summarizes_changed_chunks(tmp_path, monkeypatch):
+    from src.utils import summarize_utils
+
+    calls = []
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        calls.append(chunk)
+        return f"summary {len(calls)}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+
+    paragraphs = [f"Paragraful {i} descrie capitolul {i} al cărții în câteva cuvinte." for i in range(200)]
+    draft = "\n\n".join(paragraphs)
+    revised = "\n\n".join(paragraphs[:120] + ["Un paragraf nou, adăugat de editor în a doua versiune."] + paragraphs[120:])
+
+    def run(text):
+        report = {}
+        asyncio.run(summarize_utils.multi_pass_summarize(
+            text, "book", max_chars=600, chunking="cdc", dedup_threshold=0, report=report, checkpoint_dir=str(tmp_path)))
+        return report
+
+    first = run(draft)
+    assert "incremental" not in first
+    first_calls = len(calls)
+    calls.clear()
+
+    second = run(revised)
+    assert second["incremental"]["reused_chunks"] == second["chunks"] - len(calls)
+    assert 1 <= len(calls) <= 3 < first_calls
+    assert any("Un paragraf nou" in chunk for chunk in calls)
+
+
+def test_revised_draft_finds_previous_run_under_a_token_budget(tmp_path, monkeypatch):
+    from src.llm.token_budget import TokenBudget
+    from src.utils import summarize_utils
+
+    class TextDependentBudget(TokenBudget):
+        # The chunk size derived from a text varies with it, as the chars-per-token ratio does
+        def max_chars(self, text, *args, **kwargs):
+            return 580 + len(text) % 7
+
+    calls = []
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        calls.append(chunk)
+        return f"summary {len(calls)}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+
+    paragraphs = [f"Paragraful {i} descrie capitolul {i} al cărții în câteva cuvinte." for i in range(200)]
+    draft = "\n\n".join(paragraphs)
+    revised = "\n\n".join(paragraphs[:120] + ["Un paragraf nou."] + paragraphs[120:])
+    budget = TextDependentBudget(context_tokens=100000)
+    assert budget.max_chars(draft) != budget.max_chars(revised)
+
+    def run(text):
+        report = {}
+        asyncio.run(summarize_utils.multi_pass_summarize(
+            text, "book", max_chars=600, chunking="cdc", dedup_threshold=0, report=report,
+            checkpoint_dir=str(tmp_path), token_budget=budget))
+        return report
+
+    run(draft)
+    first_calls = len(calls)
+    calls.clear()
+    second = run(revised)
+    assert second["incremental"]["reused_chunks"] > 0
+    assert len(calls) < first_calls
+
+
+def test_model_change_invalidates_resume_and_reuse(tmp_path, monkeypatch):
+    import src.llm.llm_openAI as llm
+    from src.utils import summarize_utils
+
+    calls = []
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        calls.append(chunk)
+        return f"summary {len(calls)}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+
+    paragraphs = [f"Paragraful {i} descrie capitolul {i} al cărții în câteva cuvinte." for i in range(40)]
+    text = "\n\n".join(paragraphs)
+
+    def run(model):
+        monkeypatch.setattr(llm, "MODEL_NAME", model)
+        report = {}
+        asyncio.run(summarize_utils.multi_pass_summarize(
+            text, "book", max_chars=600, chunking="cdc", dedup_threshold=0, resume=True, report=report,
+            checkpoint_dir=str(tmp_path)))
+        calls_made = len(calls)
+        calls.clear()
+        return calls_made, report
+
+    first_calls, _ = run("model-a")
+    assert first_calls > 0
+    assert run("model-a")[0] == 0  # same model: resumed from the checkpoint
+    calls_made, report = run("model-b")
+    assert calls_made == first_calls
+    assert "incremental" not in report
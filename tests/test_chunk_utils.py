@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from src.utils.chunk_utils import cdc_spans, chunk_spans
+
+
+def _random_text(rng, size):
+    words = ["carte", "rezumat", "și", "capitol", "autorul", "idee", "ț", "x" * 300]
+    seps = [" ", " ", " ", ". ", "! ", "\n", "\n\n", "\n  \n"]
+    parts = []
+    while sum(map(len, parts)) < size:
+        parts.append(rng.choice(words))
+        parts.append(rng.choice(seps))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_chunk_spans_size_guarantee_and_coverage(seed):
+    rng = random.Random(seed)
+    text = _random_text(rng, rng.randint(0, 20000))
+    max_len = rng.randint(20, 2000)
+    spans = chunk_spans(text, max_len=max_len)
+
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert end - start <= max_len
+        assert text[start:end].strip() != ""
+    # Without overlap the spans are ordered, disjoint and only skip whitespace
+    covered = "".join(text[s:e] for s, e in spans)
+    assert covered.split() == text.split()
+    assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_chunk_spans_overlap_and_length_fn(seed):
+    rng = random.Random(100 + seed)
+    text = _random_text(rng, 15000)
+    token_count = lambda s: len(s.split())  # stand-in for a tokenizer
+    max_len = rng.randint(40, 400)
+    overlap = rng.randint(0, max_len // 2)
+    spans = chunk_spans(text, max_len=max_len, overlap=overlap, length_fn=token_count)
+
+    assert spans[0][0] == 0 or text[:spans[0][0]].strip() == ""
+    assert spans[-1][1] == len(text) or text[spans[-1][1]:].strip() == ""
+    for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+        assert s1 < s2 <= e1 or text[e1:s2].strip() == ""
+    for start, end in spans:
+        assert token_count(text[start:end]) <= max_len
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_chunk_spans_character_path_matches_measured_path(seed):
+    # Without length_fn only the boundaries near each cut are looked up; the spans must
+    # be the ones the fully segmented path gives when it measures characters
+    rng = random.Random(200 + seed)
+    text = _random_text(rng, rng.randint(0, 6000))
+    if seed % 4 == 0:
+        text = text.replace("\n", " ")  # one long line: segments over the limit
+    if seed % 5 == 0:
+        text += " " * 700 + "...” " * 50 + "x" * 900
+    max_len = rng.randint(1, 800)
+    overlap = rng.randint(0, max_len - 1) if seed % 2 else 0
+
+    assert chunk_spans(text, max_len=max_len, overlap=overlap) == chunk_spans(
+        text, max_len=max_len, overlap=overlap, length_fn=len
+    )
+
+
+def test_chunk_spans_prefers_paragraph_boundaries():
+    text = ("Prima frază. A doua frază.\n\n" * 10)
+    spans = chunk_spans(text, max_len=100)
+    for start, end in spans[:-1]:
+        assert text[start:end].endswith("\n\n")
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_cdc_spans_size_guarantee_and_coverage(seed):
+    rng = random.Random(200 + seed)
+    text = _random_text(rng, rng.randint(0, 20000))
+    max_len = rng.randint(50, 2000)
+    spans = cdc_spans(text, max_len=max_len)
+
+    for start, end in spans:
+        assert end - start <= max_len
+        assert text[start:end].strip() != ""
+    assert "".join(text[s:e] for s, e in spans).split() == text.split()
+    assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+
+
+def test_cdc_spans_keep_unchanged_chunks_after_an_edit():
+    rng = random.Random(7)
+    words = ["carte", "rezumat", "și", "capitol", "autorul", "idee", "personajul", "drumul"]
+    paragraph = lambda: " ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) + "."
+    paragraphs = [paragraph() for _ in range(600)]
+    text = "\n\n".join(paragraphs)
+    before = {text[s:e] for s, e in cdc_spans(text, max_len=4000)}
+
+    # Replace one paragraph in the middle with a page of new text
+    revised = "\n\n".join(paragraphs[:300] + [paragraph() for _ in range(4)] + paragraphs[301:])
+    after = [revised[s:e] for s, e in cdc_spans(revised, max_len=4000)]
+    changed = [chunk for chunk in after if chunk not in before]
+    assert len(after) > 50
+    assert 1 <= len(changed) <= 3
@@ -0,0 +1,160 @@
+import asyncio
+import random
+
+import pytest
+
+from src.llm import concurrency
+from src.llm.concurrency import ConcurrencyController, TokenBucket, current_tenant, is_overload_error
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_is_overload_error():
+    assert is_overload_error(FakeStatusError(429))
+    assert is_overload_error(FakeStatusError(503))
+    assert is_overload_error(asyncio.TimeoutError())
+    assert not is_overload_error(FakeStatusError(400))
+    assert not is_overload_error(ValueError("bad"))
+
+
+def test_controller_caps_in_flight_and_reports_queue_depth():
+    async def scenario():
+        controller = ConcurrencyController(initial=2, max_limit=2)
+        peak = 0
+        release = asyncio.Event()
+
+        async def request():
+            nonlocal peak
+            async with controller.slot():
+                peak = max(peak, controller.in_flight)
+                await release.wait()
+
+        tasks = [asyncio.create_task(request()) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert controller.in_flight == 2 and controller.queue_depth == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        return peak, controller
+
+    peak, controller = asyncio.run(scenario())
+    assert peak == 2
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+
+def test_controller_aimd_increase_and_decrease():
+    async def scenario():
+        controller = ConcurrencyController(initial=4, max_limit=8, latency_target=10.0)
+        for _ in range(20):
+            async with controller.slot():
+                pass
+        grown = controller.limit
+
+        with pytest.raises(FakeStatusError):
+            async with controller.slot():
+                raise FakeStatusError(429)
+        return grown, controller.limit
+
+    grown, shrunk = asyncio.run(scenario())
+    assert grown > 4
+    assert shrunk == grown // 2
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_default_latency_target_survives_cache_hits_and_variance(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(concurrency, "time", clock)
+    rng = random.Random(7)
+
+    async def request(controller, latency, cached=False):
+        async with controller.slot() as slot:
+            clock.now += latency
+            slot["cached"] = cached
+
+    async def scenario():
+        controller = ConcurrencyController(initial=5, max_limit=16)
+        # A cache hit answered in a few ms says nothing about the backend
+        await request(controller, 0.005, cached=True)
+        assert controller.stats()["latency_ewma"] is None
+        # Nor does one fast real request lower the baseline for good
+        await request(controller, 0.005)
+        for _ in range(300):
+            await request(controller, rng.uniform(0.1, 0.6))
+        steady = controller.limit
+
+        # A sustained rise in latency is still treated as congestion
+        for _ in range(10):
+            await request(controller, 3.0)
+        return steady, controller.limit
+
+    steady, congested = asyncio.run(scenario())
+    assert steady >= 5
+    assert congested < steady
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        controller = ConcurrencyController(initial=1, max_limit=1)
+        gate = asyncio.Event()
+
+        async def holder():
+            async with controller.slot():
+                await gate.wait()
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        gate.set()
+        await first
+        await asyncio.gather(waiting, return_exceptions=True)
+        async with controller.slot():
+            return controller.in_flight
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_waiting_tenants_are_served_round_robin():
+    async def scenario():
+        controller = ConcurrencyController(initial=1, max_limit=1, latency_target=10.0)
+        order = []
+
+        async def request(tenant, i):
+            current_tenant.set(tenant)
+            async with controller.slot():
+                order.append((tenant, i))
+                await asyncio.sleep(0)
+
+        # A big job queues 20 requests before a small job queues 3
+        tasks = [asyncio.create_task(request("big", i)) for i in range(20)]
+        tasks += [asyncio.create_task(request("small", i)) for i in range(3)]
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(scenario())
+    small_done = max(order.index(("small", i)) for i in range(3))
+    assert small_done <= 6
+    assert [i for tenant, i in order if tenant == "big"] == list(range(20))
+
+
+def test_token_bucket_waits_for_refill():
+    async def scenario():
+        bucket = TokenBucket(tokens_per_minute=6000)  # 100 tokens/s
+        await bucket.acquire(6000)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.acquire(10)
+        return loop.time() - start
+
+    assert asyncio.run(scenario()) >= 0.05
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from src.llm import deadline as deadlines
+from src.llm.concurrency import ConcurrencyController
+from src.llm.deadline import DeadlineExceeded
+
+
+def test_nested_deadlines_only_shrink():
+    assert deadlines.remaining() is None and deadlines.timeout_for(30) == 30
+    with deadlines.deadline(10) as outer:
+        with deadlines.deadline(60) as inner:
+            assert inner == outer
+        with deadlines.deadline(1):
+            assert deadlines.timeout_for(30) <= 1
+            assert deadlines.timeout_for(None) <= 1
+        assert 9 < deadlines.remaining() <= 10
+    with deadlines.deadline(at=time.monotonic() - 1):
+        assert deadlines.expired() and deadlines.remaining() == 0
+    assert deadlines.remaining() is None
+
+
+def test_wait_cancels_at_the_deadline_and_tasks_inherit_it():
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def hang():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def child():
+            return deadlines.remaining()
+
+        with deadlines.deadline(0.05):
+            left = await asyncio.create_task(child())
+            with pytest.raises(DeadlineExceeded):
+                await deadlines.wait(hang(), "hang")
+        return left, cancelled.is_set()
+
+    left, cancelled = asyncio.run(scenario())
+    assert 0 < left <= 0.05 and cancelled
+
+
+def test_slot_wait_gives_up_at_the_deadline():
+    async def scenario():
+        controller = ConcurrencyController(initial=1, max_limit=1)
+        gate = asyncio.Event()
+
+        async def holder():
+            async with controller.slot():
+                await gate.wait()
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        with deadlines.deadline(0.05), pytest.raises(DeadlineExceeded):
+            async with controller.slot():
+                pass
+        gate.set()
+        await held
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.in_flight == 0 and controller.queue_depth == 0
@@ -0,0 +1,74 @@
+import asyncio
+import random
+
+from src.utils.dedup_utils import find_near_duplicates, minhash_signatures
+
+
+def _paragraph(seed, words=400):
+    rng = random.Random(seed)
+    vocabulary = [f"cuvânt{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def test_minhash_estimates_jaccard_similarity():
+    base = _paragraph(1)
+    signatures = minhash_signatures([base, base.upper(), _paragraph(2)])
+    assert (signatures[0] == signatures[1]).all()  # case and spacing do not matter
+    assert (signatures[0] == signatures[2]).mean() < 0.1
+
+
+def test_near_duplicates_map_to_first_representative():
+    base = _paragraph(1)
+    words = base.split()
+    words[200] = "schimbat"  # one edited word, as in a reprinted chapter
+    chunks = [base, _paragraph(2), " ".join(words), _paragraph(3), base]
+
+    assert find_near_duplicates(chunks, threshold=0.8) == {2: 0, 4: 0}
+    assert find_near_duplicates(chunks, threshold=1.0) == {4: 0}
+    assert find_near_duplicates(chunks[:1], threshold=0.8) == {}
+
+
+def test_multi_pass_summarize_reuses_duplicate_summaries(tmp_path, monkeypatch):
+    from src.utils import summarize_utils
+
+    monkeypatch.setenv("DEDUP_THRESHOLD", "0.9")
+
+    sent = []
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        sent.append(chunk)
+        return f"summary {len(sent)}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    async def fake_stream_summarize_llm(prompt, **kwargs):
+        yield "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+    monkeypatch.setattr(summarize_utils, "stream_summarize_llm", fake_stream_summarize_llm)
+
+    boilerplate = _paragraph(7, words=60)
+    text = "\n\n".join([boilerplate, _paragraph(8, words=60), boilerplate, _paragraph(9, words=60)]) + "\n\n"
+    events, report = [], {}
+    result = asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "book", max_chars=len(boilerplate) + 10, checkpoint_dir=str(tmp_path),
+        reduce_max_depth=0, report=report, on_event=events.append))
+
+    assert result == "FINAL"
+    assert len(sent) == 3
+    assert report["dedup"] == {"duplicate_chunks": 1, "llm_calls_saved": 1}
+    chunk_events = {e["index"]: e["summary"] for e in events if e["type"] == "chunk"}
+    assert chunk_events[2] == chunk_events[0]
+    assert [e for e in events if e["type"] == "progress"][-1] == {"type": "progress", "done": 4, "total": 4}
+
+    # Off unless asked for: every chunk is sent
+    sent.clear()
+    monkeypatch.delenv("DEDUP_THRESHOLD")
+    report = {}
+    asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "book", max_chars=len(boilerplate) + 10, checkpoint_dir=str(tmp_path / "off"),
+        reduce_max_depth=0, report=report))
+    assert len(sent) == 4
+    assert report["dedup"] == {"duplicate_chunks": 0, "llm_calls_saved": 0}
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold import budget for `src.utils.pdf_utils`, in seconds. PyMuPDF, the OpenAI and
+# Agents SDKs and Gradio each cost hundreds of milliseconds, so pulling any of them in
+# at import time blows through it.
+PDF_UTILS_IMPORT_BUDGET_SECONDS = 0.3
+HEAVY_MODULES = ("fitz", "pymupdf", "openai", "agents", "gradio", "httpx", "pydot", "dotenv")
+
+
+def import_profile(statement):
+    """
+    Runs `statement` in a fresh interpreter under `-X importtime`.\n
+    Returns {module: cumulative seconds} for every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative) / 1e6
+    return profile
+
+
+def test_pdf_utils_cold_import_is_cheap():
+    profile = import_profile("import src.utils.pdf_utils")
+    heavy = [name for name in profile if name.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    # Top-level entries of the `src` package tree add up to the whole import
+    elapsed = sum(seconds for name, seconds in profile.items() if name in ("src", "src.utils", "src.utils.pdf_utils"))
+    assert elapsed < PDF_UTILS_IMPORT_BUDGET_SECONDS, f"cold import took {elapsed:.3f}s"
+
+
+def test_llm_and_ui_actions_import_without_side_effects():
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.llm.llm_openAI, src.ui.ui_actions, sys; "
+         "print(sorted(m for m in ('openai', 'agents', 'gradio', 'fitz') if m in sys.modules))"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    # Nothing printed at import time and no heavy SDK loaded
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,94 @@
+import asyncio
+
+from src.llm.concurrency import ConcurrencyController
+from src.utils.job_utils import CANCELLED, DONE, FAILED, JobManager
+
+
+def fake_book(chunks, started):
+    """
+    Job body that "summarizes" `chunks` chunks through the shared controller.
+    """
+    async def work(job, controller):
+        async def chunk(i):
+            async with controller.slot():
+                started.append(job.name)
+                await asyncio.sleep(0.001)
+            done.append(i)
+            job.on_event({"type": "progress", "done": len(done), "total": chunks})
+
+        done = []
+        job.on_event({"type": "progress", "done": 0, "total": chunks})
+        await asyncio.gather(*(chunk(i) for i in range(chunks)))
+        return f"summary of {job.name}"
+    return work
+
+
+def test_small_job_is_not_starved_by_a_big_one():
+    async def scenario():
+        jobs = JobManager(controller=ConcurrencyController(initial=2, max_limit=2, latency_target=10.0))
+        started = []
+        big = jobs.submit("big", fake_book(200, started))
+        await asyncio.sleep(0.01)
+        small = jobs.submit("small", fake_book(5, started))
+
+        updates = [(job.done, job.total) async for job in jobs.get(small).watch()]
+        big_job = jobs.get(big)
+        await big_job.task
+        return updates, jobs.get(small), big_job, started
+
+    updates, small, big, started = asyncio.run(scenario())
+    assert small.status == DONE and small.result == "summary of small"
+    assert updates[-1] == (5, 5)
+    # The small book finished while most of the big one was still waiting
+    assert started.index("small") < 40 and started[:started.index("small")].count("big") < 40
+    assert big.status == DONE and big.eta() == 0.0
+    assert small.snapshot()["status"] == DONE
+
+
+def test_cancel_stops_in_flight_requests():
+    async def scenario():
+        jobs = JobManager(controller=ConcurrencyController(initial=4, max_limit=4))
+        release = asyncio.Event()
+        cancelled = []
+
+        async def work(job, controller):
+            async def request(i):
+                try:
+                    async with controller.slot():
+                        await release.wait()
+                except asyncio.CancelledError:
+                    cancelled.append(i)
+                    raise
+            await asyncio.gather(*(request(i) for i in range(10)))
+
+        job_id = jobs.submit("book", work)
+        await asyncio.sleep(0.01)
+        assert jobs.cancel(job_id)
+        await asyncio.gather(jobs.get(job_id).task, return_exceptions=True)
+        return jobs, job_id, cancelled
+
+    jobs, job_id, cancelled = asyncio.run(scenario())
+    job = jobs.get(job_id)
+    assert job.status == CANCELLED and sorted(cancelled) == list(range(10))
+    assert jobs.controller.in_flight == 0 and jobs.controller.queue_depth == 0
+    assert not jobs.cancel(job_id)
+
+
+def test_failed_job_reports_error_and_old_jobs_are_pruned():
+    async def scenario():
+        jobs = JobManager(controller=ConcurrencyController(), keep_finished=2)
+
+        async def broken(job, controller):
+            raise ValueError("no text")
+
+        ids = []
+        for _ in range(4):
+            ids.append(jobs.submit("book", broken))
+            await asyncio.gather(jobs.get(ids[-1]).task)
+        jobs.submit("book", broken)
+        return jobs, ids
+
+    jobs, ids = asyncio.run(scenario())
+    assert jobs.get(ids[0]) is None
+    assert jobs.get(ids[-1]).status == FAILED
+    assert jobs.get(ids[-1]).error == "ValueError: no text"
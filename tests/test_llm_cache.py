@@ -0,0 +1,67 @@
+import asyncio
+
+from src.llm.llm_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_depends_on_every_request_field():
+    base = make_cache_key("m", "chat", "p", "u", 100, 0.7)
+    assert base == make_cache_key("m", "chat", "p", "u", 100, 0.7)
+    assert base != make_cache_key("m", "chat", "p", "u", 100, 0.2)
+    assert base != make_cache_key("m", "chat", "p2", "u", 100, 0.7)
+
+
+def test_response_cache_tiers_and_lru_eviction(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, max_bytes=10, memory_entries=1)
+    assert cache.get("a") is None
+    cache.put("a", "12345")
+    cache.put("b", "67890")
+    assert cache.get("a") == "12345"  # from disk, "b" is in memory
+    cache.put("c", "abcde")  # over 10 bytes: least recently used ("b") goes
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    reopened = ResponseCache(path=path)
+    assert reopened.get("a") == "12345" and reopened.get("c") == "abcde"
+
+
+def test_memory_tier_expires_entries(tmp_path, monkeypatch):
+    from src.llm import llm_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_age_seconds=60)
+    cache.put("a", "old")
+    assert cache.get("a") == "old" and cache.stats()["memory_hits"] == 1
+
+    now[0] += 61
+    assert cache.get("a") is None
+    assert "a" not in cache._memory
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Stale entries are also dropped from memory when new ones are stored
+    cache.put("b", "new")
+    now[0] += 61
+    cache.put("c", "newer")
+    assert list(cache._memory) == ["c"]
+
+
+def test_run_summarize_llm_uses_cache(tmp_path, monkeypatch):
+    import src.llm.llm_openAI as llm
+
+    calls = []
+
+    async def fake_run_chat(messages, **kwargs):
+        calls.append(messages)
+        return f"SUMMARY {len(calls)}"
+
+    monkeypatch.setattr(llm, "run_chat", fake_run_chat)
+    monkeypatch.setattr(llm, "response_cache", ResponseCache(path=str(tmp_path / "cache.sqlite")))
+
+    run = lambda mode=None: asyncio.run(llm.run_summarize_llm("p", user_prompt="u", method="chat", cache_mode=mode))
+    assert run("use") == "SUMMARY 1"
+    assert run("use") == "SUMMARY 1"
+    assert run("refresh") == "SUMMARY 2"
+    assert run("use") == "SUMMARY 2"
+    assert run("bypass") == "SUMMARY 3"
+    assert len(calls) == 3
@@ -1,4 +1,7 @@
 import asyncio
+import time
+
+import pytest
 
 
 def test_run_summarize_calls_run_chat(monkeypatch):
@@ -11,3 +14,128 @@ def test_run_summarize_calls_run_chat(monkeypatch):
 
     result = asyncio.run(llm.run_summarize_llm(prompt='hello', user_prompt='x', max_response_tokens=123, method="other_method"))
     assert result == 'LLM_FAKE'
+
+
+@pytest.mark.parametrize("finish_reason", ["stop", "length"])
+def test_stream_summarize_llm_yields_deltas_and_caches(monkeypatch, tmp_path, finish_reason):
+    import src.llm.llm_openAI as llm
+    from src.llm.llm_cache import ResponseCache
+
+    class Delta:
+        def __init__(self, content, finish_reason=None):
+            choice = {"delta": type("D", (), {"content": content})(), "finish_reason": finish_reason}
+            self.choices = [type("Choice", (), choice)()]
+
+    class FakeStream:
+        def __init__(self, parts):
+            self.parts = parts
+
+        def __aiter__(self):
+            return self._gen()
+
+        async def _gen(self):
+            for part in self.parts:
+                yield Delta(part)
+            yield Delta(None, finish_reason)
+
+    class FakeCompletions:
+        calls = 0
+
+        async def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            FakeCompletions.calls += 1
+            return FakeStream(["Re", "zu", None, "mat"])
+
+    fake_client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+    monkeypatch.setattr(llm, 'client', fake_client)
+    monkeypatch.setattr(llm, 'response_cache', ResponseCache(path=str(tmp_path / "cache.sqlite")))
+
+    async def collect(outcome):
+        return [d async for d in llm.stream_summarize_llm("p", user_prompt="u", method="chat", cache_mode="use", outcome=outcome)]
+
+    outcome = {}
+    assert asyncio.run(collect(outcome)) == ["Re", "zu", "mat"]
+    assert outcome["finish_reason"] == finish_reason
+    if finish_reason == "stop":
+        outcome = {}
+        assert asyncio.run(collect(outcome)) == ["Rezumat"]
+        assert outcome == {"finish_reason": "stop", "cached": True}
+        assert FakeCompletions.calls == 1
+    else:
+        # Output cut off at max_tokens is asked again, not served from the cache as complete
+        assert asyncio.run(collect({})) == ["Re", "zu", "mat"]
+        assert FakeCompletions.calls == 2
+
+
+@pytest.mark.parametrize("stall", ["request", "first_token", "later_token"])
+def test_stream_chat_is_bounded_by_the_total_timeout(monkeypatch, stall):
+    import src.llm.llm_openAI as llm
+    from src.llm.transport import TransportConfig
+
+    class Delta:
+        def __init__(self, content):
+            self.choices = [type("Choice", (), {"delta": type("D", (), {"content": content})()})()]
+
+    async def events():
+        if stall == "first_token":
+            await asyncio.sleep(30)
+        yield Delta("Re")
+        await asyncio.sleep(30)
+        yield Delta("zumat")
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            if stall == "request":
+                await asyncio.sleep(30)
+            return events()
+
+    fake_client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+    monkeypatch.setattr(llm, 'client', fake_client)
+    monkeypatch.setattr(llm, 'transport_config', TransportConfig(total_timeout=0.2))
+
+    received = []
+
+    async def collect():
+        async for delta in llm.stream_chat([{"role": "user", "content": "p"}]):
+            received.append(delta)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect())
+    assert time.monotonic() - started < 5
+    assert received == ([] if stall != "later_token" else ["Re"])
+
+
+def test_openai_agents_method_skips_agents_runtime_unless_asked(monkeypatch):
+    import src.llm.llm_openAI as llm
+
+    calls = []
+
+    async def fake_run_chat(messages, max_response_tokens, temperature):
+        calls.append(("direct", messages, max_response_tokens))
+        return "DIRECT"
+
+    async def fake_run_openai_chat(prompt, user_prompt):
+        calls.append(("agents", prompt, user_prompt))
+        return "AGENTS"
+
+    monkeypatch.setattr(llm, 'run_chat', fake_run_chat)
+    monkeypatch.setattr(llm, 'run_openai_chat', fake_run_openai_chat)
+    monkeypatch.setattr(llm, 'MODEL_NAME', "some-model")
+    monkeypatch.setattr(llm, 'PROMPT_LAYOUT', "prefix")
+
+    monkeypatch.setattr(llm, 'LLM_ENGINE', "direct")
+    assert asyncio.run(llm.run_summarize_llm("instr", user_prompt="chunk", max_response_tokens=50)) == "DIRECT"
+    assert calls[-1] == ("direct", [{"role": "system", "content": "instr"}, {"role": "user", "content": "chunk"}], 50)
+
+    monkeypatch.setattr(llm, 'LLM_ENGINE', "agents")
+    assert asyncio.run(llm.run_summarize_llm("instr", user_prompt="chunk")) == "AGENTS"
+    assert calls[-1] == ("agents", "instr", "chunk")
+
+
+def test_usage_to_dict_reports_cached_prompt_tokens():
+    import src.llm.llm_openAI as llm
+
+    details = type("Details", (), {"cached_tokens": 300})()
+    usage = type("Usage", (), {"prompt_tokens": 400, "completion_tokens": 20, "total_tokens": 420, "prompt_tokens_details": details})()
+    assert llm.usage_to_dict(usage) == {"prompt_tokens": 400, "completion_tokens": 20, "total_tokens": 420, "cached_tokens": 300}
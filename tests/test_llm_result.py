@@ -0,0 +1,50 @@
+from src.llm.llm_result import LLMResult, LLMStatus, as_llm_result
+from src.llm.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def test_llm_result_classification():
+    assert LLMResult.from_text("Un rezumat despre eșec.").ok
+    assert LLMResult.from_text("  ").status == LLMStatus.RETRYABLE
+    assert LLMResult.from_text("partial", finish_reason="length").status == LLMStatus.TRUNCATED
+
+    assert LLMResult.from_exception(FakeStatusError(429)).overload
+    assert LLMResult.from_exception(FakeStatusError(502)).retryable
+    assert LLMResult.from_exception(APIConnectionError("refused")).retryable
+    bad_request = LLMResult.from_exception(FakeStatusError(400))
+    assert bad_request.status == LLMStatus.FATAL and bad_request.startswith("ERROR")
+
+    assert as_llm_result("plain text").ok
+    assert not as_llm_result(None).usable
+
+
+def test_backoff_delay_is_bounded_full_jitter():
+    delays = [backoff_delay(attempt, base=1.0, cap=5.0) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert max(backoff_delay(0, base=1.0) for _ in range(50)) <= 1.0
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(threshold=2, reset_seconds=0)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.is_open
+    breaker.check()  # reset elapsed: one trial request allowed
+    try:
+        breaker.check()
+        raised = False
+    except CircuitOpenError:
+        raised = True
+    assert raised
+    breaker.record_success()
+    assert not breaker.is_open
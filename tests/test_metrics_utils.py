@@ -0,0 +1,70 @@
+import asyncio
+import urllib.request
+
+import pytest
+
+from src.utils import metrics_utils as metrics
+
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.REGISTRY.clear()
+    yield metrics
+    metrics.REGISTRY.clear()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    counter = metrics.Counter("test_disabled", "doc")
+    counter.inc()
+    with metrics.CHUNK_TEXT_LATENCY.time():
+        pass
+    assert counter.value() == 0 and metrics.CHUNK_TEXT_LATENCY.count() == 0
+
+
+def test_exposition_format(metrics_on):
+    histogram = metrics.Histogram("test_seconds", "Latency.", ("method",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, method="chat")
+    histogram.observe(0.5, method="chat")
+    counter = metrics.Counter("test_requests", 'Requests "quoted".', ("status",))
+    counter.inc(2, status="ok")
+
+    text = histogram.render() + "\n" + counter.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{method="chat",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{method="chat",le="+Inf"} 2' in text
+    assert 'test_seconds_count{method="chat"} 2' in text
+    assert 'test_requests_total{status="ok"} 2' in text
+
+
+def test_pipeline_is_instrumented_and_served(metrics_on, monkeypatch):
+    import src.llm.llm_openAI as llm
+    from src.llm.concurrency import ConcurrencyController
+    from src.llm.llm_result import LLMResult
+    from src.llm.resilience import CircuitBreaker
+    from src.utils import pdf_utils, summarize_utils
+
+    async def fake_uncached(prompt, user_prompt, max_response_tokens, method, temperature):
+        return LLMResult.from_text("summary", usage={"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120})
+
+    monkeypatch.setattr(llm, "_run_summarize_llm_uncached", fake_uncached)
+    chunks = pdf_utils.chunk_text("Sentence one. " * 50, max_chars=100)
+    index, summary = asyncio.run(summarize_utils.single_pass_summarize(
+        chunks[0], 0, ConcurrencyController(), CircuitBreaker()
+    ))
+
+    assert summary == "summary"
+    assert metrics.CHUNKS_CREATED.value() == len(chunks)
+    assert metrics.LLM_REQUESTS.value(method="openai_agents", status="ok") == 1
+    assert metrics.LLM_TOKENS.value(kind="prompt") == 100
+    assert metrics.CHUNK_LATENCY.count(outcome="ok") == 1
+
+    server = metrics.start_metrics_server(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert 'book_reader_llm_tokens_total{kind="completion"} 20' in body
+    assert "book_reader_llm_queue_depth 0" in body
@@ -0,0 +1,51 @@
+from src.utils.normalize_utils import normalize_pages
+
+
+def _page(number, header, body):
+    return "\n".join([header, *body, str(number)]) + "\n"
+
+
+def test_running_headers_and_page_numbers_are_removed():
+    words = ["Dimineața", "Pădurea", "Școala", "Drumul", "Seara", "Iarna"]
+    pages = []
+    for n in range(1, 7):
+        header = f"AMINTIRI DIN COPILĂRIE {n}" if n % 2 else "Ion Creangă"
+        body = ["Capitolul 2"] if n == 4 else []
+        pages.append(_page(n, header, body + [f"{words[n - 1]} începe aici.", "Textul paginii continuă", f"până la {words[n - 1].lower()}."]))
+
+    text, stats = normalize_pages(pages)
+
+    assert "Creangă" not in text and "AMINTIRI" not in text
+    assert "Capitolul 2" in text  # a heading seen once is content
+    assert "Dimineața începe aici.\n\nTextul paginii continuă până la dimineața." in text
+    assert text.count("Textul paginii continuă") == 6
+    assert stats["page_numbers_removed"] == 6
+    assert stats["header_lines_removed"] == 6
+    assert stats["bytes_removed"] > 0 and stats["tokens_removed"] > 0
+    assert stats["tokens_before"] - stats["tokens_after"] == stats["tokens_removed"]
+
+
+def test_hyphens_ligatures_and_whitespace():
+    pages = [
+        "Copiii au ple-\ncat   spre\tpădure într-\no dimineață de ﬁnal de vară.\n"
+        "Era  frumos.\nApoi au venit acasă, pe la 1990-\n1995.\n\n"
+        "Alt paragraf aici.\n"
+    ]
+    text, stats = normalize_pages(pages)
+    assert text == (
+        "Copiii au plecat spre pădure într-o dimineață de final de vară.\n\n"
+        "Era frumos.\n\nApoi au venit acasă, pe la 1990-1995.\n\n"
+        "Alt paragraf aici."
+    )
+    assert stats["hyphens_joined"] == 3
+
+
+def test_line_break_hyphenation_is_joined_after_common_syllables():
+    text, stats = normalize_pages(["de-\nspre o ca-\nsa mare si se-\ncretul ei. Mi-\nnunat. Nu-\nmai ce-\nle trei"])
+    assert text == "despre o casa mare si secretul ei. Minunat. Numai cele trei"
+    assert stats["hyphens_joined"] == 6
+
+
+def test_hyphen_is_kept_before_clitics_and_articles():
+    text, _ = normalize_pages(["S-\na dus într-\nun loc, l-\nam văzut, nu-\ni bine, într-\nadevăr, fișierul PDF-\nul n-\nar fi"])
+    assert text == "S-a dus într-un loc, l-am văzut, nu-i bine, într-adevăr, fișierul PDF-ul n-ar fi"
@@ -0,0 +1,71 @@
+import os
+
+from src.utils import pdf_cache_utils, pdf_utils
+from src.utils.pdf_cache_utils import PageTextCache
+
+
+def _make_pdf(path, pages):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Pagina {i}: ăâîșț")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_pages_roundtrip_and_random_access(tmp_path):
+    cache = PageTextCache(cache_dir=str(tmp_path))
+    pages = [f"Pagina {i} — ăâîșț\n" * (i + 1) for i in range(5)] + [""]
+    cache.put("book", pages)
+
+    with cache.get("book") as cached:
+        assert len(cached) == 6
+        assert cached.page(3) == pages[3]
+        assert cached.pages(1, 3) == pages[1:3]
+        assert cached.text() == "".join(pages)
+    assert cache.get("other") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_corrupt_file_is_dropped(tmp_path):
+    cache = PageTextCache(cache_dir=str(tmp_path))
+    with open(cache.path_for("bad"), "wb") as f:
+        f.write(b"not a cache file")
+    assert cache.get("bad") is None
+    assert not os.path.exists(cache.path_for("bad"))
+
+
+def test_eviction_keeps_directory_under_bound(tmp_path):
+    cache = PageTextCache(cache_dir=str(tmp_path), max_bytes=1)
+    cache.put("old", ["a" * 100])
+    os.utime(cache.path_for("old"), (1, 1))
+    cache.put("new", ["b" * 100])
+    # The newest entry is kept even when it alone is over the bound
+    assert os.listdir(tmp_path) == ["new.pages"]
+
+
+def test_extraction_is_cached_by_content(tmp_path, monkeypatch):
+    monkeypatch.setenv("PDF_TEXT_CACHE", "1")
+    monkeypatch.setattr(pdf_cache_utils, "page_cache", PageTextCache(cache_dir=str(tmp_path / "cache")))
+    pdf_path = _make_pdf(tmp_path / "book.pdf", 6)
+    expected = pdf_utils.extract_pdf_text(pdf_path)
+
+    assert pdf_utils.extract_pdf_text_cached(pdf_path) == expected
+
+    # A copy under another name is the same content: served without parsing
+    copy = tmp_path / "upload.pdf"
+    copy.write_bytes(open(pdf_path, "rb").read())
+    monkeypatch.setattr(pdf_utils, "extract_pdf_pages", lambda *a, **k: (_ for _ in ()).throw(AssertionError("parsed")))
+    assert pdf_utils.extract_pdf_text_cached(str(copy)) == expected
+    leading = pdf_utils.extract_leading_text(str(copy), min_chars=1)
+    assert leading == "".join(pdf_utils.extract_page_range(pdf_path, 0, 1))
+
+
+def test_leading_text_parses_only_first_pages(tmp_path):
+    pdf_path = _make_pdf(tmp_path / "book.pdf", 10)
+    pages = pdf_utils.extract_page_range(pdf_path, 0, 10)
+    assert pdf_utils.extract_leading_text(pdf_path, min_chars=len(pages[0]) + 1) == pages[0] + pages[1]
+    assert pdf_utils.extract_leading_text(pdf_path, min_chars=10 ** 6) == "".join(pages)
@@ -1,6 +1,4 @@
 import asyncio
-from datetime import datetime
-import shutil
 
 from src.utils import pdf_utils
 
@@ -17,6 +15,7 @@ import os
 
 from llm import DEFAULT_RESPONSE_TOKENS
 import utils.pdf_utils as pdf_utils
+import utils.artifact_utils as artifact_utils
 import utils.summarize_utils as summarize_utils
 
 from utils.summarize_utils import multi_pass_summarize
@@ -31,32 +30,57 @@ def test_chunk_text_basic():
         assert len(c) <= 120
 
 
-def test_multi_pass_summarize_with_mock():
+def test_multi_pass_summarize_with_mock(tmp_path, monkeypatch):
     # Provide a fast async fake run_summarize_llm that returns deterministic text
     async def fake_run_summarize_llm(*args, **kwargs):
         max_response_tokens = kwargs.get('max_response_tokens') or kwargs.get('max_tokens') or DEFAULT_RESPONSE_TOKENS
         prompt = args[0] if args else kwargs.get('prompt','')
         return f"FAKE_SUMMARY tokens={max_response_tokens} len_prompt={len(prompt)}"
 
-    # Patch the run_summarize_llm used in the summarizer module
-    summarize_utils.run_summarize_llm = fake_run_summarize_llm
+    # Patch the run_summarize_llm used in the summarizer module (restored after the test)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
 
     # Use a moderately sized input so chunking creates multiple chunks
     text = "This is a sentence.\n" * 300
 
-    # Run the async pipeline synchronously in the test
-    final = asyncio.run(multi_pass_summarize(text, "testfile", max_chars=500))
+    # Run the async pipeline synchronously in the test, recording into a fresh artifact store
+    store = artifact_utils.ArtifactStore(str(tmp_path / "runs.sqlite"))
+    with artifact_utils.run("testfile", store=store) as run:
+        final = asyncio.run(multi_pass_summarize(text, "testfile", max_chars=500, checkpoint_dir=str(tmp_path)))
 
     # The fake summary text should be present in the final result
     assert "FAKE_SUMMARY" in final
-    # And the file should have been written to the output directory
-    current_date = datetime.now().strftime("%d-%m-%Y_%H-%M")
-
-    out_path = os.path.join("output", "archive",current_date, "result_testfile_summary.txt")
-    assert os.path.exists(out_path)
-    out_folder_path = os.path.join("output", "archive",current_date)
-    if os.path.exists(out_folder_path) and os.path.isdir(out_folder_path):
-        shutil.rmtree(out_folder_path)
-        print(f"{out_folder_path} deleted successfully.")
-    else:
-        print(f"{out_folder_path} does not exist.")
+    # And the run's summaries should have been recorded in the artifact store
+    assert store.content(run.run_id, "summary", "final").startswith("FAKE_SUMMARY")
+    assert store.content(run.run_id, "summary", "chunk_1").startswith("FAKE_SUMMARY")
+    store.close()
+
+
+def _make_pdf(path, pages):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i} text")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_split_page_ranges_covers_all_pages_in_order():
+    ranges = pdf_utils.split_page_ranges(10, 3)
+    assert ranges == [(0, 4), (4, 7), (7, 10)]
+    assert pdf_utils.split_page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_parallel_extraction_matches_serial(tmp_path, monkeypatch):
+    pdf_path = _make_pdf(tmp_path / "book.pdf", 12)
+    # Force the process pool even for a tiny document
+    monkeypatch.setattr(pdf_utils, "MIN_PAGES_PER_EXTRACTION_WORKER", 1)
+
+    serial = pdf_utils.extract_pdf_text(pdf_path)
+    pages = pdf_utils.extract_pdf_pages(pdf_path, max_workers=2)
+    assert len(pages) == 12
+    assert "Page 0 text" in pages[0] and "Page 11 text" in pages[11]
+    assert asyncio.run(pdf_utils.extract_pdf_text_async(pdf_path, max_workers=2)) == serial
@@ -11,3 +11,17 @@ def test_create_presentation_monkeypatch(monkeypatch):
 
     result = asyncio.run(create_presentation('summary text', 'my impressions'))
     assert 'PRESENTATION_FAKE' in result
+
+
+def test_stream_presentation_monkeypatch(monkeypatch):
+    async def _fake_stream(prompt, **kwargs):
+        for part in ["PRESENTATION", "_STREAM"]:
+            yield part
+
+    monkeypatch.setattr('src.llm.llm_openAI.stream_summarize_llm', _fake_stream)
+    from src.utils.presentation_utils import stream_presentation
+
+    async def collect():
+        return "".join([d async for d in stream_presentation('summary text', 'my impressions')])
+
+    assert asyncio.run(collect()) == 'PRESENTATION_STREAM'
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.llm.prompt_cache import SlotPool, cache_hints
+
+
+def test_slot_pool_reuses_lowest_free_slot():
+    pool = SlotPool(2)
+    with pool.acquire() as a, pool.acquire() as b:
+        with pool.acquire() as c:
+            assert (a, b, c) == (0, 1, None)
+    with pool.acquire() as d:
+        assert d == 0
+
+
+def test_cache_hints_only_for_llamacpp():
+    assert cache_hints("openai", 3) is None
+    assert cache_hints("llamacpp") == {"cache_prompt": True}
+    assert cache_hints("llamacpp", 1) == {"cache_prompt": True, "id_slot": 1}
+
+
+def test_run_chat_sends_hints_and_prefix_messages(monkeypatch):
+    import src.llm.llm_openAI as llm
+
+    requests = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+            await asyncio.sleep(0)
+            message = type("M", (), {"content": "ok"})()
+            return type("Resp", (), {"choices": [type("C", (), {"message": message, "finish_reason": "stop"})()]})()
+
+    fake_client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+    monkeypatch.setattr(llm, "client", fake_client)
+    monkeypatch.setattr(llm, "endpoint_pool", None)
+    monkeypatch.setattr(llm, "MODEL_NAME", "mistral-7b")
+    monkeypatch.setattr(llm, "PROMPT_LAYOUT", "prefix")
+    monkeypatch.setattr(llm, "LLM_BACKEND", "llamacpp")
+    monkeypatch.setattr(llm, "LLM_SLOTS", 2)
+    monkeypatch.setattr(llm, "slot_pools", {})
+
+    messages = llm.build_messages("Instrucțiuni", "Sarcina\n\ntext")
+    assert messages == [{"role": "user", "content": "Instrucțiuni\n\nSarcina\n\ntext"}]
+
+    async def run():
+        return await asyncio.gather(*(llm.run_chat(messages, max_response_tokens=8) for _ in range(3)))
+
+    assert all(result.ok for result in asyncio.run(run()))
+    assert [r["extra_body"] for r in requests] == [
+        {"cache_prompt": True, "id_slot": 0},
+        {"cache_prompt": True, "id_slot": 1},
+        {"cache_prompt": True},
+    ]
@@ -1,3 +1,5 @@
+import pytest
+
 from src.llm import prompts_utils
 
 
@@ -8,3 +10,16 @@ def test_get_chunk_and_summary_prompts():
     assert 'Materialul sursă' in chunk_prompt or 'Materialul sursă' in chunk_prompt
     summ_prompt = prompts_utils.getSummaryPromt(combined)
     assert 'Materialul' in summ_prompt or 'Materialul sursă' in summ_prompt
+
+
+def test_layout_prompt_puts_shared_instructions_first():
+    inline = prompts_utils.layoutPrompt("chunk one", "Rezumă.", "Sarcina.")
+    assert inline == (prompts_utils.getChunkPrompt("chunk one", "Rezumă."), "Sarcina.")
+
+    first = prompts_utils.layoutPrompt("chunk one", "Rezumă.", "Sarcina.", layout="prefix")
+    second = prompts_utils.layoutPrompt("chunk two", "Rezumă.", "Sarcina.", layout="prefix")
+    assert first[0] == second[0] == "Rezumă."
+    assert first[1].startswith("Sarcina.") and first[1].rstrip().endswith('"""chunk one"""')
+
+    with pytest.raises(ValueError):
+        prompts_utils.layoutPrompt("x", "y", layout="suffix")
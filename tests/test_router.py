@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from src.llm.resilience import CircuitOpenError
+from src.llm.router import Endpoint, EndpointPool, parse_endpoints
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_parse_endpoints():
+    endpoints = parse_endpoints("http://a:8080/v1|2|8, http://b:8080/v1")
+    assert [e.base_url for e in endpoints] == ["http://a:8080/v1", "http://b:8080/v1"]
+    assert (endpoints[0].weight, endpoints[0].max_concurrency) == (2.0, 8)
+    assert endpoints[1].weight == 1.0
+    assert EndpointPool(endpoints).capacity == 8 + endpoints[1].max_concurrency
+
+
+def test_routes_to_least_outstanding_by_weight_and_waits_at_caps():
+    async def scenario():
+        pool = EndpointPool([Endpoint("a", weight=2, max_concurrency=2), Endpoint("b", weight=1, max_concurrency=1)])
+        release = asyncio.Event()
+        chosen = []
+
+        async def request():
+            async with pool.acquire() as endpoint:
+                chosen.append(endpoint.base_url)
+                await release.wait()
+
+        tasks = [asyncio.create_task(request()) for _ in range(4)]
+        await asyncio.sleep(0)
+        # a has twice the weight: it takes two requests per one on b, then both are at their caps
+        assert chosen == ["a", "a", "b"]
+        assert pool.outstanding == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        return chosen, pool
+
+    chosen, pool = asyncio.run(scenario())
+    assert len(chosen) == 4 and pool.outstanding == 0
+
+
+def test_ejects_failing_endpoint_and_readmits_after_health_check():
+    async def scenario():
+        bad = Endpoint("bad", max_concurrency=1, eject_threshold=2, eject_seconds=60)
+        good = Endpoint("good", max_concurrency=1)
+        pool = EndpointPool([bad, good])
+
+        async def call(fail_on):
+            async with pool.acquire() as endpoint:
+                if endpoint.base_url == fail_on:
+                    raise FakeStatusError(503)
+                return endpoint.base_url
+
+        for _ in range(2):
+            with pytest.raises(FakeStatusError):
+                # Equal load: the first endpoint in the list is tried
+                await call("bad")
+        assert not bad.healthy
+        assert [await call("bad") for _ in range(3)] == ["good"] * 3
+
+        # A fatal client error does not count against the endpoint's health
+        with pytest.raises(FakeStatusError):
+            async with pool.acquire():
+                raise FakeStatusError(400)
+        assert good.healthy
+
+        # After the ejection period one request probes the node; success re-admits it
+        bad.breaker.reset_seconds = 0
+        assert await call(None) == "bad"
+        assert bad.healthy
+
+    asyncio.run(scenario())
+
+
+def test_all_ejected_raises_circuit_open():
+    async def scenario():
+        pool = EndpointPool([Endpoint("a", eject_threshold=1, eject_seconds=60)])
+        with pytest.raises(ConnectionError):
+            async with pool.acquire():
+                raise ConnectionError("refused")
+        with pytest.raises(CircuitOpenError):
+            async with pool.acquire():
+                pass
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_not_stranded_when_every_endpoint_is_ejected():
+    async def scenario():
+        pool = EndpointPool([Endpoint("a", max_concurrency=1, eject_threshold=1, eject_seconds=60)])
+
+        async def request():
+            async with pool.acquire():
+                await asyncio.sleep(0)
+                raise ConnectionError("refused")
+
+        return await asyncio.wait_for(asyncio.gather(*(request() for _ in range(3)), return_exceptions=True), 5)
+
+    errors = asyncio.run(scenario())
+    assert [type(e) for e in errors].count(ConnectionError) == 1
+    assert [type(e) for e in errors].count(CircuitOpenError) == 2
+
+
+def test_waiter_rechecks_admission_when_ejection_ends():
+    async def scenario():
+        a = Endpoint("a", max_concurrency=1, eject_threshold=1, eject_seconds=0.05)
+        b = Endpoint("b", max_concurrency=1)
+        pool = EndpointPool([a, b])
+        a.breaker.record_failure()
+        gate = asyncio.Event()
+        used = []
+
+        async def request():
+            async with pool.acquire() as endpoint:
+                used.append(endpoint.base_url)
+                await gate.wait()
+
+        # "a" is ejected and "b" is busy: the second request waits, and is sent to "a"
+        # as its health check once the ejection ends, without waiting for "b" to finish
+        tasks = [asyncio.create_task(request())]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request()))
+        await asyncio.sleep(0.2)
+        admitted = list(used)
+        gate.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return admitted, a.healthy
+
+    admitted, readmitted = asyncio.run(scenario())
+    assert admitted == ["b", "a"]
+    assert readmitted
@@ -1,20 +1,21 @@
 import asyncio
+import time
 
 
 def test_summarize_and_validate_chunk_success(monkeypatch):
-    """summarize_and_validate_chunk should return the summary and call write_to_file."""
-    from src.utils import summarize_utils
+    """summarize_and_validate_chunk should return the summary and record it as a run artifact."""
+    from src.utils import artifact_utils, summarize_utils
 
-    # Capture calls to write_to_file
+    # Capture recorded artifacts
     calls = []
 
-    def fake_write_to_file(index, content):
-        calls.append((index, content))
+    def fake_record(kind, name, content, **fields):
+        calls.append((kind, name, content, fields["chunk"]))
 
     async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
         return "THIS IS A SUMMARY"
 
-    monkeypatch.setattr(summarize_utils, 'write_to_file', fake_write_to_file)
+    monkeypatch.setattr(artifact_utils, 'record', fake_record)
     monkeypatch.setattr(summarize_utils, 'summarize_chunk', fake_summarize_chunk)
 
     result = asyncio.run(summarize_utils.summarize_and_validate_chunk(
@@ -26,9 +27,7 @@ def test_summarize_and_validate_chunk_success(monkeypatch):
     ))
 
     assert result == "THIS IS A SUMMARY"
-    assert len(calls) == 1
-    assert calls[0][0] == "promt_1"
-    assert calls[0][1] == "THIS IS A SUMMARY"
+    assert calls == [("summary", "chunk_1", "THIS IS A SUMMARY", 0)]
 
 
 def test_summarize_and_validate_chunk_failure(monkeypatch):
@@ -53,3 +52,193 @@ def test_summarize_and_validate_chunk_failure(monkeypatch):
         raised = True
 
     assert raised is True
+
+
+def test_group_for_reduce_respects_budget_and_fan_in():
+    from src.utils.summarize_utils import group_for_reduce
+
+    batches = group_for_reduce(["a" * 10] * 7, budget=35, fan_in=2)
+    assert [len(b) for b in batches] == [2, 2, 2, 1]
+    batches = group_for_reduce(["a" * 10] * 7, budget=25, fan_in=8)
+    assert [len(b) for b in batches] == [2, 2, 2, 1]
+
+
+def test_tree_reduce_summaries_until_budget(monkeypatch):
+    from src.llm.concurrency import ConcurrencyController
+    from src.utils import summarize_utils
+
+    calls = []
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        calls.append(prompt)
+        return "r" * 10
+
+    monkeypatch.setattr(summarize_utils, 'run_summarize_llm', fake_run_summarize_llm)
+
+    report = {}
+    result = asyncio.run(summarize_utils.tree_reduce_summaries(
+        ["s" * 10] * 16, ConcurrencyController(), budget=45, fan_in=2, max_depth=5, report=report
+    ))
+
+    # 16 -> 8 -> 4 summaries: four of them fit the budget, so the final reduce can take them
+    assert result == ["r" * 10] * 4
+    assert len(calls) == 12
+    assert [(lvl["inputs"], lvl["outputs"]) for lvl in report["reduce_levels"]] == [(16, 8), (8, 4)]
+
+
+def test_reduce_overload_lowers_the_concurrency_limit(monkeypatch):
+    from src.llm.concurrency import ConcurrencyController
+    from src.llm.llm_result import LLMResult, LLMStatus
+    from src.utils import summarize_utils
+
+    async def overloaded(prompt, **kwargs):
+        return LLMResult("", LLMStatus.RETRYABLE, error="RateLimitError", status_code=429, overload=True)
+
+    monkeypatch.setattr(summarize_utils, 'run_summarize_llm', overloaded)
+    controller = ConcurrencyController(initial=8, min_limit=1, max_limit=8)
+
+    result = asyncio.run(summarize_utils.reduce_batch(["a", "b"], "sp", "up", 10, controller))
+
+    # The batch is kept as it was, and the overload reached the controller's decrease path
+    assert result == "a\nb"
+    assert controller.overloads == 1
+    assert controller.limit < 8
+
+
+def test_summary_mentioning_failure_is_accepted(monkeypatch):
+    from src.utils import summarize_utils
+
+    async def fake_summarize_chunk(*args, **kwargs):
+        return "Cartea descrie un eșec: planul a failed, Error de calcul."
+
+    monkeypatch.setattr(summarize_utils, 'summarize_chunk', fake_summarize_chunk)
+
+    result = asyncio.run(summarize_utils.summarize_and_validate_chunk("c", 0, "cp", "up", 10))
+    assert "failed" in result
+
+
+def test_multi_pass_stops_when_circuit_opens(monkeypatch, tmp_path):
+    import pytest
+    from src.llm.llm_result import LLMResult
+    from src.llm.resilience import CircuitOpenError
+    from src.utils import summarize_utils
+
+    calls = []
+
+    async def down_summarize_chunk(chunk, **kwargs):
+        calls.append(chunk)
+        return LLMResult.from_exception(ConnectionRefusedError("connection refused"))
+
+    monkeypatch.setattr(summarize_utils, 'summarize_chunk', down_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, 'RETRY_BACKOFF_BASE_SECONDS', 0)
+
+    text = "".join(f"Paragraph {i} text.\n\n" for i in range(40))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(summarize_utils.multi_pass_summarize(text, "down", max_chars=25, checkpoint_dir=str(tmp_path)))
+    # 40 chunks with 3 retries each would be 160 calls; the breaker stops far earlier
+    assert len(calls) < 40
+
+
+def test_multi_pass_emits_progress_and_streams_final(monkeypatch, tmp_path):
+    from src.utils import summarize_utils
+
+    async def fake_summarize_chunk(chunk, **kwargs):
+        return f"summary {chunk[:4]}"
+
+    async def fake_stream(prompt, **kwargs):
+        for token in ["Final ", "summary"]:
+            yield token
+
+    monkeypatch.setattr(summarize_utils, 'summarize_chunk', fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, 'stream_summarize_llm', fake_stream)
+
+    events = []
+    text = "".join(f"Part {i} of the book.\n\n" for i in range(3))
+    final = asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "events", max_chars=25, checkpoint_dir=str(tmp_path), on_event=events.append
+    ))
+
+    assert final == "Final summary"
+    progress = [(e["done"], e["total"]) for e in events if e["type"] == "progress"]
+    assert progress[0] == (0, 3) and progress[-1] == (3, 3)
+    assert sorted(e["index"] for e in events if e["type"] == "chunk") == [0, 1, 2]
+    assert [e["text"] for e in events if e["type"] == "token"] == ["Final ", "summary"]
+
+
+def test_stream_final_summary_reports_truncation(monkeypatch):
+    from src.llm.llm_result import LLMStatus
+    from src.utils import summarize_utils
+
+    async def fake_stream(prompt, outcome, **kwargs):
+        yield "Final "
+        yield "sum"
+        outcome["finish_reason"] = "length"
+
+    monkeypatch.setattr(summarize_utils, 'stream_summarize_llm', fake_stream)
+
+    events = []
+    result = asyncio.run(summarize_utils.stream_final_summary("p", "u", 10, events.append))
+    assert result == "Final sum"
+    assert result.status == LLMStatus.TRUNCATED
+
+
+def fake_chat_client(hang_on):
+    """
+    Chat client whose requests never answer when their prompt contains one of `hang_on`.
+    """
+    prompts = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            prompt = "\n".join(m["content"] for m in kwargs["messages"])
+            prompts.append(prompt)
+            if any(marker in prompt for marker in hang_on):
+                await asyncio.Event().wait()
+            message = type("Message", (), {"content": f"rezumat {len(prompts)}"})()
+            return type("Resp", (), {"choices": [type("Choice", (), {"message": message, "finish_reason": "stop"})()]})()
+
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+    return client, prompts
+
+
+def test_chunk_timeout_cancels_a_hung_request_and_retries(monkeypatch, tmp_path):
+    import src.llm.llm_openAI as llm
+    from src.utils import summarize_utils
+
+    client, prompts = fake_chat_client(hang_on=["Part 1 "])
+    monkeypatch.setattr(llm, 'client', client)
+    monkeypatch.setattr(summarize_utils, 'RETRY_BACKOFF_BASE_SECONDS', 0)
+
+    text = "".join(f"Part {i} of the book.\n\n" for i in range(3))
+    report = {}
+    final = asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "hung", max_chars=25, checkpoint_dir=str(tmp_path), chunk_timeout=0.05, report=report
+    ))
+
+    assert final.startswith("rezumat")
+    # The hung chunk was cancelled and retried; the others went through once
+    assert sum("Part 1 " in p for p in prompts) == 1 + summarize_utils.NUMBER_OF_RETRIES
+    assert report["summarized_chunks"] == 2 and "deadline" not in report
+
+
+def test_run_deadline_degrades_to_partial_summary(monkeypatch, tmp_path):
+    import src.llm.llm_openAI as llm
+    from src.constants.prompt_constants import DEADLINE_PARTIAL_NOTE
+    from src.utils import summarize_utils
+
+    # Chunk 2 and the final summary never answer
+    client, prompts = fake_chat_client(hang_on=["Part 1 ", "rezumat 1\n"])
+    monkeypatch.setattr(llm, 'client', client)
+    monkeypatch.setattr(summarize_utils, 'RETRY_BACKOFF_BASE_SECONDS', 0)
+
+    text = "".join(f"Part {i} of the book.\n\n" for i in range(3))
+    report = {}
+    started = time.monotonic()
+    final = asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "late", max_chars=25, checkpoint_dir=str(tmp_path), deadline=0.5, report=report
+    ))
+
+    assert time.monotonic() - started < 1.5
+    assert final.startswith(DEADLINE_PARTIAL_NOTE)
+    assert "[Fragmentele 2-2 nu au fost rezumate" in final
+    assert report["deadline"]["missing_chunks"] == 1 and report["deadline"]["degraded"]
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.llm.prompts_utils import getChunkPrompt
+from src.llm.token_budget import EndpointTokenizer, EstimateTokenizer, PromptTooLongError, TokenBudget, load_tokenizer, tokenize_url
+
+
+class CharTokenizer:
+    """One token per character, and five per 'ș' (a diacritic-heavy vocabulary)."""
+    name = "chars"
+
+    def count(self, text):
+        return len(text) + 4 * text.count("ș")
+
+
+def test_estimate_tokenizer_charges_diacritics():
+    tokenizer = EstimateTokenizer(bytes_per_token=3.0)
+    assert tokenizer.count("abc" * 10) == 10
+    assert tokenizer.count("ăîș" * 10) == 20
+
+
+def test_tokenize_url_and_loader():
+    assert tokenize_url("http://box:8080/v1/") == "http://box:8080/tokenize"
+    assert tokenize_url("http://box:8080") == "http://box:8080/tokenize"
+    assert isinstance(load_tokenizer(None), EstimateTokenizer)
+    assert load_tokenizer("endpoint", base_url="http://box:8080/v1").url == "http://box:8080/tokenize"
+    with pytest.raises(ValueError):
+        load_tokenizer("endpoint")
+
+
+def test_endpoint_tokenizer_reads_llama_cpp_and_vllm_replies():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.url.host == "vllm":
+            return httpx.Response(200, json={"count": 7, "max_model_len": 4096})
+        return httpx.Response(200, json={"tokens": [1, 2, 3]})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    llama = EndpointTokenizer("http://llama/tokenize", client=client)
+    assert llama.count("text") == 3
+    assert llama.count("text") == 3  # memoized
+    assert EndpointTokenizer("http://vllm/tokenize", model="m", client=client).count("text") == 7
+    assert len(calls) == 2
+
+
+def test_budget_reserves_response_and_rejects_oversized_prompts():
+    budget = TokenBudget(CharTokenizer(), context_tokens=1000, safety_tokens=0)
+    content = budget.content_tokens("rules", "task", max_response_tokens=200)
+    assert content == 800 - budget.prompt_tokens(getChunkPrompt("", "rules"), "task")
+
+    chunk = "a" * content
+    assert budget.fits(getChunkPrompt(chunk, "rules"), "task", 200)
+    with pytest.raises(PromptTooLongError):
+        budget.check(getChunkPrompt(chunk + "aa", "rules"), "task", 200)
+    with pytest.raises(PromptTooLongError):
+        budget.content_tokens("x" * 900, "task", max_response_tokens=200)
+
+    # Denser text gets a smaller chunk size in characters
+    assert budget.max_chars("ș" * 2000, "rules", "task", 200) < budget.max_chars("a" * 2000, "rules", "task", 200)
+
+
+def test_multi_pass_summarize_sends_only_prompts_that_fit(monkeypatch, tmp_path):
+    from src.utils import summarize_utils
+
+    budget = TokenBudget(CharTokenizer(), context_tokens=500, safety_tokens=0)
+    sent = []
+
+    async def fake_run_summarize_llm(prompt, user_prompt=None, max_response_tokens=None, **kwargs):
+        sent.append((prompt, user_prompt))
+        return "summary " * 5
+
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+
+    # Mostly plain text with one diacritic-heavy paragraph the character ratio underestimates
+    text = "".join(f"Paragraful {i} are text simplu aici.\n\n" for i in range(30)) + "ș" * 300 + "\n\n"
+    result = asyncio.run(summarize_utils.multi_pass_summarize(
+        text, "book", chunk_prompt="rules", summary_prompt="rules", user_prompt="task",
+        max_response_tokens=100, token_budget=budget, checkpoint_dir=str(tmp_path)))
+
+    assert result
+    assert len(sent) > 2
+    assert all(budget.fits(prompt, user_prompt, 100) for prompt, user_prompt in sent)
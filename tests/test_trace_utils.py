@@ -0,0 +1,48 @@
+import asyncio
+import json
+import os
+
+from src.utils import trace_utils
+from src.utils.trace_utils import Tracer
+
+
+def test_spans_are_noops_without_a_run():
+    with trace_utils.span("llm") as args:
+        args["status"] = "ok"
+    assert trace_utils.now() is None
+
+
+def test_multi_pass_trace_has_chunk_lanes_and_critical_path(tmp_path, monkeypatch):
+    from src.utils import summarize_utils
+
+    async def fake_summarize_chunk(chunk, chunk_prompt=None, user_prompt=None, max_response_tokens=None):
+        # The second chunk is the slow one
+        await asyncio.sleep(0.05 if chunk.startswith("Chunk 2") else 0.001)
+        return f"summary of {chunk[:7]}"
+
+    async def fake_run_summarize_llm(prompt, **kwargs):
+        return "FINAL"
+
+    monkeypatch.setattr(summarize_utils, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarize_utils, "run_summarize_llm", fake_run_summarize_llm)
+
+    tracer = Tracer("book")
+    text = "\n\n".join(f"Chunk {i} " + "x" * 40 for i in range(1, 4))
+    asyncio.run(summarize_utils.multi_pass_summarize(
+        text, summary_file_name="book", max_chars=60, checkpoint_dir=tmp_path, tracer=tracer, dedup_threshold=0.9
+    ))
+
+    trace = tracer.to_chrome()
+    lanes = {e["args"]["name"] for e in trace["traceEvents"] if e["name"] == "thread_name"}
+    assert {"run", "chunk 1", "chunk 2", "chunk 3"} <= lanes
+    stages = [e["name"] for e in tracer.events if e["cat"] == "stage"]
+    assert stages == ["chunking", "dedup", "map", "reduce", "final"]
+
+    summary = trace_utils.critical_path_summary(tracer)
+    assert "Bounding stage: map" in summary
+    assert "finished last: chunk 2" in summary
+
+    path = tracer.save(base_dir=tmp_path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["traceEvents"]
+    assert os.path.exists(path.replace(".trace.json", ".critical_path.txt"))
@@ -0,0 +1,50 @@
+import asyncio
+import importlib.util
+
+from src.llm import transport
+from src.llm.transport import TransportConfig, build_http_client
+
+
+def test_from_env_sizes_pool_to_concurrency(monkeypatch):
+    for key in ("LLM_HTTP_KEEPALIVE_EXPIRY", "LLM_HTTP_WRITE_TIMEOUT", "LLM_HTTP2"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "7")
+    monkeypatch.setenv("LLM_HTTP_READ_TIMEOUT", "42")
+    monkeypatch.setenv("LLM_HTTP_TOTAL_TIMEOUT", "99")
+    config = TransportConfig.from_env()
+    assert config.pool_size == 7
+    assert config.read_timeout == 42.0
+    assert config.total_timeout == 99.0
+    assert config.keepalive_expiry is None and config.write_timeout is None and not config.http2
+
+    monkeypatch.setenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")
+    monkeypatch.setenv("LLM_HTTP_WRITE_TIMEOUT", "15")
+    monkeypatch.setenv("LLM_HTTP2", "1")
+    config = TransportConfig.from_env()
+    assert (config.keepalive_expiry, config.write_timeout, config.http2) == (30.0, 15.0, True)
+
+
+def test_limits_and_timeouts():
+    import httpx
+
+    config = TransportConfig(pool_size=4, connect_timeout=1, read_timeout=2)
+    limits = config.limits()
+    assert limits.max_connections == 4 and limits.max_keepalive_connections == 4
+    # Unset opt-in settings keep the library defaults
+    assert limits.keepalive_expiry == httpx.Limits().keepalive_expiry
+    timeout = config.timeout()
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (1, 2, 2, 2)
+
+    config = TransportConfig(pool_size=4, connect_timeout=1, read_timeout=2, keepalive_expiry=9, write_timeout=3)
+    assert config.limits().keepalive_expiry == 9
+    assert config.timeout().write == 3
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(transport.importlib.util, "find_spec", lambda name: None if name == "h2" else real_find_spec(name))
+    client = build_http_client(TransportConfig(pool_size=2, read_timeout=5, http2=True))
+    try:
+        assert client.timeout.read == 5
+    finally:
+        asyncio.run(client.aclose())
@@ -1,6 +1,6 @@
-from src.llm import *
+import src.llm.llm_openAI
 print("LLM references OK")
-from src.utils import *
+import src.utils.pdf_utils, src.utils.presentation_utils, src.utils.summarize_utils, src.utils.file_utils
 print("Utils references OK")
 import src.ui.ui_actions
 print("Frontend actions import OK")